@@ -1,9 +1,30 @@
+import contextlib
 import enum
 import json
+import logging
+import re
+import threading
+import time
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Callable, Dict, Any, Iterator, List, Mapping, Tuple, Union
 import urllib3
 
+from cache import ResponseCache
+from codec import DEFAULT_CODEC, LazyResult
+from diff import Change, Plan, diff
+from instrumentation import Metrics, RequestRecord, body_size
+from models.interface import VrfConfig
+from models.routing import OspfConfig, bgp_body, bgp_vrf_entries, bgp_vrf_entry, ospf_body
+from ratelimit import DeviceLimiter
+from query import with_query
+from readiness import wait_until_applied
+from streaming import iter_response
+from tracing import Tracer, TracingAdapter
+from yang_patch import YANG_PATCH_HEADERS, YangPatch, edit_statuses
+
+logger = logging.getLogger(__name__)
+
 # Disable SSL warnings for lab environment
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -18,280 +39,712 @@ DEFAULT_AUTH = ("agh", "xd")
 
 
 class RequestType(enum.Enum):
+    NATIVE = "native"
     INTERFACE = "interface"
+    INTERFACE_ENTRY = "interface entry"
+    INTERFACES = "interfaces"
     VRF = "vrf"
     VRF_PATCH = "vrf patch"
     BGP = "bgp"
     BGP_PATCH = "bgp patch"
+    BGP_VRF = "bgp vrf"
     ROUTE_MAP = "route_map"
     OSPF = "ospf"
+    OSPF_PROCESS = "ospf process"
 
 
-class RestConfHandler:
-    """
-    RESTCONF API Handler for Cisco IOS-XE devices
+# Native subtrees in the order they are tried, so e.g. vrf/definition=X is not reported as vrf
+_NATIVE_URL_TYPES = [(re.compile(pattern), rq_type) for pattern, rq_type in (
+    (r"/interface/GigabitEthernet=", RequestType.INTERFACE_ENTRY),
+    (r"/interface/GigabitEthernet", RequestType.INTERFACE),
+    (r"/interface", RequestType.INTERFACES),
+    (r"/vrf/definition=", RequestType.VRF_PATCH),
+    (r"/vrf", RequestType.VRF),
+    (r"/router/Cisco-IOS-XE-bgp:bgp=[^/]+/address-family/with-vrf/ipv4=unicast/vrf=", RequestType.BGP_VRF),
+    (r"/router/Cisco-IOS-XE-bgp:bgp", RequestType.BGP),
+    (r"/router/Cisco-IOS-XE-ospf:router-ospf/ospf/process-id-vrf=", RequestType.OSPF_PROCESS),
+    (r"/router/Cisco-IOS-XE-ospf:router-ospf", RequestType.OSPF),
+    (r"/route-map", RequestType.ROUTE_MAP)
+)]
 
-    This class provides programmatic access to network device configuration
-    for educational purposes, specifically focusing on route leaking in MP-BGP.
+
+def request_type(url: str) -> str:
+    """Name of the RequestType a URL built by _build_url belongs to, "other" if none"""
+    path = url.partition("/restconf/data")[2].partition("?")[0]
+    if path.startswith("/ietf-interfaces:"):
+        return RequestType.INTERFACE.value
+    if not path.startswith("/Cisco-IOS-XE-native:native"):
+        return "other"
+    path = path[len("/Cisco-IOS-XE-native:native"):]
+    for pattern, rq_type in _NATIVE_URL_TYPES:
+        if pattern.match(path):
+            return rq_type.value
+    return RequestType.NATIVE.value
+
+
+class RestConfBase:
     """
+    Transport-independent part of the RESTCONF handlers
 
-    def __init__(self, ip_addr: str, username: str = "agh", password: str = "xd"):
-        """
-        Initialize RESTCONF handler
+    Builds URLs and request bodies; RestConfHandler and AsyncRestConfHandler
+    only differ in how the requests are sent.
+    """
 
-        Args:
-            ip_addr: IP address of the network device
-            username: Authentication username
-            password: Authentication password
-        """
+    def __init__(self, ip_addr: str, username: str = "agh", password: str = "xd", port: int = 443):
         self.ip_addr = ip_addr
         self.auth = (username, password)
-        self.base_url = f"https://{ip_addr}:443/restconf/data"
+        self.port = port
+        self.base_url = f"https://{ip_addr}:{port}/restconf/data"
+
+    @property
+    def device_name(self) -> str:
+        return self.ip_addr if self.port == 443 else f"{self.ip_addr}:{self.port}"
 
     def _build_url(self, rq_type: RequestType, **kwargs) -> str:
         """Build appropriate URL based on request type"""
         match rq_type:
+            case RequestType.NATIVE:
+                return f"{self.base_url}/Cisco-IOS-XE-native:native"
             case RequestType.INTERFACE:
                 # interface = kwargs.get('interface', '')
                 # interface = interface.replace("/", "%2F")
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/interface/GigabitEthernet"
+            case RequestType.INTERFACE_ENTRY:
+                name = kwargs['interface'].replace("GigabitEthernet", "").replace("/", "%2F")
+                return f"{self.base_url}/Cisco-IOS-XE-native:native/interface/GigabitEthernet={name}"
+            case RequestType.INTERFACES:
+                return f"{self.base_url}/Cisco-IOS-XE-native:native/interface"
             case RequestType.VRF:
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/vrf"
             case RequestType.VRF_PATCH:
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/vrf/definition={kwargs['vrf']}"
             case RequestType.BGP:
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/router/Cisco-IOS-XE-bgp:bgp"
+            case RequestType.BGP_VRF:
+                return (f"{self.base_url}/Cisco-IOS-XE-native:native/router/Cisco-IOS-XE-bgp:bgp={kwargs['as_number']}"
+                        f"/address-family/with-vrf/ipv4=unicast/vrf={kwargs['vrf']}")
             case RequestType.ROUTE_MAP:
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/route-map"
             case RequestType.OSPF:
                 return f"{self.base_url}/Cisco-IOS-XE-native:native/router/Cisco-IOS-XE-ospf:router-ospf"
+            case RequestType.OSPF_PROCESS:
+                return (f"{self.base_url}/Cisco-IOS-XE-native:native/router/Cisco-IOS-XE-ospf:router-ospf"
+                        f"/ospf/process-id-vrf={kwargs['process_id']},{kwargs['vrf']}")
+
+    @staticmethod
+    def _assign_vrf_body(interface: str, vrf_name: str) -> Dict[str, Any]:
+        """Interface body assigning a VRF, used for route leaking"""
+        return {
+            "ietf-interfaces:interface": {
+                "name": interface,
+                "Cisco-IOS-XE-native:vrf": {
+                    "forwarding": vrf_name
+                }
+            }
+        }
+
+    @staticmethod
+    def _bgp_body(as_number: int, vrfs: List[VrfConfig], ospf_processes: List[OspfConfig] = (),
+                  router_id: Optional[str] = None) -> Dict[str, Any]:
+        """BGP body with an ipv4 unicast address family for every VRF"""
+        return bgp_body(as_number, bgp_vrf_entries(vrfs, ospf_processes), router_id)
+
+    @staticmethod
+    def _interface_batches(interface_configs: List[Any], max_payload: int) -> List[Tuple[Dict[str, Any], List[Any]]]:
+        """
+        Pack interfaces into native/interface PATCH bodies of at most max_payload bytes
+
+        Entries are grouped by their native list (GigabitEthernet, Loopback, ...).
+        An interface which alone exceeds the limit is sent in a body of its own;
+        for a repeated interface name the last config wins.
+        """
+        unique = {config.native_key(): config for config in interface_configs}
+        empty_size = len(json.dumps({"Cisco-IOS-XE-native:interface": {}}))
+        batches = []
+        lists: Dict[str, List[Dict[str, Any]]] = {}
+        configs: List[Any] = []
+        size = empty_size
+        for (list_name, _), config in unique.items():
+            entry_size = len(json.dumps(config.to_native_entry())) + 2  # ", " separator
+            list_size = len(list_name) + 8  # '"Loopback": [], '
+            if configs and size + entry_size + (0 if list_name in lists else list_size) > max_payload:
+                batches.append(({"Cisco-IOS-XE-native:interface": lists}, configs))
+                lists, configs, size = {}, [], empty_size
+            if list_name not in lists:
+                lists[list_name] = []
+                size += list_size
+            lists[list_name].append(config.to_native_entry())
+            configs.append(config)
+            size += entry_size
+        if configs:
+            batches.append(({"Cisco-IOS-XE-native:interface": lists}, configs))
+        return batches
+
+    def _interface_update(self, interface_configs: List[Any], max_payload: int,
+                          isolate_failures: bool) -> "InterfaceUpdate":
+        """Batches and result of an update_interfaces call, see InterfaceUpdate"""
+        return InterfaceUpdate(self._interface_batches(interface_configs, max_payload), isolate_failures)
+
+    @staticmethod
+    def _ospf_body(processes: List[OspfConfig]) -> Dict[str, Any]:
+        """OSPF body with the given processes"""
+        return ospf_body(processes)
+
+    @staticmethod
+    def _bgp_vrf_body(as_number: int, vrf_name: str, ospf_ids: List[int] = (),
+                      router_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        router/bgp body adding a single VRF to the BGP process
+
+        The VRF definition (rd, route targets) is left to create_vrf/patch_vrf:
+        changing the rd of a VRF makes IOS-XE rebuild all of its routes.
+        """
+        return bgp_body(as_number, [bgp_vrf_entry(vrf_name, ospf_ids)], router_id)
+
+
+class InterfaceUpdate:
+    """
+    Batches of an update_interfaces call and the result built from the answers
+
+    Iterating yields (body, configs) of the next PATCH to send, each answer is
+    passed to record(). Both handlers drive the same object, so batching and
+    failure isolation do not depend on the transport.
+    """
+
+    def __init__(self, batches: List[Tuple[Dict[str, Any], List[Any]]], isolate_failures: bool):
+        self._pending = batches
+        self.isolate_failures = isolate_failures
+        self.result = {"status_code": 204, "data": None, "interfaces": {}, "requests": 0}
+
+    def __iter__(self) -> Iterator[Tuple[Dict[str, Any], List[Any]]]:
+        while self._pending:
+            yield self._pending.pop(0)
+
+    def record(self, configs: List[Any], status_code: int, error_data: Callable[[], Any]):
+        """Account for the answer to a batch; error_data() returns the decoded body of a failure"""
+        self.result["requests"] += 1
+        ok = 200 <= status_code < 300
+        if not ok and self.isolate_failures and len(configs) > 1:
+            # The batch was rejected as a whole; find out which entries are at fault
+            self._pending[:0] = RestConfBase._interface_batches(configs, 0)
+            return
+        for config in configs:
+            self.result["interfaces"][config.name] = status_code
+        if 200 <= self.result["status_code"] < 300:
+            # Keep the first failure, otherwise the status of the last request
+            self.result["status_code"] = status_code
+            if not ok:
+                self.result["data"] = error_data()
+
+
+class RestConfHandler(RestConfBase):
+    """
+    RESTCONF API Handler for Cisco IOS-XE devices
+
+    This class provides programmatic access to network device configuration
+    for educational purposes, specifically focusing on route leaking in MP-BGP.
+
+    The get_* methods take optional depth, fields and content selectors (see
+    query.py), so only the leaves a caller uses are sent and parsed, e.g.
+    get_vrfs(fields="definition(name;rd)").
+    """
+
+    def __init__(self, ip_addr: str, username: str = "agh", password: str = "xd", port: int = 443,
+                 pool_size: int = 4, keep_alive: bool = True, idle_timeout: float = 60.0,
+                 cache: Optional[ResponseCache] = None, metrics: Optional[Metrics] = None,
+                 tracer: Optional[Tracer] = None, codec=DEFAULT_CODEC, limiter: Optional[DeviceLimiter] = None,
+                 timeout: float = 30.0):
+        """
+        Initialize RESTCONF handler
+
+        Args:
+            ip_addr: IP address of the network device
+            username: Authentication username
+            password: Authentication password
+            port: HTTPS port of the RESTCONF server
+            pool_size: Maximum number of pooled connections to the device
+            keep_alive: Reuse connections between calls; without it every
+                request opens a connection of its own and closes it afterwards
+            idle_timeout: Seconds after which idle pooled connections are dropped
+            cache: Read cache for GET responses; every write through this
+                handler invalidates the affected paths
+            metrics: Collector receiving a RequestRecord for every request
+            tracer: Records a span with connect/TLS/TTFB/body/decode phases
+                for every request; off by default
+            codec: JSON codec from codec.py, orjson when it is installed
+            limiter: Pacing, retries and circuit breaker of the device, see
+                ratelimit.py; share one limiter between handlers of a device
+            timeout: Seconds to wait for the device to connect and to answer
+        """
+        super().__init__(ip_addr, username, password, port)
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        self._last_used = 0.0
+        self.cache = cache
+        self.metrics = metrics
+        self.tracer = tracer
+        self.codec = codec
+        self.limiter = limiter
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections to the device"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _new_session(self) -> requests.Session:
+        """Create a session with a connection pool sized for this device"""
+        session = requests.Session()
+        session.auth = self.auth
+        session.headers.update(HEADERS)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        adapter_class = TracingAdapter if self.tracer is not None else HTTPAdapter
+        adapter = adapter_class(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _get_session(self) -> requests.Session:
+        """Return the pooled session, dropping it first if it has been idle too long"""
+        with self._session_lock:
+            now = time.monotonic()
+            if self._session is not None and now - self._last_used > self.idle_timeout:
+                # The device has most likely closed the idle connections already
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                self._session = self._new_session()
+            self._last_used = now
+            return self._session
 
-    def _make_request(self, method: str, url: str, data: Optional[Dict] = None) -> requests.Response:
-        """Make HTTP request with proper error handling"""
-        print("url:", url)
-        print(data)
-        print(method)
+    def _make_request(self, method: str, url: str, data: Optional[Union[Dict, bytes]] = None,
+                      headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        """Make HTTP request with proper error handling; bytes bodies are sent as already encoded"""
+        logger.debug("%s %s", method, url)
+        if data is not None:
+            # Formatted only when debug logging is enabled
+            logger.debug("payload: %s", data)
 
+        # Invalidated again once the write is answered: a read sent meanwhile
+        # may have cached the config from before it
+        write = self.cache is not None and method not in ("GET", "HEAD")
+        if write:
+            self.cache.invalidate(url)
+
+        body = data if data is None or isinstance(data, bytes) else self.codec.dumps(data)
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                json=data,
-                auth=self.auth,
-                headers=HEADERS,
-                verify=False,
-                timeout=30
-            )
-            return response
+            if self.limiter is None:
+                return self._send(method, url, body, headers, stream)
+            return self.limiter.call(method, lambda: self._send(method, url, body, headers, stream))
         except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
+            logger.warning("%s %s failed: %s", method, url, e)
             raise
+        finally:
+            if write:
+                self.cache.invalidate(url)
+
+    def _send(self, method: str, url: str, body: Optional[bytes], headers: Optional[Dict[str, str]],
+              stream: bool) -> requests.Response:
+        """Single attempt of a request, traced and recorded"""
+        # The span is current only while the request is sent, so connection
+        # phases cannot land in it later; _decode finds it through the response
+        tracing = self.tracer.span(self.device_name, method, url) if self.tracer is not None \
+            else contextlib.nullcontext()
+        with tracing as span:
+            start = time.perf_counter()
+            session = self._get_session() if self.keep_alive else self._new_session()
+            try:
+                response = session.request(
+                    method=method,
+                    url=url,
+                    data=body,
+                    headers=headers,
+                    # Traced requests read the body separately to time it
+                    stream=stream or span is not None,
+                    verify=False,
+                    timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as e:
+                self._record(method, url, None, start, e.request.body if e.request is not None else None, 0, str(e))
+                raise
+            finally:
+                if not self.keep_alive:
+                    # The device closes its end after answering; a closed pool
+                    # closes the connection instead of offering it to the next call
+                    # (a streamed one once its body has been read)
+                    session.close()
+
+            if span is not None:
+                response.trace_span = span
+                span.status_code = response.status_code
+                headers_received = time.perf_counter()
+                span.add("ttfb", span.end, headers_received)
+                if not stream:
+                    response.content
+                    span.add("body", headers_received, time.perf_counter())
+
+        # Streamed bodies are not read yet; count what the device announced
+        received = int(response.headers.get("Content-Length", 0)) if stream else len(response.content)
+        self._record(method, url, response.status_code, start, response.request.body, received)
+        return response
+
+    def _record(self, method: str, url: str, status_code: Optional[int], start: float,
+                request_body: Any, received: int, error: Optional[str] = None):
+        if self.metrics is not None:
+            self.metrics.record(RequestRecord(
+                self.device_name, method, url, request_type(url), status_code,
+                time.perf_counter() - start, body_size(request_body), received, error))
+
+    def _decode(self, response: requests.Response) -> Any:
+        """Decode the response body, timed as the json_decode phase of the request span when tracing"""
+        span = getattr(response, "trace_span", None)
+        if span is None:
+            return self.codec.loads(response.content)
+        start = time.perf_counter()
+        data = self.codec.loads(response.content)
+        span.add("json_decode", start, time.perf_counter())
+        return data
+
+    def _result(self, response: requests.Response, ok_only: bool = False) -> Mapping[str, Any]:
+        """
+        Result {"status_code", "data"} of a request
+
+        The body is decoded on first access to "data" (immediately when
+        tracing, so the decode lands in the span of its request). With
+        ok_only, data is None unless the status is 200.
+        """
+        content = response.content if not ok_only or response.status_code == 200 else None
+        if self.tracer is not None:
+            return {"status_code": response.status_code, "data": self._decode(response) if content else None}
+        return LazyResult(response.status_code, content, self.codec.loads)
+
+    def _read(self, url: str, revalidate: bool = False) -> Mapping[str, Any]:
+        """
+        GET a subtree, going through the read cache if the handler has one
+
+        Fresh entries are served without a request. Stale ones (or all of them
+        with revalidate=True) are revalidated with a conditional GET when the
+        device gave an ETag or Last-Modified header.
+        """
+        if self.cache is None:
+            return self._result(self._make_request("GET", url), ok_only=True)
+
+        entry = self.cache.get(url)
+        if entry is not None and not revalidate and self.cache.is_fresh(entry):
+            self.cache.count(hits=1)
+            return entry.result()
+
+        # Results of a read overlapping a write are returned but not cached
+        generation = self.cache.generation
+        response = self._make_request("GET", url, headers=entry.validators() if entry else None)
+        if response.status_code == 304 and entry is not None:
+            self.cache.count(revalidations=1)
+            self.cache.touch(url, generation)
+            return entry.result()
+
+        self.cache.count(misses=1)
+        data = self._decode(response) if response.status_code == 200 else None
+        if response.status_code == 200:
+            self.cache.put(url, response.status_code, data,
+                           response.headers.get("ETag"), response.headers.get("Last-Modified"), generation)
+        return {"status_code": response.status_code, "data": data}
 
     def test_connection(self) -> bool:
         """Test if device is reachable and RESTCONF is enabled"""
         try:
+            # HEAD returns the same status as GET without downloading the subtree
             url = f"{self.base_url}/ietf-interfaces:interfaces"
-            response = self._make_request("GET", url)
+            response = self._make_request("HEAD", url)
             return response.status_code == 200
         except:
             return False
 
     # Interface Management
-    def get_interfaces(self) -> Dict[str, Any]:
+    def get_interfaces(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                       content: Optional[str] = None) -> Mapping[str, Any]:
         """Get all interfaces configuration"""
-        url = self._build_url(RequestType.INTERFACE).rstrip("=")
-        response = self._make_request("GET", url)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.status_code == 200 else None
-        }
+        url = with_query(self._build_url(RequestType.INTERFACE).rstrip("="), depth, fields, content)
+        return self._read(url)
 
-    def get_interface(self, interface: str) -> Dict[str, Any]:
+    def get_interface(self, interface: str, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                      content: Optional[str] = None) -> Mapping[str, Any]:
         """Get specific interface configuration"""
-        url = self._build_url(RequestType.INTERFACE, interface=interface)
-        response = self._make_request("GET", url)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.status_code == 200 else None
-        }
+        url = with_query(self._build_url(RequestType.INTERFACE, interface=interface), depth, fields, content)
+        return self._read(url)
 
-    def update_interface(self, interface_config) -> Dict[str, Any]:
+    def get_interface_entry(self, interface: str, *, depth: Union[int, str, None] = None,
+                            fields: Optional[str] = None, content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get configuration of a single GigabitEthernet interface"""
+        url = with_query(self._build_url(RequestType.INTERFACE_ENTRY, interface=interface), depth, fields, content)
+        return self._read(url)
+
+    def update_interface(self, interface_config) -> Mapping[str, Any]:
         """Update interface configuration"""
         url = self._build_url(RequestType.INTERFACE, interface=interface_config.name)
         response = self._make_request("PATCH", url, interface_config.to_yang2())
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.text else None
-        }
+        return self._result(response)
+
+    def update_interfaces(self, interface_configs: List[Any], max_payload: int = 64 * 1024,
+                          isolate_failures: bool = True) -> Mapping[str, Any]:
+        """
+        Update many interfaces with as few PATCH requests as possible
+
+        Args:
+            interface_configs: InterfaceConfig objects of any native type
+                (GigabitEthernet, Loopback, Port-channel, subinterfaces, ...)
+            max_payload: Maximum size of a single request body in bytes
+            isolate_failures: Resend the interfaces of a rejected batch one by
+                one, so only the interfaces the device refuses are reported
+
+        Returns:
+            status_code and data of the first failed request (of the last one
+            if all succeeded), "interfaces" mapping every interface name to the
+            status of the request which carried it and "requests" with the
+            number of PATCH requests sent
+        """
+        url = self._build_url(RequestType.INTERFACES)
+        update = self._interface_update(interface_configs, max_payload, isolate_failures)
+        for body, configs in update:
+            response = self._make_request("PATCH", url, body)
+            update.record(configs, response.status_code, lambda: self._decode(response) if response.content else None)
+        return update.result
 
     # VRF Management
-    def get_vrfs(self) -> Dict[str, Any]:
+    def get_vrfs(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                 content: Optional[str] = None) -> Mapping[str, Any]:
         """Get all VRF configurations"""
-        url = self._build_url(RequestType.VRF)
-        response = self._make_request("GET", url)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.status_code == 200 else None
-        }
+        url = with_query(self._build_url(RequestType.VRF), depth, fields, content)
+        return self._read(url)
 
-    def get_vrf(self, vrf_name: str) -> Dict[str, Any]:
+    def get_vrf(self, vrf_name: str, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                content: Optional[str] = None) -> Mapping[str, Any]:
         """Get specific VRF configuration"""
-        url = self._build_url(RequestType.VRF_PATCH, vrf=vrf_name)
-        response = self._make_request("GET", url)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.status_code == 200 else None
-        }
+        url = with_query(self._build_url(RequestType.VRF_PATCH, vrf=vrf_name), depth, fields, content)
+        return self._read(url)
 
-    def patch_vrf(self, vrf_config, name) -> Dict[str, Any]:
+    def patch_vrf(self, vrf_config, name) -> Mapping[str, Any]:
         """Create VRF configuration"""
         url = self._build_url(RequestType.VRF_PATCH, vrf=name)
         response = self._make_request("PATCH", url, vrf_config.to_yang())
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.text else None
-        }
+        return self._result(response)
 
-    def create_vrf_from_yang(self, vrf_config) -> Dict[str, Any]:
+    def create_vrf_from_yang(self, vrf_config) -> Mapping[str, Any]:
         """Create VRF configuration"""
         url = self._build_url(RequestType.VRF)
         response = self._make_request("POST", url, vrf_config)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.text else None
-        }
+        return self._result(response)
 
-    def assign_vrf_to_interface(self, interface: str, vrf_name: str) -> Dict[str, Any]:
+    def assign_vrf_to_interface(self, interface: str, vrf_name: str) -> Mapping[str, Any]:
         """Assign VRF to interface for route leaking"""
-        # This modifies the interface to include VRF assignment
-        interface_data = {
-            "ietf-interfaces:interface": {
-                "name": interface,
-                "Cisco-IOS-XE-native:vrf": {
-                    "forwarding": vrf_name
-                }
-            }
-        }
         url = self._build_url(RequestType.INTERFACE, interface=interface)
-        response = self._make_request("PATCH", url, interface_data)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.text else None
-        }
+        response = self._make_request("PATCH", url, self._assign_vrf_body(interface, vrf_name))
+        return self._result(response)
 
     # BGP Configuration for Route Leaking
-    def get_bgp_config(self) -> Dict[str, Any]:
+    def get_bgp_config(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                       content: Optional[str] = None) -> Mapping[str, Any]:
         """Get BGP configuration"""
-        url = self._build_url(RequestType.BGP)
-        response = self._make_request("GET", url)
-        return {
-            "status_code": response.status_code,
-            "data": response.json() if response.status_code == 200 else None
-        }
+        url = with_query(self._build_url(RequestType.BGP), depth, fields, content)
+        return self._read(url)
 
-    def create_bgp(self, as_number: int, vrf_name: str, rd: str, import_rt: str,
-                   export_rt: str) -> Dict[str, Any]:
-        """Create BGP configuration"""
-        print(vrf_name)
-        bgp_config = {
-            "Cisco-IOS-XE-bgp:bgp": [
-                {
-                    "id": 65500,
-                    "bgp": {
-                        "log-neighbor-changes": False,
-                        "router-id": {
-                            "ip-id": "1.1.1.1"
-                        }
-                    },
-                    "address-family": {
-                        "with-vrf": {
-                            "ipv4": [
-                                {
-                                    "af-name": "unicast",
-                                    "vrf": [
-                                        {
-                                            "name": "CUSTOMER_A",
-                                            "ipv4-unicast": {
-                                                "redistribute-vrf": {
-                                                    "connected": {},
-                                                    "ospf": [
-                                                        {
-                                                            "id": 101
-                                                        }
-                                                    ]
-                                                }
-                                            }
-                                        },
-                                        {
-                                            "name": "CUSTOMER_B",
-                                            "ipv4-unicast": {
-                                                "redistribute-vrf": {
-                                                    "connected": {},
-                                                    "ospf": [
-                                                        {
-                                                            "id": 102
-                                                        }
-                                                    ]
-                                                }
-                                            }
-                                        }
-                                    ]
-                                }
-                            ]
-                        }
-                    }
-                }
-            ]
-        }
+    def create_bgp(self, as_number: int, vrf_name: str, ospf_ids: List[int] = (),
+                   router_id: Optional[str] = None) -> Mapping[str, Any]:
+        """
+        Add a single VRF to the BGP process without resending the other VRFs
+
+        Only the router/bgp subtree is patched; the VRF itself is configured
+        with create_vrf and patch_vrf.
+
+        Args:
+            as_number: AS number of the BGP process
+            vrf_name: VRF getting an ipv4 unicast address family
+            ospf_ids: OSPF processes of the VRF redistributed into BGP
+            router_id: BGP router-id set on the process in the same request
+        """
+        logger.debug("Configuring BGP for VRF %s", vrf_name)
+        body = self._bgp_vrf_body(as_number, vrf_name, ospf_ids, router_id)
+        response = self._make_request("PATCH", self._build_url(RequestType.BGP), body)
+        return self._result(response)
+
+    def configure_bgp(self, as_number: int, vrfs: List[VrfConfig], ospf_processes: List[OspfConfig] = (),
+                      router_id: Optional[str] = None) -> Mapping[str, Any]:
+        """Merge address families for all given VRFs into the BGP process in one request"""
         url = self._build_url(RequestType.BGP)
-        response = self._make_request("PATCH", url, bgp_config)
+        response = self._make_request("PATCH", url, self._bgp_body(as_number, vrfs, ospf_processes, router_id))
+        return self._result(response)
+
+    def remove_bgp_vrf(self, as_number: int, vrf_name: str) -> Mapping[str, Any]:
+        """Remove the address family of a single VRF from the BGP process"""
+        url = self._build_url(RequestType.BGP_VRF, as_number=as_number, vrf=vrf_name)
+        response = self._make_request("DELETE", url)
+        return self._result(response)
+
+    # OSPF Configuration
+    def get_ospf_config(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                        content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get OSPF configuration"""
+        url = with_query(self._build_url(RequestType.OSPF), depth, fields, content)
+        return self._read(url)
+
+    def create_ospfs(self, processes: List[OspfConfig]) -> Mapping[str, Any]:
+        """Merge the given OSPF processes; other processes on the device are left alone"""
+        url = self._build_url(RequestType.OSPF)
+        response = self._make_request("PATCH", url, self._ospf_body(processes))
+        return self._result(response)
+
+    def remove_ospf_process(self, process_id: int, vrf: str) -> Mapping[str, Any]:
+        """Remove a single OSPF process"""
+        url = self._build_url(RequestType.OSPF_PROCESS, process_id=process_id, vrf=vrf)
+        response = self._make_request("DELETE", url)
+        return self._result(response)
+
+    # Whole configuration
+    def get_native(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                   content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get the complete native configuration tree"""
+        url = with_query(self._build_url(RequestType.NATIVE), depth, fields, content)
+        return self._read(url)
+
+    # Streaming reads of large configurations
+    def iter_config(self, paths: List[str], chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (path, subtree) for parts of the native config matching paths
+
+        The body is parsed while it is downloaded and only the matching
+        subtrees are built, e.g. paths=["native/vrf/definition[*]"] yields
+        every VRF definition one by one. Nothing is yielded on an error status.
+        """
+        url = self._build_url(RequestType.NATIVE)
+        response = self._make_request("GET", url, stream=True)
+        try:
+            if response.status_code == 200:
+                yield from iter_response(response, paths, chunk_size)
+        finally:
+            response.close()
+
+    # Transactional configuration
+    def send_yang_patch(self, patch: YangPatch) -> Mapping[str, Any]:
+        """
+        Apply all edits of a YANG Patch in a single request
+
+        The device applies the edits atomically: either all of them succeed or
+        none is applied. "edits" maps every edit id to "ok" or an error message.
+        """
+        url = self._build_url(RequestType.NATIVE)
+        response = self._make_request("PATCH", url, patch.encoded(self.codec), headers=YANG_PATCH_HEADERS)
+        data = self._decode(response) if response.content else None
         return {
             "status_code": response.status_code,
-            "data": response.json() if response.text else None
+            "data": data,
+            "edits": edit_statuses(patch, response.status_code, data)
         }
 
+    # Idempotent configuration: plan only the leaves that differ, then apply
+    def _plan(self, name: str, read_url: str, method: str, write_url: str, desired: Dict[str, Any]) -> Change:
+        running = self._read(read_url)
+        if running["status_code"] != 200:
+            return Change(name, method, write_url, desired)
+        return Change(name, method, write_url, diff(desired, running["data"]))
 
-    def create_ospfs(self):
-        ospf_config = {
-            "Cisco-IOS-XE-ospf:router-ospf": {
-                "ospf": {
-                    "process-id-vrf": [
-                        {
-                            "id": 101,
-                            "vrf": "CUSTOMER_A",
-                            "network": [
-                                {
-                                    "ip": "11.0.0.0",
-                                    "wildcard": "0.255.255.255",
-                                    "area": 11
-                                }
-                            ],
-                            "capability": {
-                                "vrf-lite": True
-                            }
-                        },
-                        {
-                            "id": 102,
-                            "vrf": "CUSTOMER_B",
-                            "network": [
-                                {
-                                    "ip": "12.0.0.0",
-                                    "wildcard": "0.255.255.255",
-                                    "area": 12
-                                }
-                            ],
-                            "capability": {
-                                "vrf-lite": True
-                            }
-                        }
-                    ]
-                }
-            }
-        }
+    def plan_vrf(self, vrf_config) -> Change:
+        """Change converging a VRF definition; a missing VRF is created with POST"""
+        name = f"vrf {vrf_config.name}"
+        url = self._build_url(RequestType.VRF_PATCH, vrf=vrf_config.name)
+        desired = vrf_config.to_yang()
+        running = self._read(url)
+        if running["status_code"] != 200:
+            # PATCH of a non-existent list entry fails, so create it instead
+            return Change(name, "POST", self._build_url(RequestType.VRF), desired)
+        return Change(name, "PATCH", url, diff(desired, running["data"]))
 
+    def plan_interface(self, interface_config) -> Change:
+        """Change converging a GigabitEthernet interface"""
+        return self._plan(
+            f"interface {interface_config.name}",
+            self._build_url(RequestType.INTERFACE_ENTRY, interface=interface_config.name),
+            "PATCH",
+            self._build_url(RequestType.INTERFACE, interface=interface_config.name),
+            interface_config.to_yang2()
+        )
+
+    def plan_ospf(self, ospf_body: Dict[str, Any]) -> Change:
+        """Change converging the OSPF processes"""
         url = self._build_url(RequestType.OSPF)
-        response = self._make_request("PATCH", url, ospf_config)
+        return self._plan("ospf", url, "PATCH", url, ospf_body)
+
+    def plan_bgp(self, bgp_body: Dict[str, Any]) -> Change:
+        """Change converging the BGP process"""
+        url = self._build_url(RequestType.BGP)
+        return self._plan("bgp", url, "PATCH", url, bgp_body)
+
+    def apply(self, plan: Plan) -> Dict[str, Mapping[str, Any]]:
+        """Send the pending changes of a plan in order; up-to-date objects cost nothing"""
+        results = {}
+        for change in plan.pending:
+            response = self._make_request(change.method, change.url, change.body)
+            results[change.name] = self._result(response)
+        return results
+
+    # Change detection
+    def get_if_changed(self, url: str, etag: Optional[str] = None, body: bool = True) -> Mapping[str, Any]:
+        """
+        Conditional GET of a subtree, bypassing the read cache
+
+        Returns status_code, etag and data. Given the ETag from a previous
+        read, the device answers 304 without a body while the subtree is
+        unchanged. body=False sends HEAD, for when only the ETag is needed.
+        """
+        response = self._make_request("GET" if body else "HEAD", url,
+                                      headers={"If-None-Match": etag} if etag else None)
+        data = self._decode(response) if body and response.status_code == 200 else None
         return {
             "status_code": response.status_code,
-            "data": response.json() if response.text else None
+            "etag": response.headers.get("ETag", etag if response.status_code == 304 else None),
+            "data": data
         }
+
+    # Waiting for configuration to be applied
+    def wait_for_vrf(self, name: str, rd: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """Wait until the VRF exists (and has the given RD, if specified)"""
+        url = with_query(self._build_url(RequestType.VRF_PATCH, vrf=name), fields="name;rd")
+        return wait_until_applied(
+            lambda: self._read(url, revalidate=True),
+            lambda vrf: rd is None or vrf.get("rd") == rd,
+            timeout=timeout
+        )
+
+    def wait_for_interface(self, interface_config, timeout: float = 30.0) -> bool:
+        """Wait until the interface is in its VRF"""
+        url = with_query(self._build_url(RequestType.INTERFACE_ENTRY, interface=interface_config.name),
+                         fields="name;vrf")
+        return wait_until_applied(
+            lambda: self._read(url, revalidate=True),
+            lambda iface: not interface_config.vrf
+                          or iface.get("vrf", {}).get("forwarding") == interface_config.vrf,
+            timeout=timeout
+        )
+
+    def wait_for_ospf(self, process_ids, timeout: float = 30.0) -> bool:
+        """Wait until all given OSPF processes are configured"""
+        def has_processes(ospf):
+            configured = {process["id"] for process in ospf.get("process-id-vrf", [])}
+            return set(process_ids) <= configured
+
+        url = with_query(self._build_url(RequestType.OSPF), fields="ospf/process-id-vrf/id")
+        return wait_until_applied(
+            lambda: self._read(url, revalidate=True),
+            lambda router_ospf: has_processes(router_ospf.get("ospf", {})),
+            timeout=timeout
+        )
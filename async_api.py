@@ -0,0 +1,295 @@
+import asyncio
+import base64
+import logging
+import time
+from typing import Optional, Dict, Any, List, Mapping, Union
+
+import aiohttp
+
+from codec import DEFAULT_CODEC, LazyResult
+from api import HEADERS, RequestType, RestConfBase, request_type
+from instrumentation import Metrics, RequestRecord
+from models.interface import VrfConfig
+from models.routing import OspfConfig
+from query import with_query
+from yang_patch import YANG_PATCH_HEADERS, YangPatch, edit_statuses
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRestConfPool:
+    """
+    Shared connection pool for many AsyncRestConfHandler instances
+
+    One aiohttp session serves every device, so the global limit caps the
+    number of open connections across the fleet and the per-device limit
+    caps the number of concurrent requests sent to a single router.
+    """
+
+    def __init__(self, global_limit: int = 1000, per_device_limit: int = 4,
+                 keepalive_timeout: float = 60.0, timeout: float = 30.0,
+                 metrics: Optional[Metrics] = None):
+        """
+        Initialize shared pool
+
+        Args:
+            global_limit: Maximum number of connections across all devices
+            per_device_limit: Maximum number of connections to a single device
+            keepalive_timeout: Seconds after which idle connections are closed
+            timeout: Total timeout of a single request in seconds
+            metrics: Collector shared by every handler created with handler()
+        """
+        self.global_limit = global_limit
+        self.per_device_limit = per_device_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.metrics = metrics
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Lazily created session; it has to be created inside a running event loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.global_limit,
+                limit_per_host=self.per_device_limit,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=False
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def handler(self, ip_addr: str, username: str = "agh", password: str = "xd",
+                port: int = 443) -> "AsyncRestConfHandler":
+        """Create a handler for a device which sends its requests through this pool"""
+        return AsyncRestConfHandler(ip_addr, username, password, port, pool=self, metrics=self.metrics)
+
+    async def close(self):
+        """Close every connection in the pool"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncRestConfHandler(RestConfBase):
+    """
+    Asyncio counterpart of RestConfHandler
+
+    Exposes the same methods as coroutines. Handlers created without a pool
+    get a private one sized for a single device.
+    """
+
+    def __init__(self, ip_addr: str, username: str = "agh", password: str = "xd", port: int = 443,
+                 pool: Optional[AsyncRestConfPool] = None, metrics: Optional[Metrics] = None,
+                 codec=DEFAULT_CODEC):
+        """
+        Initialize asynchronous RESTCONF handler
+
+        Args:
+            ip_addr: IP address of the network device
+            username: Authentication username
+            password: Authentication password
+            port: HTTPS port of the RESTCONF server
+            pool: Shared connection pool; a private one is created if omitted
+            metrics: Collector receiving a RequestRecord for every request
+            codec: JSON codec from codec.py, orjson when it is installed
+        """
+        super().__init__(ip_addr, username, password, port)
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else AsyncRestConfPool()
+        # Encoded once; the pool may be shared by devices with other credentials
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode("ascii")
+        self._headers = {"Authorization": f"Basic {credentials}"}
+        self.metrics = metrics
+        self.codec = codec
+
+    async def close(self):
+        """Close the private pool; shared pools are closed by their owner"""
+        if self._owns_pool:
+            await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _make_request(self, method: str, url: str, data: Optional[Union[Dict, bytes]] = None,
+                            headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Make HTTP request and return the status code together with the raw body"""
+        logger.debug("%s %s", method, url)
+        if data is not None:
+            logger.debug("payload: %s", data)
+
+        # Serialized here so the request size is known without encoding twice
+        payload = data if data is None or isinstance(data, bytes) else self.codec.dumps(data)
+        request_headers = {**self._headers, **headers} if headers else self._headers
+        start = time.perf_counter()
+        try:
+            async with self.pool.session.request(method, url, data=payload, headers=request_headers) as response:
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("%s %s failed: %s", method, url, e)
+            self._record(method, url, None, start, payload, b"", str(e) or type(e).__name__)
+            raise
+        self._record(method, url, response.status, start, payload, body)
+        return {"status_code": response.status, "body": body}
+
+    def _record(self, method: str, url: str, status_code: Optional[int], start: float,
+                payload: Optional[bytes], body: bytes, error: Optional[str] = None):
+        if self.metrics is not None:
+            self.metrics.record(RequestRecord(
+                self.device_name, method, url, request_type(url), status_code,
+                time.perf_counter() - start, len(payload) if payload else 0, len(body), error))
+
+    def _read_result(self, response: Dict[str, Any]) -> Mapping[str, Any]:
+        body = response["body"] if response["status_code"] == 200 else None
+        return LazyResult(response["status_code"], body, self.codec.loads)
+
+    def _write_result(self, response: Dict[str, Any]) -> Mapping[str, Any]:
+        return LazyResult(response["status_code"], response["body"], self.codec.loads)
+
+    async def test_connection(self) -> bool:
+        """Test if device is reachable and RESTCONF is enabled"""
+        try:
+            url = f"{self.base_url}/ietf-interfaces:interfaces"
+            response = await self._make_request("HEAD", url)
+            return response["status_code"] == 200
+        except Exception:
+            return False
+
+    # Interface Management
+    async def get_interfaces(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                             content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get all interfaces configuration"""
+        url = with_query(self._build_url(RequestType.INTERFACE).rstrip("="), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def get_interface(self, interface: str, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                            content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get specific interface configuration"""
+        url = with_query(self._build_url(RequestType.INTERFACE, interface=interface), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def get_interface_entry(self, interface: str, *, depth: Union[int, str, None] = None,
+                                  fields: Optional[str] = None, content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get configuration of a single GigabitEthernet interface"""
+        url = with_query(self._build_url(RequestType.INTERFACE_ENTRY, interface=interface), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def update_interface(self, interface_config) -> Mapping[str, Any]:
+        """Update interface configuration"""
+        url = self._build_url(RequestType.INTERFACE, interface=interface_config.name)
+        return self._write_result(await self._make_request("PATCH", url, interface_config.to_yang2()))
+
+    async def update_interfaces(self, interface_configs: List[Any], max_payload: int = 64 * 1024,
+                                isolate_failures: bool = True) -> Mapping[str, Any]:
+        """Update many interfaces with as few PATCH requests as possible, see RestConfHandler"""
+        url = self._build_url(RequestType.INTERFACES)
+        update = self._interface_update(interface_configs, max_payload, isolate_failures)
+        for body, configs in update:
+            response = await self._make_request("PATCH", url, body)
+            update.record(configs, response["status_code"], lambda: self._write_result(response)["data"])
+        return update.result
+
+    # VRF Management
+    async def get_vrfs(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                       content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get all VRF configurations"""
+        url = with_query(self._build_url(RequestType.VRF), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def get_vrf(self, vrf_name: str, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                      content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get specific VRF configuration"""
+        url = with_query(self._build_url(RequestType.VRF_PATCH, vrf=vrf_name), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def patch_vrf(self, vrf_config, name) -> Mapping[str, Any]:
+        """Create VRF configuration"""
+        url = self._build_url(RequestType.VRF_PATCH, vrf=name)
+        return self._write_result(await self._make_request("PATCH", url, vrf_config.to_yang()))
+
+    async def create_vrf_from_yang(self, vrf_config) -> Mapping[str, Any]:
+        """Create VRF configuration"""
+        url = self._build_url(RequestType.VRF)
+        return self._write_result(await self._make_request("POST", url, vrf_config))
+
+    async def assign_vrf_to_interface(self, interface: str, vrf_name: str) -> Mapping[str, Any]:
+        """Assign VRF to interface for route leaking"""
+        url = self._build_url(RequestType.INTERFACE, interface=interface)
+        return self._write_result(
+            await self._make_request("PATCH", url, self._assign_vrf_body(interface, vrf_name))
+        )
+
+    # BGP Configuration for Route Leaking
+    async def get_bgp_config(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                             content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get BGP configuration"""
+        url = with_query(self._build_url(RequestType.BGP), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def create_bgp(self, as_number: int, vrf_name: str, ospf_ids: List[int] = (),
+                         router_id: Optional[str] = None) -> Mapping[str, Any]:
+        """Add a single VRF to the BGP process, see RestConfHandler.create_bgp"""
+        body = self._bgp_vrf_body(as_number, vrf_name, ospf_ids, router_id)
+        return self._write_result(await self._make_request("PATCH", self._build_url(RequestType.BGP), body))
+
+    async def configure_bgp(self, as_number: int, vrfs: List[VrfConfig], ospf_processes: List[OspfConfig] = (),
+                            router_id: Optional[str] = None) -> Mapping[str, Any]:
+        """Merge address families for all given VRFs into the BGP process in one request"""
+        url = self._build_url(RequestType.BGP)
+        return self._write_result(
+            await self._make_request("PATCH", url, self._bgp_body(as_number, vrfs, ospf_processes, router_id))
+        )
+
+    async def remove_bgp_vrf(self, as_number: int, vrf_name: str) -> Mapping[str, Any]:
+        """Remove the address family of a single VRF from the BGP process"""
+        url = self._build_url(RequestType.BGP_VRF, as_number=as_number, vrf=vrf_name)
+        return self._write_result(await self._make_request("DELETE", url))
+
+    # OSPF Configuration
+    async def get_ospf_config(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                              content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get OSPF configuration"""
+        url = with_query(self._build_url(RequestType.OSPF), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    async def create_ospfs(self, processes: List[OspfConfig]) -> Mapping[str, Any]:
+        """Merge the given OSPF processes; other processes on the device are left alone"""
+        url = self._build_url(RequestType.OSPF)
+        return self._write_result(await self._make_request("PATCH", url, self._ospf_body(processes)))
+
+    async def remove_ospf_process(self, process_id: int, vrf: str) -> Mapping[str, Any]:
+        """Remove a single OSPF process"""
+        url = self._build_url(RequestType.OSPF_PROCESS, process_id=process_id, vrf=vrf)
+        return self._write_result(await self._make_request("DELETE", url))
+
+    # Whole configuration
+    async def get_native(self, *, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                         content: Optional[str] = None) -> Mapping[str, Any]:
+        """Get the complete native configuration tree"""
+        url = with_query(self._build_url(RequestType.NATIVE), depth, fields, content)
+        return self._read_result(await self._make_request("GET", url))
+
+    # Transactional configuration
+    async def send_yang_patch(self, patch: YangPatch) -> Mapping[str, Any]:
+        """Apply all edits of a YANG Patch in a single request"""
+        url = self._build_url(RequestType.NATIVE)
+        response = await self._make_request("PATCH", url, patch.encoded(self.codec), headers=YANG_PATCH_HEADERS)
+        data = self.codec.loads(response["body"]) if response["body"] else None
+        return {
+            "status_code": response["status_code"],
+            "data": data,
+            "edits": edit_statuses(patch, response["status_code"], data)
+        }
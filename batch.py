@@ -0,0 +1,213 @@
+"""
+Non-interactive execution of RouteLeakingCli scripts.
+
+A script holds one CLI command per line ("#" starts a comment). Every command
+is routed to a device: the one given by its --ip, otherwise the one selected
+by the last "connect" or "use" line. Commands for the same device run in
+script order on their own RouteLeakingCli; different devices run in parallel.
+
+    python cli.py script.txt [--workers N] [--stop-on-error] [--json]
+    cat script.txt | python cli.py - --json
+"""
+import contextlib
+import dataclasses
+import io
+import json
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cli import COMMANDS, CONNECTION_PORT, RouteLeakingCli
+
+DeviceKey = Tuple[str, Optional[int]]  # ip, port (None for a "use"/"disconnect" of an IP never connected)
+
+
+@dataclasses.dataclass
+class CommandResult:
+    """Outcome of a single script line"""
+    line_no: int
+    command: str
+    device: Optional[str]
+    failures: List[str]
+    output: str = ""
+    duration: float = 0.0
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures and not self.skipped
+
+
+@dataclasses.dataclass
+class ScriptReport:
+    results: List[CommandResult]
+    wall_time: float
+
+    @property
+    def failed(self) -> List[CommandResult]:
+        return [result for result in self.results if not result.ok]
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """sys.stdout replacement sending each worker's prints to its own buffer"""
+
+    def __init__(self, target):
+        self._target = target
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self):
+        buffer = self._local.buffer = io.StringIO()
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._target).write(text)
+
+    def flush(self):
+        if getattr(self._local, "buffer", None) is None:
+            self._target.flush()
+
+
+def _option(tokens: List[str], name: str) -> Optional[str]:
+    """Value of --name in either "--name value" or "--name=value" form"""
+    for index, token in enumerate(tokens):
+        if token == name and index + 1 < len(tokens):
+            return tokens[index + 1]
+        if token.startswith(name + "="):
+            return token[len(name) + 1:]
+    return None
+
+
+def _device_name(key: DeviceKey) -> str:
+    ip, port = key
+    return ip if port in (None, 443) else f"{ip}:{port}"
+
+
+def plan_script(lines: Iterable[str]) -> Tuple[Dict[DeviceKey, List[Tuple[int, str]]], List[CommandResult]]:
+    """
+    Split a script into per-device command queues
+
+    Returns the queues in order of first appearance, and results for lines
+    which could not be routed to any device.
+    """
+    queues: Dict[DeviceKey, List[Tuple[int, str]]] = {}
+    unrouted = []
+    current: Optional[DeviceKey] = None
+
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            tokens = shlex.split(line)
+        except ValueError as e:
+            unrouted.append(CommandResult(line_no, line, None, [f"Niepoprawna linia: {e}"]))
+            continue
+        command = tokens[0]
+        if command in ("quit", "EOF"):
+            break
+
+        ip = _option(tokens, "--ip")
+        port = _option(tokens, "--port")
+        key = None
+        if ip is not None:
+            if port is None and COMMANDS.get(command, {}).get("connection"):
+                # Device commands connect to port 443 unless given --port, like in the CLI
+                port = str(CONNECTION_PORT)
+            key = (ip, int(port) if port and port.isdigit() else None)
+            if key[1] is None:
+                # 'use' and 'disconnect' without --port pick the session this IP was connected with
+                key = next((known for known in reversed(list(queues)) if known[0] == ip), key)
+        elif command != "use":
+            key = current
+
+        if command == "use":
+            if key is None or key not in queues:
+                unrouted.append(CommandResult(line_no, line, ip, ["BŁĄD: 'use' wskazuje urządzenie bez 'connect'."]))
+            else:
+                current = key
+            continue  # only changes routing, the per-device CLIs need no 'use'
+        if key is None:
+            unrouted.append(CommandResult(line_no, line, None,
+                                          ["BŁĄD: Nie wybrano urządzenia. Podaj --ip albo użyj 'connect'."]))
+            continue
+
+        queues.setdefault(key, []).append((line_no, line))
+        if command == "connect":
+            current = key
+        elif command == "disconnect" and key == current:
+            current = None
+    return queues, unrouted
+
+
+def _run_device(key: DeviceKey, commands: List[Tuple[int, str]], stdout: _ThreadLocalStdout,
+                stop_on_error: bool) -> List[CommandResult]:
+    cli = RouteLeakingCli()
+    results = []
+    failed = False
+    try:
+        for line_no, line in commands:
+            if failed and stop_on_error:
+                results.append(CommandResult(line_no, line, _device_name(key), [], skipped=True))
+                continue
+            start = time.perf_counter()
+            with stdout.capture() as output:
+                failures = cli.run_command(line)
+            results.append(CommandResult(line_no, line, _device_name(key), failures, output.getvalue(),
+                                         time.perf_counter() - start))
+            failed = failed or bool(failures)
+    finally:
+        cli.sessions.close()
+    return results
+
+
+def run_script(lines: Iterable[str], workers: int = 8, stop_on_error: bool = False) -> ScriptReport:
+    """
+    Run a CLI script, devices in parallel and each device's commands in order
+
+    Args:
+        lines: Script lines
+        workers: Maximum number of devices handled at once
+        stop_on_error: Skip the remaining commands of a device after its first failure
+    """
+    start = time.perf_counter()
+    queues, results = plan_script(lines)
+    stdout = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(_run_device, key, commands, stdout, stop_on_error)
+                       for key, commands in queues.items()]
+            for future in futures:
+                results.extend(future.result())
+    finally:
+        sys.stdout = stdout._target
+    results.sort(key=lambda result: result.line_no)
+    return ScriptReport(results, time.perf_counter() - start)
+
+
+def print_report(report: ScriptReport):
+    for result in report.results:
+        status = "SKIP" if result.skipped else "OK  " if result.ok else "FAIL"
+        print(f"[{status}] {result.line_no:>4}  {result.device or '-':<21} {result.duration:6.2f} s  {result.command}")
+        for line in result.output.splitlines():
+            print(f"        {line}")
+        for failure in result.failures:
+            if failure not in result.output:
+                print(f"        ! {failure}")
+    print(f"\nCommands: {len(report.results)} ({len(report.failed)} failed), wall time {report.wall_time:.2f} s")
+
+
+def report_json(report: ScriptReport) -> str:
+    return json.dumps({
+        "ok": not report.failed,
+        "wall_time": report.wall_time,
+        "commands": [{**dataclasses.asdict(result), "ok": result.ok} for result in report.results]
+    }, indent=2, ensure_ascii=False)
@@ -0,0 +1,47 @@
+"""
+Throughput of AsyncRestConfHandler with thousands of requests in flight.
+
+Every virtual device is a separate emulator.py device on its own port; all
+handlers share one AsyncRestConfPool. Run from the repository root:
+    python -m benchmarks.bench_async_handler [devices] [requests_per_device]
+"""
+import asyncio
+import sys
+import time
+
+from async_api import AsyncRestConfPool
+from emulator import Fleet
+
+
+async def run(ports, requests_per_device: int, per_device_limit: int):
+    async with AsyncRestConfPool(global_limit=len(ports) * per_device_limit,
+                                 per_device_limit=per_device_limit) as pool:
+        handlers = [pool.handler("127.0.0.1", port=port) for port in ports]
+        calls = [handler.get_vrfs() for handler in handlers for _ in range(requests_per_device)]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - start
+
+    failed = sum(1 for result in results if result["status_code"] != 200)
+    return len(results), failed, elapsed
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    requests_per_device = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    per_device_limit = 4
+
+    with Fleet(devices) as fleet:
+        ports = [device.port for device in fleet.devices]
+        total, failed, elapsed = asyncio.run(run(ports, requests_per_device, per_device_limit))
+
+    print(f"{total} requests in flight over {devices} devices "
+          f"(limit {per_device_limit} connections per device)")
+    print(f"wall time   {elapsed:.2f} s")
+    print(f"throughput  {total / elapsed:.0f} req/s")
+    print(f"failed      {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Cold start of cli.py and the per-command overhead of argument parsing.
+
+- import report: modules "import cli" adds to the bare interpreter, from
+  python -X importtime, and what the first device command adds on top
+  (api, requests, urllib3, ...)
+- cold start: time from launching "python cli.py" to its first prompt,
+  against the bare interpreter ("python -c pass"); the target is at most
+  TARGET_OVERHEAD_MS on top of the interpreter
+- per command: a command failing before any network access, with the parser
+  cache in place and with the parser rebuilt on every call
+
+Run from the repository root:
+    python -m benchmarks.bench_cli_startup [runs]
+"""
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from cli import RouteLeakingCli, command_parser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = b"(route leaking cli) "
+TARGET_OVERHEAD_MS = 30.0
+
+
+def import_times(statement: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) of every module imported by statement"""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+def print_import_report(statement: str, already_imported=(), top: int = 8) -> set:
+    modules = [module for module in import_times(statement) if module[0] not in already_imported]
+    total = sum(own for _, own, _ in modules)
+    print(f"{statement}: {len(modules)} modules, {total / 1000:.1f} ms")
+    for name, own, cumulative in sorted(modules, key=lambda module: -module[2])[:top]:
+        print(f"    {name:<40}{cumulative / 1000:8.1f} ms")
+    return {name for name, _, _ in modules}
+
+
+def time_to_prompt() -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "cli.py"], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    output = b""
+    while not output.endswith(PROMPT):
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            raise RuntimeError(f"cli.py exited before its prompt: {output!r}")
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.communicate(b"quit\n")
+    return elapsed
+
+
+def time_interpreter() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def time_command(line: str, runs: int, rebuild: bool) -> float:
+    cli = RouteLeakingCli()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            if rebuild:
+                command_parser.cache_clear()
+            cli.run_command(line)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    interpreter_modules = {name for name, _, _ in import_times("pass")}
+    cli_modules = print_import_report("import cli", already_imported=interpreter_modules)
+    print_import_report("import api", already_imported=interpreter_modules | cli_modules)
+
+    interpreter = statistics.median(time_interpreter() for _ in range(runs))
+    prompt = statistics.median(time_to_prompt() for _ in range(runs))
+    overhead = (prompt - interpreter) * 1000
+    print(f"\npython -c pass           {interpreter * 1000:8.1f} ms (median of {runs})")
+    print(f"cli.py to first prompt   {prompt * 1000:8.1f} ms, +{overhead:.1f} ms "
+          f"({'within' if overhead <= TARGET_OVERHEAD_MS else 'over'} the {TARGET_OVERHEAD_MS:.0f} ms target)")
+
+    line = "create_vrf --name CUSTOMER_A --rd 65000:100"
+    cached = time_command(line, 2000, rebuild=False)
+    rebuilt = time_command(line, 200, rebuild=True)
+    print(f"\ncommand, cached parser  {cached * 1e6:8.1f} us")
+    print(f"command, parser rebuilt {rebuilt * 1e6:8.1f} us ({rebuilt / cached:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
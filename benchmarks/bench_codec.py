@@ -0,0 +1,61 @@
+"""
+Client CPU spent on JSON per fleet run: json vs orjson, eager vs lazy decoding.
+
+Every device receives the route leaking YANG Patch, a batch of interface
+updates whose responses are not inspected, and one read of all interfaces. Only
+the CPU time of the client thread is counted, not the in-process emulator.
+Run from the repository root:
+    python -m benchmarks.bench_codec [devices] [writes_per_device]
+"""
+import sys
+import time
+
+from api import RestConfHandler
+from codec import DEFAULT_CODEC, StdlibCodec
+from emulator import Fleet
+from models.interface import InterfaceConfig
+import main as workflows
+
+
+def run(ports, writes_per_device: int, codec, shared_patch: bool, eager: bool) -> float:
+    interface = InterfaceConfig(name="GigabitEthernet0/0/1.100", ip_addr="10.1.100.1", ip_mask="255.255.255.0",
+                                description="Codec benchmark")
+    patch = workflows._shared_route_leaking_patch()
+    cpu = 0.0
+    for port in ports:
+        handler = RestConfHandler("127.0.0.1", port=port, codec=codec)
+        start = time.thread_time()
+        results = [handler.send_yang_patch(patch if shared_patch else workflows.build_route_leaking_patch(handler))]
+        results += [handler.update_interface(interface) for _ in range(writes_per_device)]
+        if eager:
+            for result in results:
+                result["data"]
+        native = handler.get_interfaces()["data"]
+        cpu += time.thread_time() - start
+        handler.close()
+        assert native, f"device on port {port} returned no config"
+    return cpu
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    writes_per_device = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    variants = [
+        ("json, eager decode, patch per device", StdlibCodec, False, True),
+        (f"{DEFAULT_CODEC.name}, lazy decode, shared patch", DEFAULT_CODEC, True, False),
+    ]
+    with Fleet(devices) as fleet:
+        ports = [device.port for device in fleet.devices]
+        run(ports[:1], 1, DEFAULT_CODEC, True, False)  # warm up imports and caches
+        timings = [(label, run(ports, writes_per_device, codec, shared, eager))
+                   for label, codec, shared, eager in variants]
+
+    print(f"{devices} devices, {writes_per_device} interface writes + 1 YANG Patch + 1 interfaces read each")
+    baseline = timings[0][1]
+    for label, cpu in timings:
+        print(f"{label:<42} {cpu * 1000:8.1f} ms client CPU  ({baseline / cpu:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Per-call latency of RestConfHandler with and without connection reuse,
+measured against a virtual device from emulator.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_connection_pool [calls]
+"""
+import statistics
+import sys
+import time
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+
+
+def measure(handler: RestConfHandler, calls: int):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        handler.get_vrfs()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<12} mean {statistics.mean(latencies) * 1000:7.2f} ms   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with VirtualDevice() as server:
+        # keep_alive=False forces a new TCP connection and TLS handshake per call,
+        # which is what the handler did before it owned a pool
+        with RestConfHandler("127.0.0.1", port=server.port, keep_alive=False) as fresh:
+            fresh_latencies = measure(fresh, calls)
+        with RestConfHandler("127.0.0.1", port=server.port) as pooled:
+            pooled_latencies = measure(pooled, calls)
+
+    print(f"{calls} x get_vrfs() against a local RESTCONF emulator")
+    report("fresh", fresh_latencies)
+    report("pooled", pooled_latencies)
+    print(f"speed-up     {statistics.mean(fresh_latencies) / statistics.mean(pooled_latencies):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Cost of drift polling: DriftWatcher against downloading the native tree.
+
+The emulated device holds the dumped config grown by extra VRFs and a few
+hundred loopbacks, which are not watched but make the native tree large.
+Between polls an out-of-band change is made to a VRF, an interface or BGP,
+or nothing. Every poll is done both ways; the full read compares the whole
+tree with the previous one. Requests and response bytes are counted from
+the handler metrics; latency adds a delay to every request, as on a real
+network. Run from the repository root:
+    python -m benchmarks.bench_drift [polls] [vrfs] [latency_ms]
+"""
+import copy
+import random
+import sys
+import time
+
+from api import RestConfHandler
+from drift import DriftWatcher, route_leaking_state
+from emulator import VirtualDevice
+from instrumentation import Metrics
+from models.interface import InterfaceConfig, VrfConfig
+from models.native import NATIVE, load_native
+import main as workflows
+
+
+def make_tree(vrfs: int):
+    tree = copy.deepcopy(load_native())
+    native = tree[NATIVE]
+    native["interface"]["Loopback"] = [{"name": 1000 + i, "description": f"service {i}"} for i in range(300)]
+    native["vrf"]["definition"] += [{"name": f"CUST_{i}", "rd": f"65000:{1000 + i}"} for i in range(vrfs)]
+    return tree
+
+
+class Counter:
+    """Metrics hook summing requests and response bytes"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+
+    def __call__(self, record):
+        self.requests += 1
+        self.bytes += record.bytes_received
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    vrfs = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.0
+    rng = random.Random(1)
+    watched, full = Counter(), Counter()
+
+    with VirtualDevice(native=make_tree(vrfs), latency=latency) as device, \
+            RestConfHandler("127.0.0.1", port=device.port) as admin, \
+            RestConfHandler("127.0.0.1", port=device.port, metrics=Metrics(hooks=[watched])) as handler, \
+            RestConfHandler("127.0.0.1", port=device.port, metrics=Metrics(hooks=[full])) as reader:
+        workflows.route_leaking_apply(admin, log=lambda *args: None)
+        watcher = DriftWatcher(handler, route_leaking_state())
+        watcher.poll()
+        previous = reader.get_native()["data"]
+        watched.__init__()
+        full.__init__()
+
+        watch_time = full_time = 0.0
+        detected = 0
+        for poll in range(polls):
+            change = rng.choice(["none", "none", "vrf", "interface", "bgp"])
+            if change == "vrf":
+                name = f"CUST_{rng.randrange(vrfs)}"
+                admin.patch_vrf(VrfConfig(name, f"65001:{poll}"), name)
+            elif change == "interface":
+                admin.update_interface(InterfaceConfig(name="GigabitEthernet0/0/2", description=f"changed {poll}",
+                                                       vrf="CUSTOMER_B", ip_addr="12.0.0.1", ip_mask="255.255.255.0"))
+            elif change == "bgp":
+                admin.create_bgp(workflows.BGP_AS, f"CUST_{rng.randrange(vrfs)}")
+
+            start = time.perf_counter()
+            changes = watcher.poll()
+            watch_time += time.perf_counter() - start
+            start = time.perf_counter()
+            current = reader.get_native()["data"]
+            changed = current != previous
+            previous = current
+            full_time += time.perf_counter() - start
+            assert bool(changes) == changed, (change, changes)
+            detected += bool(changes)
+
+    print(f"{polls} polls, {detected} with out-of-band changes, {vrfs + 2} VRFs on the device, "
+          f"{latency * 1000:.0f} ms latency")
+    print(f"{'':<16}{'requests':>10}{'bytes/poll':>12}{'ms/poll':>10}")
+    for name, counter, seconds in (("full native GET", full, full_time), ("DriftWatcher", watched, watch_time)):
+        print(f"{name:<16}{counter.requests:>10}{counter.bytes / polls:>12.0f}{seconds / polls * 1000:>10.2f}")
+    print(f"bytes downloaded {full.bytes / max(watched.bytes, 1):.0f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
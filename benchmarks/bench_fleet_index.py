@@ -0,0 +1,77 @@
+"""
+Build time, query latency and single-device update time of FleetIndex.
+
+Every synthetic device has the dumped config plus its own VRFs, route
+targets and addressed subinterfaces. Run from the repository root:
+    python -m benchmarks.bench_fleet_index [devices] [vrfs_per_device]
+"""
+import copy
+import statistics
+import sys
+import time
+
+from fleet_index import FleetIndex
+from models.native import NATIVE, load_native
+
+
+def make_tree(base, index: int, vrfs: int):
+    tree = copy.deepcopy(base)
+    native = tree[NATIVE]
+    native["vrf"]["definition"] += [{
+        "name": f"CUST_{v}",
+        "rd": f"65000:{v}" if v % 10 else None,
+        "route-target": {"export": [{"asn-ip": f"65000:{v}"}], "import": [{"asn-ip": f"65000:{(v + 1) % vrfs}"}]}
+    } for v in range(vrfs)]
+    native["interface"]["GigabitEthernet"] += [{
+        "name": f"0/0/1.{v}",
+        "vrf": {"forwarding": f"CUST_{v}"},
+        "ip": {"address": {"primary": {"address": f"10.{index % 256}.{v % 256}.1", "mask": "255.255.255.0"}}}
+    } for v in range(vrfs)]
+    return tree
+
+
+def timed(function, repeat: int = 200) -> float:
+    """Median seconds per call"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    vrfs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    base = load_native()
+    trees = {f"10.255.{i // 256}.{i % 256}": make_tree(base, i, vrfs) for i in range(devices)}
+    index = FleetIndex()
+    start = time.perf_counter()
+    for device, tree in trees.items():
+        index.update(device, tree)
+    build = time.perf_counter() - start
+
+    device = next(iter(trees))
+    changed = copy.deepcopy(trees[device])
+    changed[NATIVE]["vrf"]["definition"][3]["route-target"]["import"] = [{"asn-ip": "65000:999"}]
+    update = timed(lambda: index.update(device, changed), 50)
+    assert index.devices_importing("65000:999") == [device]
+
+    print(f"{devices} devices, {vrfs} VRFs and addressed subinterfaces each")
+    print(f"full build                {build * 1000:10.1f} ms")
+    print(f"update one device         {update * 1000:10.3f} ms")
+    for label, query in [
+        ("vrfs_importing(rt)", lambda: index.vrfs_importing("65000:5")),
+        ("devices_importing(rt)", lambda: index.devices_importing("65000:5")),
+        ("interfaces_in_vrf", lambda: index.interfaces_in_vrf("CUST_7")),
+        ("vrfs(device)", lambda: index.vrfs(device)),
+        ("vrfs_without_rd", index.vrfs_without_rd),
+        ("interfaces_for_address", lambda: index.interfaces_for_address("10.7.3.77")),
+        ("interfaces_in_prefix /16", lambda: index.interfaces_in_prefix("10.7.0.0/16")),
+    ]:
+        print(f"{label:<25} {timed(query) * 1e6:10.1f} us  ({len(query())} results)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Time of the route leak analysis for fleets of 1k, 10k and 50k VRFs.
+
+Every tenant has about ten VRF instances spread over the PEs, importing and
+exporting its own route target. A shared services VRF on some PEs exports
+to a third of the tenants and imports from all of them; those leaks are
+allowed, and it does not forward what it learns. One VRF in a thousand
+also imports the route target of a random other tenant, which the
+analysis must flag. For 1k VRFs a pairwise Python loop is timed too.
+Run from the repository root:
+    python -m benchmarks.bench_leak_analysis [vrfs...]
+"""
+import random
+import sys
+import time
+
+from fleet_index import VrfRef
+from leak_analysis import LeakGraph
+
+SHARED = "SHARED_SERVICES"
+
+
+def make_fleet(count: int, rng: random.Random):
+    tenants = max(2, count // 10)
+    devices = max(10, count // 100)
+    vrfs, import_rts, export_rts = [], [], []
+    shared_users = set(rng.sample(range(tenants), tenants // 3))
+    for index in range(count):
+        if index % 1000 == 0:
+            vrfs.append(VrfRef(f"pe-{index // 1000 % devices}", SHARED))
+            import_rts.append(["65001:0"])
+            export_rts.append(["65000:0"])
+            continue
+        tenant = index % tenants
+        device = (tenant + index // tenants * (devices // 10)) % devices
+        vrfs.append(VrfRef(f"pe-{device}", f"TENANT_{tenant}"))
+        import_rts.append([f"65000:{tenant + 1}"] + (["65000:0"] if tenant in shared_users else []))
+        export_rts.append([f"65000:{tenant + 1}", "65001:0"])
+    misconfigured = rng.sample([i for i, ref in enumerate(vrfs) if ref.vrf != SHARED], max(1, count // 1000))
+    for index in misconfigured:
+        own = int(vrfs[index].vrf.split("_")[1])
+        import_rts[index].append(f"65000:{rng.choice([t for t in range(tenants) if t != own]) + 1}")
+    allowed = [(SHARED, f"TENANT_{t}") for t in shared_users] + [(f"TENANT_{t}", SHARED) for t in range(tenants)]
+    transit = {ref for ref in vrfs if ref.vrf != SHARED}
+    return vrfs, import_rts, export_rts, allowed, transit, misconfigured
+
+
+def pairwise(vrfs, import_rts, export_rts, allowed):
+    allowed = set(allowed)
+    leaks = 0
+    for source, exported in zip(vrfs, export_rts):
+        for target, imported in zip(vrfs, import_rts):
+            if source != target and source.vrf != target.vrf and (source.vrf, target.vrf) not in allowed \
+                    and set(exported) & set(imported):
+                leaks += 1
+    return leaks
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10_000, 50_000]
+    rng = random.Random(1)
+    print(f"{'VRFs':>8} {'edges':>10} {'build':>9} {'direct':>9} {'flagged':>8} "
+          f"{'transitive':>11} {'flagged':>8} {'one VRF':>9}")
+    for count in sizes:
+        vrfs, import_rts, export_rts, allowed, transit, misconfigured = make_fleet(count, rng)
+        assert len(set(vrfs)) == len(vrfs)
+        start = time.perf_counter()
+        graph = LeakGraph(vrfs, import_rts, export_rts)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        leaks = graph.unintended_leaks(allowed)
+        direct = time.perf_counter() - start
+        assert {vrfs[index] for index in misconfigured} <= {leak.target for leak in leaks}
+
+        start = time.perf_counter()
+        reach = graph.unintended_reach(allowed, transit=transit)
+        transitive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        graph.reachable_from(vrfs[misconfigured[0]], transit=transit)
+        single = time.perf_counter() - start
+
+        print(f"{count:>8} {graph.direct.nnz:>10} {build:>8.3f}s {direct:>8.3f}s {len(leaks):>8} "
+              f"{transitive:>10.3f}s {len(reach):>8} {single * 1000:>7.2f}ms")
+        if count <= 1000:
+            start = time.perf_counter()
+            assert pairwise(vrfs, import_rts, export_rts, allowed) == len(leaks)
+            print(f"{'':>8} pairwise Python loop {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Disk usage and write time of SnapshotStore for daily backups of a fleet.
+
+Every device starts from the dumped config grown by a few hundred
+loopbacks and VRFs, with its own hostname. Each simulated day a few
+devices change one interface description; the others are backed up
+unchanged. Save times include writing the objects; TMPDIR=/dev/shm leaves
+the disk out of them. Run from the repository root:
+    python -m benchmarks.bench_snapshots [devices] [days]
+"""
+import copy
+import json
+import random
+import sys
+import tempfile
+import time
+
+from models.native import NATIVE, load_native
+from snapshots import SnapshotStore
+
+DAY = 24 * 3600.0
+
+
+def make_tree(base, index: int):
+    tree = copy.deepcopy(base)
+    native = tree[NATIVE]
+    native["hostname"] = f"router-{index}"
+    native["interface"]["Loopback"] = [{"name": 1000 + i, "description": f"service {i}",
+                                        "ip": {"address": {"primary": {"address": f"10.{i // 256}.{i % 256}.1",
+                                                                       "mask": "255.255.255.255"}}}}
+                                       for i in range(300)]
+    native["vrf"]["definition"] += [{"name": f"CUST_{i}", "rd": f"65000:{1000 + i}"} for i in range(200)]
+    return tree
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    changes_per_day = max(1, devices // 20)
+    rng = random.Random(1)
+
+    base = load_native()
+    trees = [make_tree(base, index) for index in range(devices)]
+    raw_bytes = 0
+    unchanged_times, changed_times = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(directory)
+        start = time.perf_counter()
+        for day in range(days):
+            changed = set(rng.sample(range(devices), changes_per_day)) if day else set()
+            for index in changed:
+                loopback = rng.choice(trees[index][NATIVE]["interface"]["Loopback"])
+                loopback["description"] = f"changed on day {day}"
+            for index, tree in enumerate(trees):
+                raw_bytes += len(json.dumps(tree).encode())
+                save_start = time.perf_counter()
+                store.save(f"10.0.{index // 256}.{index % 256}", tree, timestamp=day * DAY)
+                (changed_times if index in changed else unchanged_times).append(time.perf_counter() - save_start)
+        total = time.perf_counter() - start
+        stats = store.stats()
+
+        lookup_start = time.perf_counter()
+        for index in range(devices):
+            store.lookup(f"10.0.{index // 256}.{index % 256}", at=rng.uniform(0, days * DAY))
+        lookup_time = (time.perf_counter() - lookup_start) / devices
+        load_start = time.perf_counter()
+        rebuilt = store.load("10.0.0.0", at=(days // 2) * DAY)
+        load_time = time.perf_counter() - load_start
+        assert rebuilt[NATIVE]["hostname"] == "router-0"
+
+    snapshots = devices * days
+    print(f"{snapshots} snapshots ({devices} devices x {days} days, {changes_per_day} devices changed per day)")
+    print(f"raw JSON         {raw_bytes / 1e6:10.1f} MB")
+    print(f"store            {stats['bytes'] / 1e6:10.2f} MB in {stats['objects']} objects "
+          f"({raw_bytes / stats['bytes']:.0f}x smaller)")
+    print(f"save unchanged   {sum(unchanged_times) / len(unchanged_times) * 1000:10.2f} ms")
+    if changed_times:
+        print(f"save changed     {sum(changed_times) / len(changed_times) * 1000:10.2f} ms")
+    print(f"lookup at time   {lookup_time * 1e6:10.1f} us")
+    print(f"rebuild tree     {load_time * 1000:10.2f} ms")
+    print(f"total            {total:10.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Peak memory and time of the streaming reader against json.loads.
+
+A large native config is synthesized from models/examples/dumped_config_REST.txt
+by adding VRFs and GigabitEthernet subinterfaces. Run from the repository root:
+    python -m benchmarks.bench_streaming [vrfs] [interfaces]
+"""
+import copy
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from streaming import iter_file
+
+DUMP = os.path.join(os.path.dirname(__file__), "..", "models", "examples", "dumped_config_REST.txt")
+PATHS = ["native/vrf/definition[*]"]
+
+
+def load_dump():
+    with open(DUMP) as f:
+        text = f.read()
+    return json.loads(text[text.index("{"):])
+
+
+def synthesize(vrfs: int, interfaces: int):
+    config = load_dump()
+    native = config["Cisco-IOS-XE-native:native"]
+    definition = native["vrf"]["definition"][0]
+    interface = native["interface"]["GigabitEthernet"][2]
+    for i in range(vrfs):
+        entry = copy.deepcopy(definition)
+        entry["name"] = f"VRF_{i}"
+        entry["rd"] = f"65000:{i}"
+        native["vrf"]["definition"].append(entry)
+    for i in range(interfaces):
+        entry = copy.deepcopy(interface)
+        entry["name"] = f"0/0/1.{i}"
+        entry["description"] = f"Customer {i} subinterface"
+        entry["vrf"] = {"forwarding": f"VRF_{i % max(vrfs, 1)}"}
+        entry["ip"] = {"address": {"primary": {"address": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                                               "mask": "255.255.255.252"}}}
+        native["interface"]["GigabitEthernet"].append(entry)
+    return config
+
+
+def measure(function):
+    # Timed without tracemalloc, which slows down pure Python code far more than json.loads
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def with_json_loads(path):
+    with open(path) as f:
+        text = f.read()
+    native = json.loads(text[text.index("{"):])["Cisco-IOS-XE-native:native"]
+    return len(native["vrf"]["definition"])
+
+
+def with_streaming(path):
+    return sum(1 for _ in iter_file(path, PATHS))
+
+
+def main():
+    vrfs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    interfaces = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "native.json")
+        with open(path, "w") as f:
+            json.dump(synthesize(vrfs, interfaces), f, indent=2)
+        size = os.path.getsize(path)
+
+        print(f"native config: {size / 2**20:.1f} MiB, {vrfs} extra VRFs, {interfaces} subinterfaces")
+        print(f"extracting {PATHS}")
+        for name, function in (("json.loads", with_json_loads), ("streaming", with_streaming)):
+            count, elapsed, peak = measure(lambda: function(path))
+            print(f"{name:<12} {count:>6} VRFs   {elapsed:6.2f} s   peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
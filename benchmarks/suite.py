@@ -0,0 +1,303 @@
+"""
+Benchmark suite: model serialization, URL building, JSON and handler calls.
+
+Micro benchmarks time the pure-Python building blocks; macro benchmarks time
+every handler method and the complete main.py workflows against a local
+emulator.py device. Results (ops/sec, mean and p50/p95/p99 latency) are saved
+as JSON so runs from different commits can be compared.
+
+Run from the repository root:
+    python -m benchmarks.suite run [--filter TEXT] [--output FILE]
+    python -m benchmarks.suite compare OLD.json NEW.json [--threshold PERCENT]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from api import RequestType, RestConfBase, RestConfHandler
+from codec import DEFAULT_CODEC
+from emulator import VirtualDevice
+from models.interface import InterfaceConfig, VrfConfig
+from models.native import load_native
+from models.routing import OspfConfig, OspfNetwork
+import main as workflows
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+_BENCHMARKS: List[Dict[str, Any]] = []
+
+
+def benchmark(group: str, name: str, iterations: int):
+    """Register a benchmark; the decorated function returns the callable to time"""
+    def register(setup: Callable[..., Callable[[], Any]]):
+        _BENCHMARKS.append({"group": group, "name": name, "iterations": iterations, "setup": setup})
+        return setup
+    return register
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(function: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    warmup = max(1, iterations // 10)
+    for _ in range(warmup):
+        function()
+
+    latencies = []
+    total_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    total = time.perf_counter() - total_start
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / total,
+        "mean_us": sum(latencies) / iterations * 1e6,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p95_us": percentile(latencies, 0.95) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6
+    }
+
+
+# Micro benchmarks
+
+VRF = VrfConfig(name="CUSTOMER_A", rd="65000:100", export_rt="65000:100", import_rt="65000:200")
+INTERFACE = InterfaceConfig(name="GigabitEthernet0/0/1", description="Customer A Interface",
+                            ip_addr="11.0.0.1", ip_mask="255.255.255.0", vrf="CUSTOMER_A")
+
+
+@benchmark("micro", "VrfConfig.to_yang", 100_000)
+def _vrf_to_yang(context):
+    return VRF.to_yang
+
+
+@benchmark("micro", "InterfaceConfig.to_yang", 100_000)
+def _interface_to_yang(context):
+    return INTERFACE.to_yang
+
+
+@benchmark("micro", "InterfaceConfig.to_yang2", 100_000)
+def _interface_to_yang2(context):
+    return INTERFACE.to_yang2
+
+
+@benchmark("micro", "RestConfBase._build_url", 100_000)
+def _build_url(context):
+    base = RestConfBase("10.0.0.1")
+    return lambda: base._build_url(RequestType.VRF_PATCH, vrf="CUSTOMER_A")
+
+
+@benchmark("micro", "json.dumps bgp body", 20_000)
+def _dumps_bgp(context):
+    body = RestConfBase._bgp_body(65500, [VRF], [workflows.OSPF_A])
+    return lambda: json.dumps(body)
+
+
+MANY_VRFS = [VrfConfig(name=f"CUST_{i}", rd=f"65000:{i}") for i in range(5000)]
+MANY_OSPF = [OspfConfig(process_id=1000 + i, vrf=f"CUST_{i}", networks=[OspfNetwork(f"10.{i // 256}.{i % 256}.0",
+                                                                                 "0.0.0.255", 0)])
+             for i in range(5000)]
+
+
+@benchmark("micro", "bgp body 5000 VRFs", 50)
+def _bgp_body_many(context):
+    return lambda: RestConfBase._bgp_body(65500, MANY_VRFS, MANY_OSPF)
+
+
+@benchmark("micro", "ospf body 5000 processes", 50)
+def _ospf_body_many(context):
+    return lambda: RestConfBase._ospf_body(MANY_OSPF)
+
+
+@benchmark("micro", "json.loads native dump", 2_000)
+def _loads_native(context):
+    text = json.dumps(load_native())
+    return lambda: json.loads(text)
+
+
+@benchmark("micro", "codec.loads native dump", 2_000)
+def _codec_loads_native(context):
+    text = DEFAULT_CODEC.dumps(load_native())
+    return lambda: DEFAULT_CODEC.loads(text)
+
+
+@benchmark("micro", "codec.dumps route leaking patch", 2_000)
+def _codec_dumps_patch(context):
+    patch = workflows.build_route_leaking_patch(RestConfBase)
+    return lambda: DEFAULT_CODEC.dumps(patch.to_yang())
+
+
+# Macro benchmarks, each against the emulator device in context["handler"]
+
+@benchmark("macro", "test_connection", 300)
+def _test_connection(context):
+    return context["handler"].test_connection
+
+
+@benchmark("macro", "get_interfaces", 300)
+def _get_interfaces(context):
+    return context["handler"].get_interfaces
+
+
+@benchmark("macro", "get_vrfs", 300)
+def _get_vrfs(context):
+    return context["handler"].get_vrfs
+
+
+@benchmark("macro", "get_interfaces + decode", 300)
+def _get_interfaces_decoded(context):
+    return lambda: context["handler"].get_interfaces()["data"]
+
+
+@benchmark("macro", "get_interfaces fields=name + decode", 300)
+def _get_interfaces_fields(context):
+    return lambda: context["handler"].get_interfaces(fields="name")["data"]
+
+
+@benchmark("macro", "get_vrf", 300)
+def _get_vrf(context):
+    return lambda: context["handler"].get_vrf("CUSTOMER_A")
+
+
+@benchmark("macro", "get_bgp_config", 300)
+def _get_bgp_config(context):
+    return context["handler"].get_bgp_config
+
+
+@benchmark("macro", "patch_vrf", 300)
+def _patch_vrf(context):
+    return lambda: context["handler"].patch_vrf(VRF, VRF.name)
+
+
+@benchmark("macro", "update_interface", 300)
+def _update_interface(context):
+    return lambda: context["handler"].update_interface(INTERFACE)
+
+
+SUBINTERFACES = [InterfaceConfig(name=f"GigabitEthernet0/0/1.{i}", ip_addr=f"10.1.{i}.1", ip_mask="255.255.255.0",
+                                 vrf="CUSTOMER_A", description=f"Customer port {i}") for i in range(100)]
+
+
+@benchmark("macro", "update_interface x100", 10)
+def _update_interface_loop(context):
+    return lambda: [context["handler"].update_interface(config) for config in SUBINTERFACES]
+
+
+@benchmark("macro", "update_interfaces x100", 10)
+def _update_interfaces(context):
+    return lambda: context["handler"].update_interfaces(SUBINTERFACES)
+
+
+@benchmark("macro", "create_ospfs", 300)
+def _create_ospfs(context):
+    return lambda: context["handler"].create_ospfs([workflows.OSPF_A, workflows.OSPF_B])
+
+
+@benchmark("macro", "create_bgp", 300)
+def _create_bgp(context):
+    return lambda: context["handler"].create_bgp(65500, "CUSTOMER_A", ospf_ids=[101])
+
+
+@benchmark("macro", "workflow: route_leaking_workflow", 30)
+def _workflow(context):
+    return lambda: workflows.route_leaking_workflow(context["handler"], log=lambda *args: None)
+
+
+@benchmark("macro", "workflow: route_leaking_transaction", 100)
+def _transaction(context):
+    return lambda: workflows.route_leaking_transaction(context["handler"], log=lambda *args: None)
+
+
+@benchmark("macro", "workflow: route_leaking_apply", 100)
+def _apply(context):
+    return lambda: workflows.route_leaking_apply(context["handler"], log=lambda *args: None)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(name_filter: Optional[str] = None) -> Dict[str, Any]:
+    selected = [b for b in _BENCHMARKS if not name_filter or name_filter in b["name"]]
+    results = {}
+    with VirtualDevice() as device, RestConfHandler("127.0.0.1", port=device.port) as handler:
+        context = {"handler": handler}
+        for entry in selected:
+            function = entry["setup"](context)
+            stats = measure(function, entry["iterations"])
+            stats["group"] = entry["group"]
+            results[entry["name"]] = stats
+            print(f"{entry['group']:<6} {entry['name']:<38} {stats['ops_per_sec']:>12.0f} ops/s   "
+                  f"p50 {stats['p50_us']:>10.1f} us   p95 {stats['p95_us']:>10.1f} us   "
+                  f"p99 {stats['p99_us']:>10.1f} us", flush=True)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> bool:
+    """Print the p50 change of every benchmark; returns False if any regressed beyond threshold percent"""
+    ok = True
+    print(f"{'benchmark':<46}{'old p50 us':>12}{'new p50 us':>12}{'change':>10}")
+    for name, new_stats in new["results"].items():
+        old_stats = old["results"].get(name)
+        if old_stats is None:
+            print(f"{name:<46}{'-':>12}{new_stats['p50_us']:>12.1f}{'new':>10}")
+            continue
+        change = (new_stats["p50_us"] - old_stats["p50_us"]) / old_stats["p50_us"] * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:<46}{old_stats['p50_us']:>12.1f}{new_stats['p50_us']:>12.1f}{change:>+9.1f}%{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarki modeli, budowania URL i wywołań handlera.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Uruchamia benchmarki i zapisuje wyniki w JSON.")
+    run_parser.add_argument("--filter", help="Uruchamia tylko benchmarki zawierające podany tekst.")
+    run_parser.add_argument("--output", help="Plik wynikowy (domyślnie benchmarks/results/<commit>.json).")
+    compare_parser = commands.add_parser("compare", help="Porównuje dwa pliki wyników.")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Dopuszczalny wzrost p50 w procentach.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.filter)
+        output = args.output or os.path.join(RESULTS_DIR, f"{report['commit'] or 'unknown'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {output}")
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        sys.exit(0 if compare(old, new, args.threshold) else 1)
+
+
+if __name__ == "__main__":
+    main()
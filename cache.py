@@ -0,0 +1,126 @@
+"""
+Read cache for RESTCONF GET responses.
+
+Entries are keyed by URL, expire after a TTL and are evicted in LRU order
+once the cache is full. Expired entries keep their ETag / Last-Modified
+validators, so the handler can revalidate them with a conditional GET
+instead of downloading the subtree again.
+"""
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    status_code: int
+    data: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = 0.0
+
+    def result(self) -> Dict[str, Any]:
+        """Handler result for this entry; the data is shared, do not modify it"""
+        return {"status_code": self.status_code, "data": self.data}
+
+    def validators(self) -> Dict[str, str]:
+        """Headers turning a GET into a conditional GET"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _is_below(path: str, ancestor: str) -> bool:
+    """True if path equals ancestor or addresses a node inside it"""
+    return path == ancestor or (path.startswith(ancestor) and path[len(ancestor)] in "/=")
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of GET results with a time-to-live"""
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 256):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds for which an entry is served without asking the device
+            max_entries: Number of URLs kept before the least recently used is evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.generation = 0  # bumped by every invalidation
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the entry for the URL, fresh or not"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.stored_at < self.ttl
+
+    def put(self, url: str, status_code: int, data: Any, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, generation: Optional[int] = None):
+        """
+        Store a GET result
+
+        With the generation read before the GET was sent, the result is
+        dropped if a write invalidated the cache meanwhile, as the device
+        may have answered with the config from before the write.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[url] = CacheEntry(status_code, data, etag, last_modified, time.monotonic())
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, url: str, generation: Optional[int] = None):
+        """Mark an entry as fresh again after the device answered 304 Not Modified, see put()"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and (generation is None or generation == self.generation):
+                entry.stored_at = time.monotonic()
+
+    def count(self, hits: int = 0, revalidations: int = 0, misses: int = 0):
+        """Update the statistics, from any thread"""
+        with self._lock:
+            self.hits += hits
+            self.revalidations += revalidations
+            self.misses += misses
+
+    def invalidate(self, url: str):
+        """
+        Drop every entry a write to the URL may have changed
+
+        That is the URL itself, everything below it and every ancestor
+        container, e.g. a PATCH of vrf/definition=A drops vrf as well.
+        Query parameters are ignored, so vrf?fields=definition(name) goes too.
+        """
+        path = url.partition("?")[0]
+        with self._lock:
+            self.generation += 1
+            stale = [cached for cached in self._entries
+                     if _is_below(cached.partition("?")[0], path) or _is_below(path, cached.partition("?")[0])]
+            for cached in stale:
+                del self._entries[cached]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -2,22 +2,217 @@
 
 import cmd
 import argparse
+import functools
+import logging
+import os
 import shlex
 import json
-from time import sleep
-from api import RestConfHandler
-from models.interface import InterfaceConfig, InterfaceType, VrfConfig
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+# The HTTP stack (requests, urllib3, api) and the models are imported by the
+# commands which use them, so starting the CLI, "help" or a typo stay fast
+if TYPE_CHECKING:
+    from api import RestConfHandler
+    from sessions import DeviceSession, SessionCache
 
 intro = """Route leaking CLI"""
 
+CONNECTION_PORT = 443  # --port of commands connecting to a device when it is not given
+CONNECTION_ARGUMENTS = [
+    (('--username',), {'default': "agh", 'help': "Nazwa użytkownika."}),
+    (('--password',), {'default': "xd", 'help': "Hasło."}),
+    (('--port',), {'type': int, 'default': CONNECTION_PORT, 'help': "Port HTTPS RESTCONF."}),
+]
+
+# Arguments of every command; "connection" adds --ip (True, or "required") and the credentials
+COMMANDS: Dict[str, Dict[str, Any]] = {
+    "connect": {
+        "description": "Łączy się z urządzeniem i zachowuje sesję; kolejne komendy mogą pominąć --ip.",
+        "connection": "required",
+    },
+    "disconnect": {
+        "description": "Zamyka sesję z urządzeniem (domyślnie z bieżącym).",
+        "arguments": [
+            (('--ip',), {'help': "Adres IP urządzenia."}),
+            (('--port',), {'type': int, 'help': "Port HTTPS RESTCONF."}),
+            (('--all',), {'action': 'store_true', 'help': "Zamyka wszystkie sesje."}),
+        ],
+    },
+    "use": {
+        "description": "Ustawia bieżące urządzenie; bez argumentów wypisuje otwarte sesje.",
+        "arguments": [
+            (('--ip',), {'help': "Adres IP urządzenia."}),
+            (('--port',), {'type': int, 'help': "Port HTTPS RESTCONF."}),
+        ],
+    },
+    "test_conn": {
+        "prog": "initial_config",
+        "description": "Wykonuje prosty test polaczenia z urzadzeniem.",
+        "connection": True,
+    },
+    "create_vrf": {
+        "description": "Tworzy nową instancję VRF z podanym Route Distinguisher.",
+        "connection": True,
+        "arguments": [
+            (('--name',), {'required': True, 'help': "Nazwa dla VRF (np. AGH, Common)."}),
+            (('--rd',), {'required': True, 'help': "Route Distinguisher w formacie ASN:NN (np. 65500:1)."}),
+            (('--export_rd',), {'required': False,
+                                'help': "Export Route Distinguisher w formacie ASN:NN (np. 65500:1)."}),
+            (('--import_rd',), {'required': False,
+                                'help': "Import Route Distinguisher w formacie ASN:NN (np. 65500:1)."}),
+        ],
+    },
+    "assign_interface": {
+        "description": "Przypisuje i konfiguruje interfejs w ramach określonego VRF.",
+        "connection": True,
+        "subcommands": {
+            "dest": 'interface_type',
+            "help": 'Typ interfejsu',
+            "commands": {
+                # interfejs fizyczny
+                "physical": {
+                    "help": 'Konfiguracja interfejsu fizycznego',
+                    "arguments": [
+                        (('--name',), {'required': True, 'help': 'Nazwa interfejsu (np. GigabitEthernet0/0/1)'}),
+                        (('--vrf',), {'help': 'Nazwa VRF do przypisania'}),
+                        (('--ip-addr',), {'help': 'Adres IP'}),
+                        (('--mask',), {'help': 'Maska podsieci'}),
+                        (('--desc',), {'help': 'Opis interfejsu'}),
+                    ],
+                },
+                # loopback
+                "loopback": {
+                    "help": 'Konfiguracja interfejsu loopback',
+                    "arguments": [
+                        (('--id',), {'required': True, 'type': int, 'help': 'Numer interfejsu loopback (np. 1)'}),
+                        (('--vrf',), {'help': 'Nazwa VRF do przypisania'}),
+                        (('--ip-addr',), {'required': True, 'help': 'Adres IP'}),
+                        (('--mask',), {'default': '255.255.255.255', 'help': 'Maska podsieci (domyślnie /32)'}),
+                        (('--desc',), {'help': 'Opis interfejsu'}),
+                    ],
+                },
+            },
+        },
+    },
+    "configure_ospf": {
+        "description": "!!UWAGA!! Moze nie dzialac! Konfiguruje i uruchamia proces OSPF dla wskazanego VRF.",
+        "connection": True,
+        "arguments": [
+            (('--pid',), {'required': True, 'type': int, 'help': "ID procesu OSPF (np. 1, 2, 3)."}),
+            (('--vrf',), {'required': True, 'help': "Nazwa VRF, w którym działa OSPF."}),
+            (('--network',), {'required': True, 'help': "Adres sieci do rozgłaszania (np. 10.0.0.0)."}),
+            (('--wildcard',), {'required': True, 'help': "Maska wildcard (np. 0.255.255.255)."}),
+            (('--area',), {'required': True, 'type': int, 'help': "Numer obszaru OSPF."}),
+        ],
+    },
+    "configure_bgp": {
+        "description": "Konfiguruje proces BGP i redystrybucję dla VRF.",
+        "connection": True,
+        "arguments": [
+            (('--vrf',), {'required': True, 'help': "VRF do skonfigurowania w BGP."}),
+            (('--as',), {'dest': 'as_number', 'type': int, 'default': 65500, 'help': "Numer AS procesu BGP."}),
+            # Accepted for older scripts only; RD and route targets are set by create_vrf
+            (('--rd',), {'help': "Nieużywany; Route Distinguisher ustawia create_vrf."}),
+            (('--import_rt',), {'help': "Nieużywany; Route Target ustawia create_vrf."}),
+            (('--export_rt',), {'help': "Nieużywany; Route Target ustawia create_vrf."}),
+            (('--router_id',), {'default': "1.1.1.1", 'help': "Router ID procesu BGP."}),
+        ],
+    },
+}
+
+
+def _add_arguments(parser: argparse.ArgumentParser, spec: Dict[str, Any]):
+    connection = spec.get("connection")
+    if connection:
+        # Parametry połączeniowe
+        parser.add_argument('--ip', required=connection == "required",
+                            help="Adres IP urządzenia (domyślnie urządzenie wybrane przez 'connect' lub 'use').")
+        for flags, options in CONNECTION_ARGUMENTS:
+            parser.add_argument(*flags, **options)
+    # Parametry komendy
+    for flags, options in spec.get("arguments", ()):
+        parser.add_argument(*flags, **options)
+    subcommands = spec.get("subcommands")
+    if subcommands:
+        subparsers = parser.add_subparsers(dest=subcommands["dest"], required=True, help=subcommands["help"])
+        for name, subcommand in subcommands["commands"].items():
+            _add_arguments(subparsers.add_parser(name, help=subcommand["help"]), subcommand)
+
+
+@functools.lru_cache(maxsize=None)
+def command_parser(name: str) -> argparse.ArgumentParser:
+    """Parser of a command described in COMMANDS, built on first use and reused afterwards"""
+    spec = COMMANDS[name]
+    parser = argparse.ArgumentParser(prog=spec.get("prog", name), description=spec["description"])
+    _add_arguments(parser, spec)
+    return parser
+
+
 class RouteLeakingCli(cmd.Cmd):
     def __init__(self):
         super().__init__()
         self.prompt = '(route leaking cli) '
         self.intro = intro
+        self._sessions: Optional["SessionCache"] = None
+        self.current: Optional["DeviceSession"] = None
+        self.failures: List[str] = []
+
+    @property
+    def sessions(self) -> "SessionCache":
+        """Open sessions; created, together with the HTTP stack, by the first command which needs a device"""
+        if self._sessions is None:
+            from sessions import SessionCache
+            self._sessions = SessionCache()
+        return self._sessions
+
+    def _fail(self, message: str):
+        """Print an error and remember it as a failure of the running command"""
+        print(message)
+        self.failures.append(message)
+
+    def _check_status(self, operation: str, result: Dict[str, Any]):
+        """Record a failure unless the status means success, with the rules of the workflows in main.py"""
+        from main import step_ok
+        if not step_ok(operation, result['status_code']):
+            self.failures.append(f"{operation}: status {result['status_code']}")
+
+    def run_command(self, line: str) -> List[str]:
+        """Run a single command outside of cmdloop; returns its failures, empty on success"""
+        self.failures = []
+        self.onecmd(line)
+        return self.failures
+
+    def _set_current(self, session: Optional["DeviceSession"]):
+        self.current = session
+        self.prompt = f'(route leaking cli {session.name}) ' if session else '(route leaking cli) '
+
+    def _resolve_device(self, args) -> bool:
+        """Fill in the connection arguments of the current device when --ip was not given"""
+        if args.ip is not None:
+            return True
+        if self.current is None:
+            self._fail("BŁĄD: Nie wybrano urządzenia. Podaj --ip albo użyj 'connect'.")
+            return False
+        handler = self.current.handler
+        args.ip, args.port = handler.ip_addr, handler.port
+        args.username, args.password = handler.auth
+        return True
+
+    def _handler(self, args) -> Optional["RestConfHandler"]:
+        """Cached handler for the device; the reachability probe is repeated only when it is stale"""
+        handler = self.sessions.get(args.ip, args.username, args.password, port=args.port)
+        if handler is None:
+            self._fail(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}. "
+                  f"Sprawdź IP, dane logowania i czy RESTCONF jest włączony.")
+            if self.current is not None and self.current.handler.ip_addr == args.ip \
+                    and self.current.handler.port == args.port:
+                self._set_current(None)
+        return handler
 
     def default(self, line: str) -> None:
-        print(f"Nieznana komenda: '{line}'. Napisz 'help' lub '?' aby uzyskać dostępne polecenia.")
+        self._fail(f"Nieznana komenda: '{line}'. Napisz 'help' lub '?' aby uzyskać dostępne polecenia.")
         return
 
     def emptyline(self):
@@ -25,28 +220,108 @@ class RouteLeakingCli(cmd.Cmd):
 
     def do_quit(self, line: str) -> bool:
         """Wyjście z programu: quit"""
+        if self._sessions is not None:
+            self._sessions.close()
         return True
 
+    def do_connect(self, arg):
+        """
+        Nawiązuje sesję z urządzeniem i ustawia je jako bieżące.
+        """
+        parser = command_parser("connect")
+
+        try:
+            args = parser.parse_args(shlex.split(arg))
+            handler = self.sessions.connect(args.ip, args.username, args.password, port=args.port)
+            if handler is None:
+                self._fail(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}. "
+                      f"Sprawdź IP, dane logowania i czy RESTCONF jest włączony.")
+                return
+            self._set_current(self.sessions.find(args.ip, args.port))
+            print(f"   Połączono z urządzeniem {handler.device_name}.")
+
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
+        except Exception as e:
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
+
+    def do_disconnect(self, arg):
+        """
+        Zamyka sesję z urządzeniem.
+        """
+        parser = command_parser("disconnect")
+
+        try:
+            args = parser.parse_args(shlex.split(arg))
+            if args.all:
+                count = len(self.sessions)
+                self.sessions.close()
+                self._set_current(None)
+                print(f"   Zamknięto sesje: {count}.")
+                return
+            if args.ip is None:
+                if self.current is None:
+                    self._fail("BŁĄD: Brak bieżącego urządzenia.")
+                    return
+                args.ip, args.port = self.current.handler.ip_addr, self.current.handler.port
+            count = self.sessions.disconnect(args.ip, args.port)
+            if self.current is not None and self.sessions.find(self.current.handler.ip_addr,
+                                                               self.current.handler.port) is None:
+                self._set_current(None)
+            print(f"   Zamknięto sesje z {args.ip}: {count}.")
+
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
+        except Exception as e:
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
+
+    def do_use(self, arg):
+        """
+        Wybiera bieżące urządzenie spośród otwartych sesji.
+        """
+        parser = command_parser("use")
+
+        try:
+            args = parser.parse_args(shlex.split(arg))
+            if args.ip is None:
+                if not len(self.sessions):
+                    print("   Brak otwartych sesji.")
+                for session in self.sessions.sessions():
+                    marker = "*" if session is self.current else " "
+                    age = time.monotonic() - session.verified_at if session.verified_at is not None else None
+                    checked = f"sprawdzono {age:.0f} s temu" if age is not None else "nie sprawdzono"
+                    print(f" {marker} {session.name:<21} {session.handler.auth[0]:<12} {checked}")
+                return
+            session = self.sessions.find(args.ip, args.port)
+            if session is None:
+                self._fail(f"BŁĄD: Brak sesji z urządzeniem {args.ip}. Użyj 'connect'.")
+                return
+            self._set_current(session)
+            print(f"   Bieżące urządzenie: {session.name}.")
+
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
+        except Exception as e:
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
+
     def do_test_conn(self, arg):
         """
         Krok 1: Test polaczenia.
         """
-        parser = argparse.ArgumentParser(
-            prog="initial_config",
-            description="Wykonuje prosty test polaczenia z urzadzeniem."
-        )
-        # Parametry połączeniowe
-        parser.add_argument('--ip', required=True, help="Adres IP urządzenia.")
-        parser.add_argument('--username', default="agh", help="Nazwa użytkownika.")
-        parser.add_argument('--password', default="xd", help="Hasło.")
+        parser = command_parser("test_conn")
 
         try:
             args = parser.parse_args(shlex.split(arg))
+            if not self._resolve_device(args):
+                return
             print(f"--- Running: initial_config na {args.ip} ---")
 
-            handler = RestConfHandler(args.ip, args.username, args.password)
-            if not handler.test_connection():
-                print(
+            handler = self.sessions.connect(args.ip, args.username, args.password, port=args.port)
+            if handler is None:
+                self._fail(
                     f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}. Sprawdź IP, dane logowania i czy RESTCONF jest włączony.")
                 return
 
@@ -54,41 +329,33 @@ class RouteLeakingCli(cmd.Cmd):
             print(f"   Argumenty: {args}")
             print("--- Operacja zakończona ---\n")
 
-        except SystemExit:
-            pass
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd: {e}")
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
 
     def do_create_vrf(self, arg):
         """
         Krok 2: Tworzenie instancji VRF.
         """
-        parser = argparse.ArgumentParser(
-            prog="create_vrf",
-            description="Tworzy nową instancję VRF z podanym Route Distinguisher."
-        )
-        # Parametry połączeniowe
-        parser.add_argument('--ip', required=True, help="Adres IP urządzenia.")
-        parser.add_argument('--username', default="agh", help="Nazwa użytkownika.")
-        parser.add_argument('--password', default="xd", help="Hasło.")
-        # Parametry komendy
-        parser.add_argument('--name', required=True, help="Nazwa dla VRF (np. AGH, Common).")
-        parser.add_argument('--rd', required=True, help="Route Distinguisher w formacie ASN:NN (np. 65500:1).")
-        parser.add_argument('--export_rd', required=False, help="Export Route Distinguisher w formacie ASN:NN (np. 65500:1).")
-        parser.add_argument('--import_rd', required=False, help="Import Route Distinguisher w formacie ASN:NN (np. 65500:1).")
+        parser = command_parser("create_vrf")
 
         try:
             args = parser.parse_args(shlex.split(arg))
+            if not self._resolve_device(args):
+                return
             print(f"--- Running: create_vrf '{args.name}' na {args.ip} ---")
 
-            handler = RestConfHandler(args.ip, args.username, args.password)
-            if not handler.test_connection():
-                print(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}.")
+            handler = self._handler(args)
+            if handler is None:
                 return
 
+            from models.interface import VrfConfig
             vrf_to_create = VrfConfig.default_yang(name=args.name)
             result = handler.create_vrf_from_yang(vrf_to_create)
             print(f"   Wynik operacji tworzenia vrf (status: {result['status_code']}):")
+            self._check_status("create_vrf", result)
 
             vrf_config = VrfConfig(
                 name=args.name,
@@ -97,9 +364,11 @@ class RouteLeakingCli(cmd.Cmd):
                 import_rt=args.import_rd
             )
 
-            sleep(4)
+            if not handler.wait_for_vrf(args.name):
+                print(f"   UWAGA: urządzenie nie zgłosiło VRF '{args.name}' w wyznaczonym czasie.")
             patch_config_result = handler.patch_vrf(vrf_config, args.name)
             print(f"   Wynik operacji patchowania VRF (status: {patch_config_result['status_code']}):")
+            self._check_status("patch_vrf", patch_config_result)
 
             if result.get('data'):
                 print(json.dumps(result['data'], indent=2))
@@ -107,51 +376,29 @@ class RouteLeakingCli(cmd.Cmd):
                 print("   Brak danych zwrotnych lub operacja nie powiodła się.")
             print("--- Operacja zakończona ---\n")
 
-        except SystemExit:
-            pass
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd: {e}")
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
 
     def do_assign_interface(self, arg):
         """
         Krok 3: Przypisanie interfejsów do VRF.
         """
-        parser = argparse.ArgumentParser(
-            prog="assign_interface",
-            description="Przypisuje i konfiguruje interfejs w ramach określonego VRF."
-        )
-        # Parametry połączeniowe
-        parser.add_argument('--ip', required=True, help="Adres IP urządzenia.")
-        parser.add_argument('--username', default="agh", help="Nazwa użytkownika.")
-        parser.add_argument('--password', default="xd", help="Hasło.")
-
-        subparsers = parser.add_subparsers(dest='interface_type', required=True, help='Typ interfejsu')
-
-        # interfejs fizyczny
-        parser_phys = subparsers.add_parser('physical', help='Konfiguracja interfejsu fizycznego')
-        parser_phys.add_argument('--name', required=True, help='Nazwa interfejsu (np. GigabitEthernet0/0/1)')
-        parser_phys.add_argument('--vrf', help='Nazwa VRF do przypisania')
-        parser_phys.add_argument('--ip-addr', help='Adres IP')
-        parser_phys.add_argument('--mask', help='Maska podsieci')
-        parser_phys.add_argument('--desc', help='Opis interfejsu')
-
-        # loopback
-        parser_loop = subparsers.add_parser('loopback', help='Konfiguracja interfejsu loopback')
-        parser_loop.add_argument('--id', required=True, type=int, help='Numer interfejsu loopback (np. 1)')
-        parser_loop.add_argument('--vrf', help='Nazwa VRF do przypisania')
-        parser_loop.add_argument('--ip-addr', required=True, help='Adres IP')
-        parser_loop.add_argument('--mask', default='255.255.255.255', help='Maska podsieci (domyślnie /32)')
-        parser_loop.add_argument('--desc', help='Opis interfejsu')
+        parser = command_parser("assign_interface")
 
         try:
             args = parser.parse_args(shlex.split(arg))
+            if not self._resolve_device(args):
+                return
             print(f"--- Running: assign_interface typu {args.interface_type} na {args.ip} ---")
 
-            handler = RestConfHandler(args.ip, args.username, args.password)
-            if not handler.test_connection():
-                print(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}.")
+            handler = self._handler(args)
+            if handler is None:
                 return
 
+            from models.interface import InterfaceConfig, InterfaceType
             iface_config = None
             if args.interface_type == 'physical':
                 iface_config = InterfaceConfig(
@@ -177,6 +424,7 @@ class RouteLeakingCli(cmd.Cmd):
                 result = handler.update_interface(iface_config)
                 print(f"   Konfiguracja interfejsu '{iface_config.name}'")
                 print(f"   Wynik operacji (status: {result['status_code']}):")
+                self._check_status("update_interface", result)
                 if result.get('data'):
                     print(json.dumps(result['data'], indent=2))
                 elif result['status_code'] >= 200 and result['status_code'] < 300:
@@ -186,37 +434,26 @@ class RouteLeakingCli(cmd.Cmd):
 
             print("--- Operacja zakończona ---\n")
 
-        except SystemExit:
-            pass
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd: {e}")
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
 
     def do_configure_ospf(self, arg):
         """
         Krok 5: Konfiguracja OSPF w kontekście VRF.
         """
-        parser = argparse.ArgumentParser(
-            prog="configure_ospf",
-            description="!!UWAGA!! Moze nie dzialac! Konfiguruje i uruchamia proces OSPF dla wskazanego VRF."
-        )
-        # Parametry połączeniowe
-        parser.add_argument('--ip', required=True, help="Adres IP urządzenia.")
-        parser.add_argument('--username', default="agh", help="Nazwa użytkownika.")
-        parser.add_argument('--password', default="xd", help="Hasło.")
-        # Parametry komendy
-        parser.add_argument('--pid', required=True, type=int, help="ID procesu OSPF (np. 1, 2, 3).")
-        parser.add_argument('--vrf', required=True, help="Nazwa VRF, w którym działa OSPF.")
-        parser.add_argument('--network', required=True, help="Adres sieci do rozgłaszania (np. 10.0.0.0).")
-        parser.add_argument('--wildcard', required=True, help="Maska wildcard (np. 0.255.255.255).")
-        parser.add_argument('--area', required=True, type=int, help="Numer obszaru OSPF.")
+        parser = command_parser("configure_ospf")
 
         try:
             args = parser.parse_args(shlex.split(arg))
+            if not self._resolve_device(args):
+                return
             print(f"--- Running: configure_ospf dla VRF {args.vrf} na {args.ip} ---")
 
-            handler = RestConfHandler(args.ip, args.username, args.password)
-            if not handler.test_connection():
-                print(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}.")
+            handler = self._handler(args)
+            if handler is None:
                 return
 
             print(f"   Połączono z urządzeniem {args.ip}.")
@@ -224,36 +461,25 @@ class RouteLeakingCli(cmd.Cmd):
             print("   (W tym miejscu nastąpiłaby właściwa implementacja konfiguracji OSPF przez RESTCONF), jednak nie udalo sie doprowadzic konfiguracji do dzialajacej formy\n")
             print("--- Operacja zakończona ---\n")
 
-        except SystemExit:
-            pass
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd: {e}")
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
 
     def do_configure_bgp(self, arg):
         """
         Krok 6: Konfiguracja MP-BGP.
         """
-        parser = argparse.ArgumentParser(
-            prog="configure_bgp",
-            description="Konfiguruje proces BGP i redystrybucję dla VRF."
-        )
-        # Parametry połączeniowe
-        parser.add_argument('--ip', required=True, help="Adres IP urządzenia.")
-        parser.add_argument('--username', default="agh", help="Nazwa użytkownika.")
-        parser.add_argument('--password', default="xd", help="Hasło.")
-
-        # Parametry komendy
-        parser.add_argument('--vrf', required=True, help="VRF do skonfigurowania w BGP.")
-        parser.add_argument('--rd', required=True, help="Route Distinguisher w formacie ASN:NN (np. 65500:1).")
-        parser.add_argument('--import_rt', required=True, help="Import Route Target w formacie ASN:NN (np. 65500:1).")
-        parser.add_argument('--export_rt', required=True, help="Export Route Target w formacie ASN:NN (np. 65500:1).")
+        parser = command_parser("configure_bgp")
 
         try:
             args = parser.parse_args(shlex.split(arg))
+            if not self._resolve_device(args):
+                return
 
-            handler = RestConfHandler(args.ip, args.username, args.password)
-            if not handler.test_connection():
-                print(f"BŁĄD: Nie można połączyć się z urządzeniem {args.ip}.")
+            handler = self._handler(args)
+            if handler is None:
                 return
 
 
@@ -261,20 +487,53 @@ class RouteLeakingCli(cmd.Cmd):
             print(f"   Argumenty: {args}")
 
             result = handler.create_bgp(
-                as_number=65000,
+                as_number=args.as_number,
                 vrf_name=args.vrf,
-                rd=args.rd,
-                import_rt=args.import_rt,
-                export_rt=args.export_rt
+                router_id=args.router_id
             )
 
             print(f"   Wynik operacji tworzenia BGP (status: {result['status_code']}):")
+            self._check_status("create_bgp", result)
 
-        except SystemExit:
-            pass
+        except SystemExit as e:
+            if e.code:
+                self.failures.append("Niepoprawne argumenty komendy.")
         except Exception as e:
-            print(f"Wystąpił nieoczekiwany błąd: {e}")
+            self._fail(f"Wystąpił nieoczekiwany błąd: {e}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Route leaking CLI. Bez argumentów uruchamia tryb interaktywny."
+    )
+    parser.add_argument('script', nargs='?',
+                        help="Plik z komendami do wykonania wsadowo ('-' czyta ze standardowego wejścia).")
+    parser.add_argument('--workers', type=int, default=8, help="Maksymalna liczba urządzeń obsługiwanych naraz.")
+    parser.add_argument('--stop-on-error', action='store_true',
+                        help="Pomija kolejne komendy urządzenia po pierwszym błędzie.")
+    parser.add_argument('--json', action='store_true', help="Wypisuje podsumowanie w formacie JSON.")
+    args = parser.parse_args(argv)
+
+    # RESTCONF_LOG_LEVEL=DEBUG prints every request together with its payload
+    logging.basicConfig(level=os.environ.get("RESTCONF_LOG_LEVEL", "WARNING").upper())
+
+    if args.script is None:
+        route_leaking_cli = RouteLeakingCli()
+        route_leaking_cli.cmdloop()
+        return 0
+
+    from batch import print_report, report_json, run_script
+    if args.script == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.script, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    report = run_script(lines, workers=args.workers, stop_on_error=args.stop_on_error)
+    if args.json:
+        print(report_json(report))
+    else:
+        print_report(report)
+    return 1 if report.failed else 0
+
 
 if __name__ == '__main__':
-    route_leaking_cli = RouteLeakingCli()
-    route_leaking_cli.cmdloop()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+JSON encoding and decoding of RESTCONF bodies.
+
+orjson is used when it is installed, the standard library otherwise. Bodies
+can be encoded once with encode() and sent as bytes to any number of
+devices, and LazyResult decodes a response only when its data is read.
+"""
+import json
+from collections.abc import Mapping
+from typing import Any, Callable, Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibCodec:
+    """Codec built on the json module"""
+    name = "json"
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        # Same bytes as orjson for the same value, so content hashes do not depend on the codec
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """Codec built on orjson, several times faster on large configs"""
+    name = "orjson"
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+DEFAULT_CODEC = OrjsonCodec if orjson is not None else StdlibCodec
+
+
+def encode(value: Any, codec=DEFAULT_CODEC) -> bytes:
+    """Serialize a body once, e.g. a template sent unchanged to a whole fleet"""
+    return codec.dumps(value)
+
+
+class LazyResult(Mapping):
+    """
+    Handler result {"status_code", "data"} decoding the body on first access
+
+    Behaves like the result dicts returned elsewhere; writes whose response
+    is never inspected skip JSON decoding entirely.
+    """
+    _KEYS = ("status_code", "data")
+
+    def __init__(self, status_code: int, body: Optional[bytes], decode: Callable[[bytes], Any]):
+        self.status_code = status_code
+        self._body = body
+        self._decode = decode
+        self._decoded = False
+        self._data = None
+
+    @property
+    def data(self) -> Any:
+        if not self._decoded:
+            self._data = self._decode(self._body) if self._body else None
+            self._decoded = True
+            self._body = None
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "status_code":
+            return self.status_code
+        if key == "data":
+            return self.data
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        state = repr(self._data) if self._decoded else f"<{len(self._body or b'')} bytes not decoded>"
+        return f"LazyResult(status_code={self.status_code}, data={state})"
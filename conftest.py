@@ -0,0 +1 @@
+"""Makes the top-level modules importable when tests are run with a bare pytest."""
@@ -0,0 +1,151 @@
+"""
+Structural diff between desired and running RESTCONF configuration.
+
+The desired payload (e.g. VrfConfig.to_yang() or InterfaceConfig.to_yang2())
+is compared with what the device returned for the same subtree. The result is
+the smallest payload which, merged into the running config, produces the
+desired state, or None if the device already has it.
+"""
+import dataclasses
+from typing import Any, Dict, List, Optional
+
+# Leaves identifying list entries, in order of preference
+LIST_KEYS = ("name", "id", "af-name", "asn-ip", "ip")
+
+
+def _local_name(key: str) -> str:
+    """Strip the YANG module prefix: Cisco-IOS-XE-native:definition -> definition"""
+    return key.rsplit(":", 1)[-1]
+
+
+def _entry_key(entry: Dict[str, Any]) -> Optional[str]:
+    for key in LIST_KEYS:
+        if key in entry and not isinstance(entry[key], (dict, list)):
+            return key
+    return None
+
+
+def _same_leaf(desired, running) -> bool:
+    if isinstance(desired, bool) or isinstance(running, bool):
+        return desired is running
+    # Devices return e.g. VLAN and interface numbers as numbers or strings
+    return str(desired) == str(running)
+
+
+def _find_entry(entries: List[Any], key: str, value) -> Optional[Dict[str, Any]]:
+    for entry in entries:
+        if isinstance(entry, dict) and key in entry and _same_leaf(value, entry[key]):
+            return entry
+    return None
+
+
+def _diff_entry(desired: Dict[str, Any], running: List[Any]) -> Optional[Dict[str, Any]]:
+    """Diff a single list entry against the running list it belongs to"""
+    key = _entry_key(desired)
+    if key is None:
+        return None if desired in running else desired
+    match = _find_entry(running, key, desired[key])
+    if match is None:
+        return desired
+    changed = _diff_container(desired, match)
+    if changed is None:
+        return None
+    return {key: desired[key], **changed}
+
+
+def _diff_list(desired: List[Any], running: Any) -> Optional[List[Any]]:
+    if not isinstance(running, list):
+        running = [running] if running is not None else []
+    changed = []
+    for entry in desired:
+        if isinstance(entry, dict):
+            entry_diff = _diff_entry(entry, running)
+            if entry_diff is not None:
+                changed.append(entry_diff)
+        elif not any(_same_leaf(entry, value) for value in running):
+            changed.append(entry)
+    return changed or None
+
+
+def _diff_container(desired: Dict[str, Any], running: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(running, dict):
+        return desired
+    running_by_name = {_local_name(key): value for key, value in running.items()}
+    changed = {}
+    for key, value in desired.items():
+        name = _local_name(key)
+        if name not in running_by_name:
+            if value is not None:
+                changed[key] = value
+            continue
+        value_diff = diff(value, running_by_name[name])
+        if value_diff is not None:
+            changed[key] = value_diff
+    return changed or None
+
+
+def diff(desired: Any, running: Any) -> Any:
+    """
+    Return the part of desired which differs from running, or None
+
+    Module prefixes are ignored when matching keys, list entries are matched
+    by their key leaf, and a desired container matches a single-entry running
+    list (to_yang builds list entries as plain objects). Desired None leaves
+    mean "not set" and never produce a change.
+    """
+    if desired is None:
+        return None
+    if isinstance(desired, dict):
+        if isinstance(running, list):
+            return _diff_entry(desired, running)
+        if not desired:
+            # Presence container, e.g. "ipv4": {}
+            return None if isinstance(running, dict) else desired
+        return _diff_container(desired, running)
+    if isinstance(desired, list):
+        return _diff_list(desired, running)
+    if running is None or not _same_leaf(desired, running):
+        return desired
+    return None
+
+
+@dataclasses.dataclass
+class Change:
+    """Single write computed by a plan; body is None when nothing has to be sent"""
+    name: str
+    method: str
+    url: str
+    body: Optional[Dict[str, Any]]
+
+    @property
+    def is_noop(self) -> bool:
+        return self.body is None
+
+
+@dataclasses.dataclass
+class Plan:
+    """Ordered list of changes needed to converge a device"""
+    changes: List[Change] = dataclasses.field(default_factory=list)
+
+    def add(self, change: Change) -> "Plan":
+        self.changes.append(change)
+        return self
+
+    @property
+    def pending(self) -> List[Change]:
+        return [change for change in self.changes if not change.is_noop]
+
+    def summary(self) -> str:
+        lines = []
+        for change in self.changes:
+            state = "up to date" if change.is_noop else f"{change.method} {len(_leaves(change.body))} leaves"
+            lines.append(f"{change.name:<40} {state}")
+        return "\n".join(lines)
+
+
+def _leaves(node: Any) -> List[Any]:
+    if isinstance(node, dict):
+        return [leaf for value in node.values() for leaf in _leaves(value)] or [node]
+    if isinstance(node, list):
+        return [leaf for value in node for leaf in _leaves(value)]
+    return [node]
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Out-of-band change detection with a hash tree over the managed config.
+
+Instead of downloading the whole native tree on every poll, each device
+keeps a tree of hashes: one leaf per VRF definition and per GigabitEthernet
+entry, one per BGP and OSPF subtree, and a hash per section over its
+children. Polling starts at the sections, using the ETag the device gave
+for each of them, all sections at once:
+
+- a section whose ETag is unchanged costs one body-less request (304)
+- for a changed list section only the child keys are read (fields=), then
+  every child is read conditionally (several at once), so only the objects
+  which changed (or appeared) are downloaded; sections with more than probe_limit children
+  are read whole instead, as one request is then cheaper than many
+- BGP and OSPF are read conditionally as a whole
+
+Changed objects are reported and compared with the desired state, giving
+the part of each desired VrfConfig/InterfaceConfig body the device lacks.
+
+Usage:
+    python drift.py inventory.json [--interval SECONDS] [--polls N] [--workers N]
+"""
+import argparse
+import dataclasses
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from api import RequestType, RestConfHandler
+from diff import diff
+from models.interface import InterfaceConfig, VrfConfig
+from query import with_query
+from readiness import first_entry
+
+
+@dataclasses.dataclass(frozen=True)
+class Section:
+    """Part of the native tree watched as one node of the hash tree"""
+    name: str
+    rq_type: RequestType
+    label: str                              # object name, "{}" is replaced by the child key
+    list_name: Optional[str] = None         # list holding the child objects; None watches the subtree as one object
+    key_fields: Optional[str] = None        # fields expression returning only the child keys
+    child_type: Optional[RequestType] = None
+    child_arg: Optional[str] = None         # _build_url argument addressing a child
+
+
+SECTIONS = (
+    Section("vrf", RequestType.VRF, "vrf {}", "definition", "definition(name)", RequestType.VRF_PATCH, "vrf"),
+    Section("interface", RequestType.INTERFACE, "interface GigabitEthernet{}", "GigabitEthernet", "name",
+            RequestType.INTERFACE_ENTRY, "interface"),
+    Section("bgp", RequestType.BGP, "bgp"),
+    Section("ospf", RequestType.OSPF, "ospf"),
+)
+
+
+EMPTY_STATUSES = (204, 404)  # replies meaning the subtree is not configured
+
+
+class PollError(Exception):
+    """Device answered a poll with an error; the hash tree is left unchanged"""
+
+    def __init__(self, url: str, status_code: int):
+        super().__init__(f"{url}: status {status_code}")
+        self.url = url
+        self.status_code = status_code
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+@dataclasses.dataclass
+class HashNode:
+    """Node of the hash tree; leaves keep the running config of their object"""
+    digest: str
+    etag: Optional[str] = None
+    data: Any = None
+    children: Dict[str, "HashNode"] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def parent(cls, children: Dict[str, "HashNode"], etag: Optional[str] = None) -> "HashNode":
+        digest = _digest(sorted((key, child.digest) for key, child in children.items()))
+        return cls(digest, etag, children=children)
+
+
+@dataclasses.dataclass(frozen=True)
+class ObjectChange:
+    """Object changed on the device since the previous poll"""
+    name: str
+    kind: str  # "added", "removed" or "modified"
+
+
+@dataclasses.dataclass(frozen=True)
+class Drift:
+    """Desired object whose running config differs; difference is what the device lacks"""
+    name: str
+    difference: Dict[str, Any]
+    missing: bool = False
+
+
+def desired_state(vrfs: Iterable[VrfConfig] = (), interfaces: Iterable[InterfaceConfig] = (),
+                  bgp: Optional[Dict[str, Any]] = None, ospf: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Desired bodies keyed by object name, as reported by DriftWatcher"""
+    state = {f"vrf {vrf.name}": vrf.to_yang() for vrf in vrfs}
+    for interface in interfaces:
+        state[f"interface GigabitEthernet{interface.name.replace('GigabitEthernet', '')}"] = interface.to_yang2()
+    if bgp is not None:
+        state["bgp"] = bgp
+    if ospf is not None:
+        state["ospf"] = ospf
+    return state
+
+
+def _entries(data: Optional[Dict[str, Any]], list_name: str) -> List[Dict[str, Any]]:
+    """Entries of the child list in a section response, e.g. every VRF definition"""
+    if not data:
+        return []
+    value = next(iter(data.values()))
+    if isinstance(value, dict):
+        value = value.get(list_name, [])
+    return value if isinstance(value, list) else [value]
+
+
+class DriftWatcher:
+    """Hash tree of one device, refreshed by reading only the subtrees which changed"""
+
+    def __init__(self, handler: RestConfHandler, desired: Optional[Dict[str, Any]] = None,
+                 sections: Iterable[Section] = SECTIONS, probe_limit: int = 8, parallel: int = 4):
+        """
+        Initialize drift watcher
+
+        Args:
+            handler: Handler connected to the device
+            desired: Desired bodies keyed by object name, see desired_state()
+            sections: Parts of the native tree to watch
+            probe_limit: Largest number of children read one by one when a
+                section changed; bigger sections are read whole
+            parallel: Sections, and children of a section, read at once
+        """
+        self.handler = handler
+        self.desired = desired or {}
+        self.sections = list(sections)
+        self.probe_limit = probe_limit
+        self.parallel = parallel
+        self.tree: Dict[str, HashNode] = {}
+        self.drift: Dict[str, Drift] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def digest(self) -> Optional[str]:
+        """Root hash; equal on devices with the same watched config"""
+        return HashNode.parent(self.tree).digest if self.tree else None
+
+    def _get(self, url: str, etag: Optional[str] = None, body: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        result = self.handler.get_if_changed(url, etag, body)
+        # Anything but "unchanged" or "not there" leaves the tree as it was;
+        # reading an error as an empty section would report every object removed
+        if result["status_code"] not in (200, 304) + EMPTY_STATUSES:
+            raise PollError(url, result["status_code"])
+        return result
+
+    def poll(self) -> List[ObjectChange]:
+        """
+        Bring the hash tree up to date and return the objects changed since the last poll
+
+        The first poll reads every section whole and reports no changes.
+        Drift of every touched object is re-evaluated; see self.drift.
+        Raises PollError, without touching the tree, if the device answers
+        any read with an error.
+        """
+        first = not self.tree
+        changes, touched = [], set()
+        nodes = [self.tree.get(section.name) for section in self.sections]
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            updates = list(executor.map(self._poll_section, self.sections, nodes))
+        for section, node, updated in zip(self.sections, nodes, updates):
+            if updated is node:
+                continue
+            self.tree[section.name] = updated
+            for name, kind in self._compare(section, node, updated):
+                touched.add(name)
+                if node is not None:
+                    changes.append(ObjectChange(name, kind))
+        for name in (self.desired if first else touched):
+            self._check_drift(name)
+        return changes
+
+    def _poll_section(self, section: Section, node: Optional[HashNode]) -> HashNode:
+        url = self.handler._build_url(section.rq_type)
+        if section.list_name is None:
+            result = self._get(url, node.etag if node else None)
+            if result["status_code"] == 304 and node is not None:
+                return node
+            data = result["data"] if result["status_code"] == 200 else None
+            return HashNode(_digest(data), result["etag"], data=data)
+
+        head = self._get(url, node.etag if node else None, body=False)
+        if head["status_code"] == 304 and node is not None:
+            return node
+        if head["status_code"] in EMPTY_STATUSES:
+            return HashNode.parent({})
+        if node is None:
+            return self._read_section(section, url, head["etag"])
+        keys = self._get(with_query(url, fields=section.key_fields))
+        names = [str(entry["name"]) for entry in _entries(keys["data"], section.list_name) if "name" in entry]
+        if len(names) > self.probe_limit:
+            return self._read_section(section, url, head["etag"])
+
+        def read_child(key: str) -> Optional[HashNode]:
+            old = node.children.get(key)
+            child_url = self.handler._build_url(section.child_type, **{section.child_arg: key})
+            result = self._get(child_url, old.etag if old else None)
+            if result["status_code"] == 304 and old is not None:
+                return old
+            if result["status_code"] == 200:
+                entry = first_entry(result["data"])
+                return HashNode(_digest(entry), result["etag"], data=entry)
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            children = {key: child for key, child in zip(names, executor.map(read_child, names)) if child is not None}
+        return HashNode.parent(children, head["etag"])
+
+    def _read_section(self, section: Section, url: str, etag: Optional[str]) -> HashNode:
+        """Whole section in one request; child ETags are learned on later descents"""
+        result = self._get(url)
+        children = {str(entry["name"]): HashNode(_digest(entry), data=entry)
+                    for entry in _entries(result["data"], section.list_name) if "name" in entry}
+        return HashNode.parent(children, etag)
+
+    def _compare(self, section: Section, old: Optional[HashNode], new: HashNode):
+        """(object name, kind) of every object differing between two versions of a section"""
+        if section.list_name is None:
+            before = old.data if old is not None else None
+            if before is None and new.data is not None:
+                yield section.label, "added"
+            elif before is not None and new.data is None:
+                yield section.label, "removed"
+            elif before is not None and old.digest != new.digest:
+                yield section.label, "modified"
+            return
+        old_children = old.children if old is not None else {}
+        for key, child in new.children.items():
+            previous = old_children.get(key)
+            if previous is None:
+                yield section.label.format(key), "added"
+            elif previous.digest != child.digest:
+                yield section.label.format(key), "modified"
+        for key in old_children.keys() - new.children.keys():
+            yield section.label.format(key), "removed"
+
+    def _running(self, name: str) -> Any:
+        """Running config of an object, shaped like the response of its own URL"""
+        for section in self.sections:
+            node = self.tree.get(section.name)
+            if node is None:
+                continue
+            if section.list_name is None:
+                if name == section.label:
+                    return node.data
+                continue
+            prefix = section.label.replace("{}", "")
+            if name.startswith(prefix):
+                child = node.children.get(name[len(prefix):])
+                if child is not None:
+                    return {section.list_name: [child.data]}
+        return None
+
+    def _check_drift(self, name: str):
+        desired = self.desired.get(name)
+        if desired is None:
+            return
+        running = self._running(name)
+        difference = diff(desired, running) if running is not None else desired
+        if difference is None:
+            self.drift.pop(name, None)
+        else:
+            self.drift[name] = Drift(name, difference, missing=running is None)
+
+
+def route_leaking_state() -> Dict[str, Any]:
+    """Desired state of the route leaking scenario from main.py"""
+    import main
+    return desired_state([main.VRF_A, main.VRF_B], [main.INT_A, main.INT_B],
+                         RestConfHandler._bgp_body(main.BGP_AS, [main.VRF_A, main.VRF_B], [main.OSPF_A, main.OSPF_B],
+                                                   main.BGP_ROUTER_ID),
+                         RestConfHandler._ospf_body([main.OSPF_A, main.OSPF_B]))
+
+
+def main():
+    from fleet import load_inventory
+
+    parser = argparse.ArgumentParser(description="Wykrywa zmiany konfiguracji wprowadzone poza automatyzacją.")
+    parser.add_argument("inventory", help="Plik JSON lub lista adresów IP (jeden na linię).")
+    parser.add_argument("--interval", type=float, default=300.0, help="Odstęp między odpytaniami w sekundach.")
+    parser.add_argument("--polls", type=int, help="Liczba odpytań (domyślnie bez końca).")
+    parser.add_argument("--workers", type=int, default=32, help="Maksymalna liczba urządzeń odpytywanych naraz.")
+    args = parser.parse_args()
+
+    desired = route_leaking_state()
+    watchers = {}
+    for device in load_inventory(args.inventory):
+        handler = RestConfHandler(device.ip, device.username, device.password, port=device.port)
+        watchers[device.name] = DriftWatcher(handler, desired)
+
+    def poll(item):
+        name, watcher = item
+        try:
+            return name, watcher.poll(), None
+        except Exception as e:
+            return name, [], str(e)
+
+    count = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        while args.polls is None or count < args.polls:
+            start = time.monotonic()
+            requests_before = sum(watcher.requests for watcher in watchers.values())
+            for name, changes, error in executor.map(poll, watchers.items()):
+                if error:
+                    print(f"{name}: {error}")
+                for change in changes:
+                    print(f"{name}: {change.name} {change.kind}")
+            drifted = sorted((name, drift.name, drift.missing)
+                             for name, watcher in watchers.items() for drift in watcher.drift.values())
+            for name, obj, missing in drifted:
+                print(f"{name}: {obj} {'missing' if missing else 'differs from the desired state'}")
+            requests = sum(watcher.requests for watcher in watchers.values()) - requests_before
+            print(f"Poll {count + 1}: {len(watchers)} devices, {requests} requests, {len(drifted)} drifted objects, "
+                  f"{time.monotonic() - start:.2f} s", flush=True)
+            count += 1
+            if args.polls is None or count < args.polls:
+                time.sleep(max(0.0, args.interval - (time.monotonic() - start)))
+    for watcher in watchers.values():
+        watcher.handler.close()
+
+
+if __name__ == "__main__":
+    main()
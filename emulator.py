@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+In-process RESTCONF emulator of Cisco IOS-XE devices.
+
+Every virtual device serves its own copy of a native config tree (by default
+models/examples/dumped_config_REST.txt) over HTTPS and implements
+GET/HEAD/PATCH/POST/PUT/DELETE with merge semantics for the
+Cisco-IOS-XE-native:native paths RestConfHandler builds, plus RFC 8072
+YANG Patch on the native root. Latency, jitter, concurrency limits and error
+injection are configurable, and a Fleet runs many devices at once.
+
+Usage:
+    python emulator.py --devices 50 --latency 0.05 --jitter 0.02 > inventory.json
+    python fleet.py inventory.json
+"""
+import argparse
+import base64
+import copy
+import email.utils
+import hashlib
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from diff import LIST_KEYS
+from models.native import DEFAULT_CONFIG, NATIVE, load_native
+from query import FieldsTree, parse_fields, query_params
+
+DATA_PREFIX = "/restconf/data/"
+
+_CERT_DIR = None
+
+
+class RestconfError(Exception):
+    """Error reported to the client in the ietf-restconf:errors format"""
+
+    def __init__(self, status: int, tag: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.tag = tag
+        self.message = message
+
+    def to_yang(self) -> Dict[str, Any]:
+        return {"ietf-restconf:errors": {"error": [{
+            "error-type": "application",
+            "error-tag": self.tag,
+            "error-message": self.message
+        }]}}
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Generate a throwaway self-signed certificate with the openssl CLI"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def _shared_cert() -> Tuple[str, str]:
+    """One certificate per process, so starting many devices stays cheap"""
+    global _CERT_DIR
+    if _CERT_DIR is None:
+        _CERT_DIR = tempfile.TemporaryDirectory()
+        make_self_signed_cert(_CERT_DIR.name)
+    return os.path.join(_CERT_DIR.name, "cert.pem"), os.path.join(_CERT_DIR.name, "key.pem")
+
+
+# Config tree operations
+
+def _local_name(key: str) -> str:
+    return key.rsplit(":", 1)[-1]
+
+
+def _find_key(node: Dict[str, Any], name: str) -> Optional[str]:
+    """Stored key of a child, matching on the local name"""
+    local = _local_name(name)
+    for key in node:
+        if _local_name(key) == local:
+            return key
+    return None
+
+
+def _key_leaf(entry: Any) -> Optional[str]:
+    if isinstance(entry, dict):
+        for key in LIST_KEYS:
+            if key in entry and not isinstance(entry[key], (dict, list)):
+                return key
+    return None
+
+
+def _find_entry(entries: List[Any], key_value: str) -> Optional[int]:
+    for index, entry in enumerate(entries):
+        leaf = _key_leaf(entry)
+        if leaf is not None and str(entry[leaf]) == key_value:
+            return index
+    if "," in key_value:
+        # Lists with several keys, e.g. process-id-vrf=101,CUSTOMER_A: first key
+        # by its leaf, the others by value since the schema is not known here
+        first, *others = key_value.split(",")
+        for index, entry in enumerate(entries):
+            leaf = _key_leaf(entry)
+            if leaf is not None and str(entry[leaf]) == first:
+                values = {str(value) for value in entry.values() if not isinstance(value, (dict, list))}
+                if all(other in values for other in others):
+                    return index
+    return None
+
+
+def merge(target: Any, value: Any) -> Any:
+    """Merge value into target following RESTCONF PATCH semantics and return the result"""
+    if isinstance(target, list):
+        for entry in value if isinstance(value, list) else [value]:
+            leaf = _key_leaf(entry)
+            index = _find_entry(target, str(entry[leaf])) if leaf else None
+            if index is not None:
+                target[index] = merge(target[index], entry)
+            elif leaf is not None or entry not in target:
+                target.append(copy.deepcopy(entry))
+        return target
+    if isinstance(target, dict) and isinstance(value, dict):
+        for key, child in value.items():
+            stored = _find_key(target, key)
+            if stored is None:
+                target[key] = copy.deepcopy(child)
+            else:
+                target[stored] = merge(target[stored], child)
+        return target
+    return copy.deepcopy(value)
+
+
+def _parse_segment(segment: str) -> Tuple[str, Optional[str]]:
+    name, sep, key = segment.partition("=")
+    return unquote(name), unquote(key) if sep else None
+
+
+def split_path(path: str) -> List[str]:
+    """Segments of a data resource path, still percent-encoded"""
+    return [segment for segment in path.strip("/").split("/") if segment]
+
+
+class ConfigTree:
+    """Datastore of a single virtual device"""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self.lock = threading.RLock()
+        self.last_modified = time.time()
+
+    def locate(self, segments: List[str]) -> Tuple[Any, Any]:
+        """Return (container, slot) such that container[slot] is the addressed node"""
+        node, container, slot = self.root, None, None
+        for segment in segments:
+            name, key = _parse_segment(segment)
+            stored = _find_key(node, name) if isinstance(node, dict) else None
+            if stored is None:
+                raise RestconfError(404, "invalid-value", f"uri keypath not found: {name}")
+            container, slot, node = node, stored, node[stored]
+            if key is not None:
+                index = _find_entry(node, key) if isinstance(node, list) else None
+                if index is None:
+                    raise RestconfError(404, "invalid-value", f"uri keypath not found: {name}={key}")
+                container, slot, node = node, index, node[index]
+        return container, slot
+
+    @staticmethod
+    def qualified_name(segments: List[str]) -> str:
+        """Name of the addressed node as it appears in responses, with its module prefix"""
+        module = "Cisco-IOS-XE-native"
+        for segment in segments:
+            name = _parse_segment(segment)[0]
+            if ":" in name:
+                module = name.split(":", 1)[0]
+        return f"{module}:{_local_name(_parse_segment(segments[-1])[0])}"
+
+    def get(self, segments: List[str]) -> Dict[str, Any]:
+        container, slot = self.locate(segments)
+        node = container[slot]
+        name = self.qualified_name(segments)
+        return {name: [node] if isinstance(container, list) else node}
+
+    @staticmethod
+    def _body_value(segments: List[str], body: Dict[str, Any]) -> Any:
+        if not isinstance(body, dict) or len(body) != 1:
+            raise RestconfError(400, "malformed-message", "body must contain exactly one node")
+        key, value = next(iter(body.items()))
+        expected = _local_name(_parse_segment(segments[-1])[0])
+        if _local_name(key) != expected:
+            raise RestconfError(400, "malformed-message", f"expected node {expected}, got {key}")
+        return value
+
+    def patch(self, segments: List[str], body: Dict[str, Any]):
+        value = self._body_value(segments, body)
+        try:
+            container, slot = self.locate(segments)
+        except RestconfError:
+            # IOS-XE creates missing containers (not list entries) on PATCH
+            if len(segments) < 2 or _parse_segment(segments[-1])[1] is not None:
+                raise
+            container, slot = self.locate(segments[:-1])
+            parent = container[slot]
+            if not isinstance(parent, dict):
+                raise
+            parent[_parse_segment(segments[-1])[0]] = copy.deepcopy(value)
+            return
+        if isinstance(container, list) and isinstance(value, list):
+            value = value[0] if value else {}
+        container[slot] = merge(container[slot], value)
+
+    def post(self, segments: List[str], body: Dict[str, Any]):
+        container, slot = self.locate(segments)
+        parent = container[slot]
+        if not isinstance(parent, dict) or not isinstance(body, dict) or len(body) != 1:
+            raise RestconfError(400, "malformed-message", "body must contain exactly one child node")
+        key, value = next(iter(body.items()))
+        stored = _find_key(parent, key)
+        if stored is None:
+            parent[_local_name(key)] = copy.deepcopy(value if not _key_leaf(value) else [value])
+            return
+        existing = parent[stored]
+        if not isinstance(existing, list):
+            raise RestconfError(409, "data-exists", f"object already exists: {key}")
+        for entry in value if isinstance(value, list) else [value]:
+            leaf = _key_leaf(entry)
+            if leaf is None or _find_entry(existing, str(entry[leaf])) is not None:
+                raise RestconfError(409, "data-exists", f"object already exists: {key}")
+            existing.append(copy.deepcopy(entry))
+
+    def put(self, segments: List[str], body: Dict[str, Any]) -> bool:
+        """Replace the node; returns True if it was created"""
+        value = self._body_value(segments, body)
+        try:
+            container, slot = self.locate(segments)
+        except RestconfError:
+            container, slot = self.locate(segments[:-1])
+            name, key = _parse_segment(segments[-1])
+            parent = container[slot]
+            if key is None:
+                parent[name] = copy.deepcopy(value)
+            else:
+                parent.setdefault(name, []).extend(copy.deepcopy(value if isinstance(value, list) else [value]))
+            return True
+        if isinstance(container, list) and isinstance(value, list):
+            value = value[0] if value else {}
+        container[slot] = copy.deepcopy(value)
+        return False
+
+    def delete(self, segments: List[str]):
+        container, slot = self.locate(segments)
+        del container[slot]
+
+    def yang_patch(self, segments: List[str], body: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply an RFC 8072 patch atomically; raises with the yang-patch-status on failure"""
+        patch = body.get("ietf-yang-patch:yang-patch", {})
+        staged = ConfigTree(copy.deepcopy(self.root))
+        for edit in patch.get("edit", []):
+            target = segments + split_path(edit["target"])
+            try:
+                operation = edit["operation"]
+                if operation in ("merge", "create"):
+                    if operation == "create":
+                        try:
+                            staged.locate(target)
+                            raise RestconfError(409, "data-exists", f"object already exists: {edit['target']}")
+                        except RestconfError as e:
+                            if e.status != 404:
+                                raise
+                    try:
+                        staged.patch(target, edit["value"])
+                    except RestconfError as e:
+                        # Unlike a plain PATCH, a YANG Patch merge creates missing list entries
+                        if e.status != 404:
+                            raise
+                        staged.put(target, edit["value"])
+                elif operation in ("replace", "insert"):
+                    staged.put(target, edit["value"])
+                elif operation in ("delete", "remove"):
+                    try:
+                        staged.delete(target)
+                    except RestconfError:
+                        if operation == "delete":
+                            raise
+                else:
+                    raise RestconfError(400, "invalid-value", f"unsupported operation {operation}")
+            except RestconfError as e:
+                status = {"ietf-yang-patch:yang-patch-status": {
+                    "patch-id": patch.get("patch-id"),
+                    "edit-status": {"edit": [{
+                        "edit-id": edit["edit-id"],
+                        "errors": e.to_yang()["ietf-restconf:errors"]
+                    }]}
+                }}
+                raise YangPatchError(e.status, status)
+        self.root = staged.root
+        return {"ietf-yang-patch:yang-patch-status": {"patch-id": patch.get("patch-id"), "ok": [None]}}
+
+    def ietf_interfaces(self) -> Dict[str, Any]:
+        """Minimal ietf-interfaces view derived from the native interface list"""
+        interfaces = []
+        native_interfaces = self.root.get(NATIVE, {}).get("interface", {})
+        for kind, entries in native_interfaces.items():
+            for entry in entries if isinstance(entries, list) else []:
+                interfaces.append({"name": f"{kind}{entry.get('name')}", "enabled": "shutdown" not in entry})
+        return {"ietf-interfaces:interfaces": {"interface": interfaces}}
+
+
+class YangPatchError(Exception):
+    def __init__(self, status: int, body: Dict[str, Any]):
+        super().__init__(status)
+        self.status = status
+        self.body = body
+
+
+# Query parameters (RFC 8040, 4.8)
+
+def _select_fields(node: Any, tree: FieldsTree) -> Any:
+    if isinstance(node, list):
+        return [_select_fields(entry, tree) for entry in node]
+    if not isinstance(node, dict):
+        return node
+    selected = {}
+    for name, children in tree.items():
+        stored = _find_key(node, name)
+        if stored is not None:
+            selected[stored] = node[stored] if children is None else _select_fields(node[stored], children)
+    return selected
+
+
+def _limit_depth(node: Any, levels: int) -> Any:
+    """Node with at most levels of descendants; containers and lists deeper than that are empty"""
+    if isinstance(node, list):
+        return [_limit_depth(entry, levels) for entry in node] if levels > 0 else {}
+    if not isinstance(node, dict):
+        return node
+    if levels <= 0:
+        return {}
+    return {key: _limit_depth(value, levels - 1) for key, value in node.items()}
+
+
+def apply_query(data: Dict[str, Any], query: str) -> Dict[str, Any]:
+    """Response body reduced by the depth, fields and content query parameters"""
+    params = {name: values[-1] for name, values in parse_qs(query, keep_blank_values=True).items()}
+    unknown = set(params) - {"depth", "fields", "content"}
+    if unknown:
+        raise RestconfError(400, "invalid-value", f"unsupported query parameter: {', '.join(sorted(unknown))}")
+    depth = params.get("depth")
+    try:
+        query_params(int(depth) if depth and depth.isdigit() else depth, params.get("fields"), params.get("content"))
+    except ValueError as e:
+        raise RestconfError(400, "invalid-value", str(e))
+
+    name, node = next(iter(data.items()))
+    if params.get("content") == "nonconfig":
+        # The emulator only holds configuration
+        return {name: {}}
+    if params.get("fields"):
+        node = _select_fields(node, parse_fields(params["fields"]))
+    if depth and depth != "unbounded":
+        node = _limit_depth(node, int(depth) - 1)
+    return {name: node}
+
+
+def etag(value: Any) -> str:
+    digest = hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_DeviceServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+              content_type: str = "application/yang-data+json"):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload and self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _authorized(self) -> bool:
+        expected = base64.b64encode(f"{self.server.device.username}:{self.server.device.password}".encode()).decode()
+        return self.headers.get("Authorization") == f"Basic {expected}"
+
+    def _body(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise RestconfError(400, "malformed-message", "invalid JSON body")
+
+    def _handle(self):
+        device = self.server.device
+        body_read = False
+        if not device.slots.acquire(blocking=False):
+            self._drain()
+            self._send(503, RestconfError(503, "resource-denied", "too many requests").to_yang(),
+                       {"Retry-After": "1"})
+            return
+        try:
+            device.requests += 1
+            device.sleep(self.command)
+            if device.error_rate and random.random() < device.error_rate:
+                self._drain()
+                self._send(device.error_status,
+                           RestconfError(device.error_status, "operation-failed", "injected error").to_yang())
+                return
+            if not self._authorized():
+                self._drain()
+                self._send(401, headers={"WWW-Authenticate": 'Basic realm="restconf"'})
+                return
+
+            url = urlsplit(self.path)
+            if not url.path.startswith(DATA_PREFIX):
+                self._drain()
+                self._send(404, RestconfError(404, "invalid-value", "unknown resource").to_yang())
+                return
+            segments = split_path(url.path[len(DATA_PREFIX):])
+            body = self._body()
+            body_read = True
+            self._dispatch(device, segments, body, url.query)
+        except RestconfError as e:
+            if not body_read:
+                self._drain()
+            self._send(e.status, e.to_yang())
+        except YangPatchError as e:
+            self._send(e.status, e.body, content_type="application/yang-data+json")
+        finally:
+            device.slots.release()
+
+    def _drain(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+    def _dispatch(self, device: "VirtualDevice", segments: List[str], body: Optional[Dict[str, Any]],
+                  query: str = ""):
+        tree = device.tree
+        method = self.command
+        if method in ("GET", "HEAD"):
+            with tree.lock:
+                if segments == ["ietf-interfaces:interfaces"]:
+                    data = tree.ietf_interfaces()
+                else:
+                    data = tree.get(segments)
+                last_modified = tree.last_modified
+            if query:
+                data = apply_query(data, query)
+            tag = etag(data)
+            headers = {"ETag": tag, "Last-Modified": email.utils.formatdate(last_modified, usegmt=True)}
+            if self.headers.get("If-None-Match") == tag:
+                self._send(304, headers=headers)
+            else:
+                self._send(200, data, headers)
+            return
+
+        if method != "DELETE" and body is None:
+            raise RestconfError(400, "malformed-message", "missing body")
+        content_type = self.headers.get("Content-Type", "")
+        if method == "PATCH" and "yang-patch" in content_type:
+            with tree.lock:
+                status = tree.yang_patch(segments, body)
+                tree.last_modified = time.time()
+            self._send(200, status)
+            return
+
+        def apply(target: ConfigTree):
+            with target.lock:
+                result = {
+                    "PATCH": target.patch,
+                    "POST": target.post,
+                    "PUT": target.put,
+                    "DELETE": lambda path, _: target.delete(path)
+                }[method](segments, body)
+                target.last_modified = time.time()
+                return result
+
+        if device.apply_delay:
+            # Validate on a copy now and commit later, like the asynchronous IOS-XE config commit
+            with tree.lock:
+                created = apply(ConfigTree(copy.deepcopy(tree.root)))
+            threading.Timer(device.apply_delay, device.apply_quietly, (lambda: apply(tree),)).start()
+        else:
+            created = apply(tree)
+        self._send(201 if method == "POST" or created is True else 204)
+
+    do_GET = do_HEAD = do_PATCH = do_POST = do_PUT = do_DELETE = _handle
+
+
+class _DeviceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+    handshake_timeout = 10.0
+    device: "VirtualDevice"
+
+    def finish_request(self, request, client_address):
+        # The TLS handshake runs in the connection's own thread, so a slow or
+        # stalled client does not hold up accept() for everyone else
+        try:
+            request.settimeout(self.handshake_timeout)
+            request.do_handshake()
+            request.settimeout(None)
+        except OSError:
+            return
+        super().finish_request(request, client_address)
+
+
+class VirtualDevice:
+    """
+    A single emulated router listening on its own address and port
+
+    Use as a context manager, or call start() and stop().
+    """
+
+    def __init__(self, native: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0,
+                 username: str = "agh", password: str = "xd",
+                 latency: float = 0.0, jitter: float = 0.0, write_latency: float = 0.0,
+                 max_concurrent: int = 64, error_rate: float = 0.0, error_status: int = 500,
+                 apply_delay: float = 0.0):
+        """
+        Initialize virtual device
+
+        Args:
+            native: Config tree with the Cisco-IOS-XE-native:native root; the
+                bundled dump is used if omitted. The device works on a copy.
+            host: Address to listen on, e.g. 127.0.0.2 to emulate another router
+            port: Port to listen on; 0 picks a free one
+            username: Accepted Basic auth user
+            password: Accepted Basic auth password
+            latency: Mean added delay of every request in seconds
+            jitter: Maximum random deviation from latency in seconds
+            write_latency: Extra delay of config writes (the config commit)
+            max_concurrent: Requests handled at once; more get 503 with Retry-After
+            error_rate: Probability of answering with error_status instead
+            error_status: Status code used for injected errors
+            apply_delay: Seconds after which writes become visible to reads
+        """
+        self.tree = ConfigTree(copy.deepcopy(native if native is not None else load_native()))
+        self.host = host
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.write_latency = write_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.apply_delay = apply_delay
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.requests = 0
+
+        self._server = _DeviceServer((host, port), _RequestHandler)
+        self._server.device = self
+        # HTTPS only, like RESTCONF on IOS-XE and the handlers in api.py
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*_shared_cert())
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True,
+                                                  do_handshake_on_connect=False)
+        self.port = self._server.server_address[1]
+        self._thread: Optional[threading.Thread] = None
+
+    def sleep(self, method: str):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if method not in ("GET", "HEAD"):
+            delay += self.write_latency
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def apply_quietly(apply):
+        try:
+            apply()
+        except RestconfError as e:
+            print(f"Delayed write failed: {e.message}", file=sys.stderr)
+
+    @property
+    def native(self) -> Dict[str, Any]:
+        return self.tree.root[NATIVE]
+
+    def inventory_entry(self) -> Dict[str, Any]:
+        """Entry for fleet.py inventories"""
+        return {"ip": self.host, "port": self.port, "username": self.username, "password": self.password}
+
+    def start(self) -> "VirtualDevice":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class Fleet:
+    """Many virtual devices sharing one base config, each on its own port (or address)"""
+
+    def __init__(self, count: int, native: Optional[Dict[str, Any]] = None, hosts: Optional[List[str]] = None,
+                 base_port: int = 0, **device_options):
+        """
+        Initialize fleet
+
+        Args:
+            count: Number of devices
+            native: Config tree every device starts from
+            hosts: Addresses assigned round-robin, e.g. ["127.0.0.1", "127.0.0.2"]
+            base_port: First port (consecutive ports are used); 0 picks free ports
+            device_options: Passed to every VirtualDevice
+        """
+        native = native if native is not None else load_native()
+        hosts = hosts or ["127.0.0.1"]
+        self.devices = [
+            VirtualDevice(native, host=hosts[i % len(hosts)], port=base_port + i if base_port else 0,
+                          **device_options)
+            for i in range(count)
+        ]
+
+    def inventory(self) -> List[Dict[str, Any]]:
+        return [device.inventory_entry() for device in self.devices]
+
+    def start(self) -> "Fleet":
+        for device in self.devices:
+            device.start()
+        return self
+
+    def stop(self):
+        threads = [threading.Thread(target=device.stop) for device in self.devices]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulator urządzeń RESTCONF (Cisco IOS-XE).")
+    parser.add_argument("--devices", type=int, default=1, help="Liczba wirtualnych urządzeń.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Zrzut konfiguracji native (JSON).")
+    parser.add_argument("--host", action="append", help="Adres nasłuchiwania (można podać wiele razy).")
+    parser.add_argument("--base-port", type=int, default=8443, help="Port pierwszego urządzenia.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Opóźnienie każdego żądania (s).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Losowe odchylenie opóźnienia (s).")
+    parser.add_argument("--write-latency", type=float, default=0.0, help="Dodatkowe opóźnienie zapisów (s).")
+    parser.add_argument("--max-concurrent", type=int, default=64, help="Limit równoczesnych żądań na urządzenie.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Prawdopodobieństwo wstrzyknięcia błędu.")
+    parser.add_argument("--apply-delay", type=float, default=0.0, help="Po ilu sekundach zapis staje się widoczny.")
+    args = parser.parse_args()
+
+    fleet = Fleet(
+        args.devices, load_native(args.config), hosts=args.host, base_port=args.base_port,
+        latency=args.latency, jitter=args.jitter, write_latency=args.write_latency,
+        max_concurrent=args.max_concurrent, error_rate=args.error_rate, apply_delay=args.apply_delay
+    )
+    with fleet:
+        json.dump(fleet.inventory(), sys.stdout, indent=2)
+        print(flush=True)
+        print(f"{args.devices} devices running, Ctrl+C to stop", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
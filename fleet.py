@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Run the route leaking workflow across a fleet of devices concurrently.
+
+Usage:
+    python fleet.py inventory.json [--workers N] [--transaction | --apply | --schedule] [--metrics FILE] [--trace FILE]
+                    [--pace] [--rate N] [--retries N]
+
+The inventory is either a JSON list of objects with "ip" and optional
+"username", "password" and "port" keys, or a text file with one IP per line.
+"""
+import argparse
+import dataclasses
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+from api import RestConfHandler
+from instrumentation import Metrics
+from ratelimit import CircuitBreaker, DeviceLimiter, LimiterRegistry, RetryPolicy
+from tracing import Tracer
+from main import route_leaking_apply, route_leaking_scheduled, route_leaking_transaction, route_leaking_workflow, step_ok
+
+
+@dataclasses.dataclass
+class Device:
+    """Single entry of the fleet inventory"""
+    ip: str
+    username: str = "agh"
+    password: str = "xd"
+    port: int = 443
+
+    @property
+    def name(self) -> str:
+        return self.ip if self.port == 443 else f"{self.ip}:{self.port}"
+
+
+@dataclasses.dataclass
+class DeviceResult:
+    """Outcome of the workflow on a single device"""
+    device: Device
+    steps: Dict[str, int]
+    latency: float  # seconds spent on this device
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and all(step_ok(step, code) for step, code in self.steps.items())
+
+
+@dataclasses.dataclass
+class FleetReport:
+    """Summary of a whole fleet run"""
+    results: List[DeviceResult]
+    wall_time: float
+
+    @property
+    def failed(self) -> List[DeviceResult]:
+        return [result for result in self.results if not result.ok]
+
+    @property
+    def serial_time(self) -> float:
+        """Time the same run would take one device at a time"""
+        return sum(result.latency for result in self.results)
+
+
+def load_inventory(path: str) -> List[Device]:
+    """Load devices from a JSON list or a plain list of IP addresses"""
+    with open(path) as f:
+        content = f.read()
+    try:
+        entries = json.loads(content)
+    except json.JSONDecodeError:
+        return [Device(ip=line.strip()) for line in content.splitlines()
+                if line.strip() and not line.startswith("#")]
+    return [Device(
+        ip=entry["ip"],
+        username=entry.get("username", "agh"),
+        password=entry.get("password", "xd"),
+        port=entry.get("port", 443)
+    ) for entry in entries]
+
+
+def _no_log(*args, **kwargs):
+    pass
+
+
+class FleetRunner:
+    """
+    Runs a per-device workflow on many devices using a bounded thread pool
+
+    Each device is handled by exactly one worker, so the steps for a device
+    keep their order while different devices progress independently.
+    """
+
+    def __init__(self, workflow: Callable[..., Dict[str, int]] = route_leaking_workflow,
+                 max_workers: int = 32, metrics: Optional[Metrics] = None, tracer: Optional[Tracer] = None,
+                 limiters: Optional[LimiterRegistry] = None):
+        """
+        Initialize fleet runner
+
+        Args:
+            workflow: Function taking a connected handler and a log function,
+                returning status codes keyed by step name
+            max_workers: Maximum number of devices configured at once
+            metrics: Collector shared by the handlers of every device
+            tracer: Span collector shared by the handlers of every device
+            limiters: Source of the DeviceLimiter pacing each device; None
+                sends every request once, as fast as the workflow issues them
+        """
+        self.workflow = workflow
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self.tracer = tracer
+        self.limiters = limiters
+
+    def _run_device(self, device: Device) -> DeviceResult:
+        start = time.perf_counter()
+        try:
+            limiter = self.limiters.get(device.name) if self.limiters is not None else None
+            with RestConfHandler(device.ip, device.username, device.password, port=device.port,
+                                 metrics=self.metrics, tracer=self.tracer, limiter=limiter) as handler:
+                if not handler.test_connection():
+                    return DeviceResult(device, {}, time.perf_counter() - start, "device not reachable")
+                steps = self.workflow(handler, log=_no_log)
+            return DeviceResult(device, steps, time.perf_counter() - start)
+        except Exception as e:
+            return DeviceResult(device, {}, time.perf_counter() - start, str(e))
+
+    def run(self, inventory: List[Device]) -> Iterator[DeviceResult]:
+        """Yield per-device results as soon as each device finishes"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._run_device, device) for device in inventory]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run_all(self, inventory: List[Device], on_result: Callable[[DeviceResult], None] = _no_log) -> FleetReport:
+        """Run the whole fleet, calling on_result for every finished device"""
+        start = time.perf_counter()
+        results = []
+        for result in self.run(inventory):
+            on_result(result)
+            results.append(result)
+        return FleetReport(results, time.perf_counter() - start)
+
+
+def print_result(result: DeviceResult):
+    status = "OK  " if result.ok else "FAIL"
+    line = f"[{status}] {result.device.name:<21} {result.latency:8.2f} s"
+    if result.error:
+        line += f"  {result.error}"
+    elif not result.ok:
+        failed_steps = [step for step, code in result.steps.items() if not step_ok(step, code)]
+        line += f"  failed steps: {', '.join(failed_steps)}"
+    print(line, flush=True)
+
+
+def print_report(report: FleetReport):
+    latencies = sorted(result.latency for result in report.results)
+    print(f"\nDevices:          {len(report.results)} ({len(report.failed)} failed)")
+    print(f"Wall time:        {report.wall_time:.2f} s")
+    if latencies:
+        print(f"Device latency:   min {latencies[0]:.2f} s, "
+              f"median {latencies[len(latencies) // 2]:.2f} s, max {latencies[-1]:.2f} s")
+        print(f"Serial estimate:  {report.serial_time:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Konfiguruje route leaking na wielu urządzeniach równolegle.")
+    parser.add_argument("inventory", help="Plik JSON lub lista adresów IP (jeden na linię).")
+    parser.add_argument("--workers", type=int, default=32, help="Maksymalna liczba urządzeń konfigurowanych naraz.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--transaction", action="store_true",
+                      help="Wysyła całą konfigurację jednym żądaniem YANG Patch.")
+    mode.add_argument("--apply", action="store_true",
+                      help="Wysyła tylko zmiany względem bieżącej konfiguracji urządzenia.")
+    mode.add_argument("--schedule", action="store_true",
+                      help="Wykonuje niezależne kroki równolegle według zależności między nimi.")
+    parser.add_argument("--metrics", help="Zapisuje metryki żądań do pliku (*.prom w formacie Prometheus, inaczej JSON).")
+    parser.add_argument("--trace", help="Zapisuje przebieg żądań w formacie Chrome trace-event JSON.")
+    parser.add_argument("--pace", action="store_true",
+                        help="Dostosowuje liczbę równoległych zapisów do urządzenia, ponawia odrzucone żądania "
+                             "i przestaje wysyłać do urządzeń, które nie odpowiadają.")
+    parser.add_argument("--rate", type=float, help="Maksymalna liczba żądań na sekundę do jednego urządzenia "
+                                                   "(włącza --pace).")
+    parser.add_argument("--retries", type=int, default=3, help="Liczba ponowień odrzuconego żądania przy --pace.")
+    args = parser.parse_args()
+
+    workflow = route_leaking_workflow
+    if args.transaction:
+        workflow = route_leaking_transaction
+    elif args.apply:
+        workflow = route_leaking_apply
+    elif args.schedule:
+        workflow = route_leaking_scheduled
+    metrics = Metrics() if args.metrics else None
+    tracer = Tracer() if args.trace else None
+    limiters = None
+    if args.pace or args.rate:
+        limiters = LimiterRegistry(lambda name: DeviceLimiter(name, rate=args.rate,
+                                                               retry=RetryPolicy(attempts=args.retries + 1)))
+    runner = FleetRunner(workflow=workflow, max_workers=args.workers, metrics=metrics, tracer=tracer,
+                         limiters=limiters)
+    report = runner.run_all(load_inventory(args.inventory), on_result=print_result)
+    print_report(report)
+    if metrics is not None:
+        metrics.export(args.metrics)
+    if tracer is not None:
+        tracer.export(args.trace)
+    if limiters is not None:
+        retries = sum(limiter.retries for limiter in limiters.limiters())
+        open_circuits = [limiter.name for limiter in limiters.limiters() if limiter.breaker.state != CircuitBreaker.CLOSED]
+        print(f"Retries:          {retries}")
+        if open_circuits:
+            print(f"Open circuits:    {', '.join(open_circuits)}")
+    raise SystemExit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+In-memory index of the running configs of a fleet.
+
+Native trees (live, from dumps such as dumped_config_REST.txt, or from a
+SnapshotStore) are reduced to per-device facts, and secondary indexes
+answer fleet-wide questions without walking any JSON:
+
+    index = FleetIndex()
+    index.update("10.0.0.1", handler.get_native()["data"])
+    index.vrfs_importing("65000:200")          # VRFs importing a route target
+    index.interfaces_in_vrf("CUSTOMER_B")      # interfaces in a VRF, on every device
+    index.vrfs_without_rd()
+    index.interfaces_for_address("10.0.0.7")   # longest prefix match over interface subnets
+
+update() replaces the facts of one device and touches only the index
+entries of that device. Queries return their results in no particular order.
+
+Usage:
+    python fleet_index.py QUERY [ARG] [--dumps FILE...] [--store DIR]
+"""
+import argparse
+import dataclasses
+import ipaddress
+import os
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from models.native import NATIVE, load_native
+from snapshots import SnapshotStore
+
+IpNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class VrfRef(NamedTuple):
+    device: str
+    vrf: str
+
+
+class InterfaceRef(NamedTuple):
+    device: str
+    interface: str  # full name, e.g. GigabitEthernet0/0/1.100
+
+
+class AddressRef(NamedTuple):
+    """Address of an interface, with the VRF it belongs to ("" for the global table)"""
+    device: str
+    interface: str
+    address: str  # e.g. 10.0.0.1/24
+    vrf: str = ""
+
+
+@dataclasses.dataclass
+class VrfFacts:
+    name: str
+    rd: Optional[str] = None
+    import_rts: Tuple[str, ...] = ()
+    export_rts: Tuple[str, ...] = ()
+
+
+@dataclasses.dataclass
+class InterfaceFacts:
+    name: str
+    vrf: Optional[str] = None
+    addresses: Tuple[str, ...] = ()  # interfaces in CIDR notation, e.g. 10.0.0.1/24
+
+
+@dataclasses.dataclass
+class DeviceFacts:
+    """The parts of a native tree the index knows about"""
+    device: str
+    vrfs: Dict[str, VrfFacts]
+    interfaces: Dict[str, InterfaceFacts]
+
+
+# Parsing native trees
+
+def _local_name(key: str) -> str:
+    return key.rsplit(":", 1)[-1]
+
+
+def _entries(value: Any) -> List[Any]:
+    """Lists of one entry are sometimes encoded as the bare entry"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _route_targets(definition: Dict[str, Any], direction: str) -> Tuple[str, ...]:
+    """Route targets of a VRF, in the legacy route-target form or per address family"""
+    targets = [entry.get("asn-ip") for entry in _entries(definition.get("route-target", {}).get(direction))]
+    for family in definition.get("address-family", {}).values():
+        per_family = (family or {}).get("route-target", {}).get(f"{direction}-route-target", {})
+        targets += [entry.get("asn-ip") for entry in _entries(per_family.get("without-stitching"))]
+    return tuple(dict.fromkeys(target for target in targets if target))
+
+
+def _addresses(entry: Dict[str, Any]) -> Tuple[str, ...]:
+    addresses = []
+    ipv4 = entry.get("ip", {}).get("address", {})
+    for address in _entries(ipv4.get("primary")) + _entries(ipv4.get("secondary")):
+        if address.get("address") and address.get("mask"):
+            addresses.append(str(ipaddress.ip_interface(f"{address['address']}/{address['mask']}")))
+    for prefix in _entries(entry.get("ipv6", {}).get("address", {}).get("prefix-list")):
+        if prefix.get("prefix"):
+            addresses.append(str(ipaddress.ip_interface(prefix["prefix"])))
+    return tuple(addresses)
+
+
+def parse_native(device: str, tree: Dict[str, Any]) -> DeviceFacts:
+    """Facts of a device from its native tree, with or without the top-level native key"""
+    native = tree.get(NATIVE, tree)
+    vrfs = {}
+    for definition in _entries(native.get("vrf", {}).get("definition")):
+        name = definition.get("name")
+        if name is not None:
+            vrfs[name] = VrfFacts(name, definition.get("rd"), _route_targets(definition, "import"),
+                                  _route_targets(definition, "export"))
+    interfaces = {}
+    for kind, entries in native.get("interface", {}).items():
+        for entry in _entries(entries):
+            if not isinstance(entry, dict) or "name" not in entry:
+                continue
+            name = f"{_local_name(kind)}{entry['name']}"
+            interfaces[name] = InterfaceFacts(name, entry.get("vrf", {}).get("forwarding"), _addresses(entry))
+    return DeviceFacts(device, vrfs, interfaces)
+
+
+class PrefixTrie:
+    """Binary trie of IP networks of one address family, each holding a set of values"""
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self._root: List[Any] = [None, None, None]  # child for bit 0, child for bit 1, values
+
+    def _path(self, network: IpNetwork) -> Iterator[int]:
+        address = int(network.network_address)
+        for position in range(network.prefixlen):
+            yield (address >> (self.bits - 1 - position)) & 1
+
+    def add(self, network: IpNetwork, value: Any):
+        node = self._root
+        for bit in self._path(network):
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            node[2] = set()
+        node[2].add(value)
+
+    def remove(self, network: IpNetwork, value: Any):
+        """Remove a value, pruning branches left empty"""
+        trail = [self._root]
+        for bit in self._path(network):
+            node = trail[-1][bit]
+            if node is None:
+                return
+            trail.append(node)
+        values = trail[-1][2]
+        if values is None:
+            return
+        values.discard(value)
+        if values:
+            return
+        trail[-1][2] = None
+        for bit, (parent, node) in reversed(list(zip(self._path(network), zip(trail, trail[1:])))):
+            if node[0] is not None or node[1] is not None or node[2] is not None:
+                break
+            parent[bit] = None
+
+    def longest_match(self, address: IpNetwork) -> Set[Any]:
+        """Values of the most specific network containing the address (or network)"""
+        node, best = self._root, self._root[2]
+        for bit in self._path(address):
+            node = node[bit]
+            if node is None:
+                break
+            if node[2]:
+                best = node[2]
+        return set(best or ())
+
+    def covered(self, network: IpNetwork) -> Set[Any]:
+        """Values of every network equal to or inside the given one"""
+        node = self._root
+        for bit in self._path(network):
+            node = node[bit]
+            if node is None:
+                return set()
+        found, stack = set(), [node]
+        while stack:
+            node = stack.pop()
+            found.update(node[2] or ())
+            stack.extend(child for child in node[:2] if child is not None)
+        return found
+
+
+class FleetIndex:
+    """Secondary indexes over the facts of many devices, updated one device at a time"""
+
+    def __init__(self):
+        self._devices: Dict[str, DeviceFacts] = {}
+        self._vrf_interfaces: Dict[str, Set[InterfaceRef]] = {}
+        self._rt_import: Dict[str, Set[VrfRef]] = {}
+        self._rt_export: Dict[str, Set[VrfRef]] = {}
+        self._no_rd: Set[VrfRef] = set()
+        self._tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    # Updates
+    def update(self, device: str, tree: Dict[str, Any]) -> DeviceFacts:
+        """Index a device's native tree, replacing what was indexed for it before"""
+        facts = parse_native(device, tree)
+        with self._lock:
+            self._unindex(self._devices.pop(device, None))
+            self._index(facts)
+            self._devices[device] = facts
+        return facts
+
+    def remove(self, device: str) -> bool:
+        with self._lock:
+            facts = self._devices.pop(device, None)
+            self._unindex(facts)
+            return facts is not None
+
+    def load_dump(self, path: str, device: Optional[str] = None) -> DeviceFacts:
+        """Index a saved native dump; the device is named after the file by default"""
+        name = device or os.path.splitext(os.path.basename(path))[0]
+        return self.update(name, load_native(path))
+
+    @classmethod
+    def from_store(cls, store: SnapshotStore, at: Optional[float] = None) -> "FleetIndex":
+        """Index of every device in a SnapshotStore as it was at the given time (latest by default)"""
+        index = cls()
+        for device in store.devices():
+            tree = store.load(device, at)
+            if tree is not None:
+                index.update(device, tree)
+        return index
+
+    def _index(self, facts: DeviceFacts):
+        self._apply(facts, _add)
+
+    def _unindex(self, facts: Optional[DeviceFacts]):
+        if facts is not None:
+            self._apply(facts, _discard)
+
+    def _apply(self, facts: DeviceFacts, operation):
+        for vrf in facts.vrfs.values():
+            ref = VrfRef(facts.device, vrf.name)
+            for target in vrf.import_rts:
+                operation(self._rt_import, target, ref)
+            for target in vrf.export_rts:
+                operation(self._rt_export, target, ref)
+            if not vrf.rd:
+                (self._no_rd.add if operation is _add else self._no_rd.discard)(ref)
+        for interface in facts.interfaces.values():
+            if interface.vrf:
+                operation(self._vrf_interfaces, interface.vrf, InterfaceRef(facts.device, interface.name))
+            for address in interface.addresses:
+                network = ipaddress.ip_interface(address).network
+                value = AddressRef(facts.device, interface.name, address, interface.vrf or "")
+                trie = self._tries[network.version]
+                (trie.add if operation is _add else trie.remove)(network, value)
+
+    # Queries
+    def devices(self) -> List[str]:
+        with self._lock:
+            return sorted(self._devices)
+
+    def facts(self, device: str) -> Optional[DeviceFacts]:
+        with self._lock:
+            return self._devices.get(device)
+
+    def vrfs(self, device: str) -> List[str]:
+        """VRFs defined on a device"""
+        with self._lock:
+            facts = self._devices.get(device)
+            return sorted(facts.vrfs) if facts is not None else []
+
+    def interfaces_in_vrf(self, vrf: str, device: Optional[str] = None) -> List[InterfaceRef]:
+        with self._lock:
+            refs = self._vrf_interfaces.get(vrf, ())
+            return [ref for ref in refs if device is None or ref.device == device]
+
+    def vrfs_importing(self, route_target: str) -> List[VrfRef]:
+        with self._lock:
+            return list(self._rt_import.get(route_target, ()))
+
+    def vrfs_exporting(self, route_target: str) -> List[VrfRef]:
+        with self._lock:
+            return list(self._rt_export.get(route_target, ()))
+
+    def devices_importing(self, route_target: str) -> List[str]:
+        with self._lock:
+            return list({ref.device for ref in self._rt_import.get(route_target, ())})
+
+    def vrfs_without_rd(self) -> List[VrfRef]:
+        with self._lock:
+            return list(self._no_rd)
+
+    def interfaces_for_address(self, address: str, vrf: Optional[str] = None) -> List[AddressRef]:
+        """Interfaces on the most specific subnet containing the address"""
+        network = ipaddress.ip_network(address, strict=False)
+        with self._lock:
+            refs = self._tries[network.version].longest_match(network)
+        return [ref for ref in refs if vrf is None or ref.vrf == vrf]
+
+    def interfaces_in_prefix(self, prefix: str, vrf: Optional[str] = None) -> List[AddressRef]:
+        """Interfaces whose subnet lies within the prefix"""
+        network = ipaddress.ip_network(prefix, strict=False)
+        with self._lock:
+            refs = self._tries[network.version].covered(network)
+        return [ref for ref in refs if vrf is None or ref.vrf == vrf]
+
+
+def _add(index: Dict[str, Set[Any]], key: str, value: Any):
+    index.setdefault(key, set()).add(value)
+
+
+def _discard(index: Dict[str, Set[Any]], key: str, value: Any):
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+QUERIES = {
+    "vrfs": ("VRF-y urządzenia", FleetIndex.vrfs),
+    "vrf-interfaces": ("Interfejsy w VRF na wszystkich urządzeniach", FleetIndex.interfaces_in_vrf),
+    "rt-import": ("VRF-y importujące route target", FleetIndex.vrfs_importing),
+    "rt-export": ("VRF-y eksportujące route target", FleetIndex.vrfs_exporting),
+    "no-rd": ("VRF-y bez RD", lambda index, _: index.vrfs_without_rd()),
+    "address": ("Interfejsy w najbardziej szczegółowej podsieci zawierającej adres",
+                FleetIndex.interfaces_for_address),
+    "prefix": ("Interfejsy z podsieciami wewnątrz prefiksu", FleetIndex.interfaces_in_prefix),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zapytania o konfigurację wielu urządzeń.",
+                                     epilog="Zapytania: " + "; ".join(f"{name} - {help_text}"
+                                                                      for name, (help_text, _) in QUERIES.items()))
+    parser.add_argument("query", choices=sorted(QUERIES), help="Rodzaj zapytania.")
+    parser.add_argument("argument", nargs="?", default="", help="Nazwa VRF, urządzenia, route target, adres lub prefiks.")
+    parser.add_argument("--dumps", nargs="+", default=[],
+                        help="Pliki z konfiguracją native (nazwa pliku = nazwa urządzenia).")
+    parser.add_argument("--store", help="Katalog SnapshotStore; indeksuje najnowsze kopie wszystkich urządzeń.")
+    args = parser.parse_args()
+
+    if args.store:
+        index = FleetIndex.from_store(SnapshotStore(args.store))
+    else:
+        index = FleetIndex()
+    for path in args.dumps:
+        index.load_dump(path)
+    for row in sorted(QUERIES[args.query][1](index, args.argument)):
+        print(*row if isinstance(row, tuple) else (row,), sep="\t")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Request instrumentation for the RESTCONF handlers.
+
+A Metrics object passed to RestConfHandler / AsyncRestConfHandler receives a
+RequestRecord for every request: latency, bytes sent and received, status
+code, device and RequestType. Records are aggregated into histograms per
+(device, request type, method) which can be exported as Prometheus text or
+JSON, and are handed to user-supplied hooks as they arrive.
+
+    metrics = Metrics()
+    metrics.add_hook(lambda record: print(record.url, record.latency))
+    handler = RestConfHandler("10.0.0.1", metrics=metrics)
+    ...
+    print(metrics.to_prometheus())
+"""
+import bisect
+import dataclasses
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, Prometheus style ("le")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+@dataclasses.dataclass
+class RequestRecord:
+    """Single request as seen by the handler"""
+    device: str
+    method: str
+    url: str
+    request_type: str
+    status_code: Optional[int]  # None if the request failed without a response
+    latency: float  # seconds until the response was received
+    bytes_sent: int
+    bytes_received: int
+    error: Optional[str] = None
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count of observations <= le) for every bucket, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile, None if empty"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        for bound, (_, total) in zip(self.buckets, self.cumulative()):
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(self.cumulative())
+        }
+
+
+class _Series:
+    """Aggregates of one (device, request type, method) combination"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.bytes_sent = Histogram(SIZE_BUCKETS)
+        self.bytes_received = Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[str, int] = {}
+
+    def observe(self, record: RequestRecord):
+        self.latency.observe(record.latency)
+        self.bytes_sent.observe(record.bytes_sent)
+        self.bytes_received.observe(record.bytes_received)
+        status = str(record.status_code) if record.status_code is not None else "error"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """Thread-safe collector of request records"""
+
+    def __init__(self, hooks: Optional[List[Callable[[RequestRecord], None]]] = None):
+        """
+        Initialize collector
+
+        Args:
+            hooks: Functions called with every RequestRecord, e.g. to forward
+                them to another monitoring system
+        """
+        self.hooks = list(hooks or [])
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Callable[[RequestRecord], None]):
+        self.hooks.append(hook)
+
+    def record(self, record: RequestRecord):
+        key = (record.device, record.request_type, record.method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.observe(record)
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:
+                # A broken hook must not break the request it reports on
+                logger.exception("Metrics hook %r failed", hook)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"series": [{
+                "device": device,
+                "request_type": request_type,
+                "method": method,
+                "statuses": dict(series.statuses),
+                "latency_seconds": series.latency.to_dict(),
+                "bytes_sent": series.bytes_sent.to_dict(),
+                "bytes_received": series.bytes_received.to_dict()
+            } for (device, request_type, method), series in sorted(self._series.items())]}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        histograms = (
+            ("restconf_request_duration_seconds", "Time until the RESTCONF response was received.", "latency"),
+            ("restconf_request_size_bytes", "Size of the RESTCONF request body.", "bytes_sent"),
+            ("restconf_response_size_bytes", "Size of the RESTCONF response body.", "bytes_received")
+        )
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = ["# HELP restconf_requests_total RESTCONF requests by status code.",
+                     "# TYPE restconf_requests_total counter"]
+            for (device, request_type, method), values in series:
+                for status, count in sorted(values.statuses.items()):
+                    labels = _labels(device=device, request_type=request_type, method=method, status=status)
+                    lines.append(f"restconf_requests_total{labels} {count}")
+
+            for name, help_text, attribute in histograms:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (device, request_type, method), values in series:
+                    histogram = getattr(values, attribute)
+                    for bound, count in histogram.cumulative():
+                        labels = _labels(device=device, request_type=request_type, method=method, le=bound)
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _labels(device=device, request_type=request_type, method=method)
+                    lines.append(f"{name}_sum{labels} {histogram.sum}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """Write the metrics to a file, as Prometheus text for *.prom and JSON otherwise"""
+        with open(path, "w") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+def body_size(body: Any) -> int:
+    """Length of a request or response body as sent on the wire"""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return 0  # streamed (generator or file) bodies are not measured
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Route leak reachability between VRFs, computed with sparse matrices.
+
+Every VRF instance (device, VRF) is a node. With E the VRF x RT matrix of
+exported route targets and I the one of imported ones, D = E @ I.T has a
+non-zero D[u, v] exactly when v imports a route target u exports, i.e. the
+routes originated in u are installed in v: the direct leaks.
+
+MP-BGP does not export routes a VRF imported, so leaks chain only through
+VRFs which re-advertise what they learn (a CE in a hub-and-spoke design,
+redistribution, export maps). Transitive reach propagates tenants over D
+through those transit VRFs until nothing changes; by default every VRF is
+treated as transit, which gives the upper bound.
+
+A tenant is the VRF name by default, so instances of one VRF on different
+PEs talking to each other is not a leak. Leaks between different tenants
+are unintended unless the (source tenant, target tenant) pair is allowed.
+
+Usage:
+    python leak_analysis.py [--dumps FILE...] [--store DIR] [--allow SRC:DST ...] [--transitive]
+"""
+import argparse
+import dataclasses
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sparse
+
+from fleet_index import FleetIndex, VrfRef
+from models.interface import VrfConfig
+from snapshots import SnapshotStore
+
+
+@dataclasses.dataclass(frozen=True)
+class Leak:
+    """Routes of source installed in target through the given route targets"""
+    source: VrfRef
+    target: VrfRef
+    route_targets: Tuple[str, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class TenantLeak:
+    """Routes of a tenant reaching a VRF of another tenant, directly or through transit VRFs"""
+    source_tenant: str
+    target: VrfRef
+
+
+def _incidence(rows: Sequence[Iterable[str]], columns: Dict[str, int]) -> sparse.csr_matrix:
+    indptr, indices = [0], []
+    for targets in rows:
+        indices.extend(columns[target] for target in dict.fromkeys(targets))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix((data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+                             shape=(len(rows), len(columns)))
+
+
+class LeakGraph:
+    """Direct and transitive route leaks between VRF instances"""
+
+    def __init__(self, vrfs: Sequence[VrfRef], import_rts: Sequence[Iterable[str]],
+                 export_rts: Sequence[Iterable[str]], tenant: Callable[[VrfRef], str] = lambda ref: ref.vrf):
+        """
+        Initialize leak graph
+
+        Args:
+            vrfs: VRF instances
+            import_rts: Route targets imported by each VRF, in the order of vrfs
+            export_rts: Route targets exported by each VRF, in the order of vrfs
+            tenant: Tenant owning a VRF; leaks within a tenant are intended
+        """
+        self.vrfs = list(vrfs)
+        self.position = {ref: index for index, ref in enumerate(self.vrfs)}
+        self.import_rts = [tuple(targets) for targets in import_rts]
+        self.export_rts = [tuple(targets) for targets in export_rts]
+        route_targets = dict.fromkeys(target for targets in self.import_rts + self.export_rts for target in targets)
+        self.route_targets = {target: index for index, target in enumerate(route_targets)}
+
+        tenants = [tenant(ref) for ref in self.vrfs]
+        self.tenants = list(dict.fromkeys(tenants))
+        tenant_ids = {name: index for index, name in enumerate(self.tenants)}
+        self.tenant_of = np.array([tenant_ids[name] for name in tenants], dtype=np.int64)
+
+        exports = _incidence(self.export_rts, self.route_targets)
+        imports = _incidence(self.import_rts, self.route_targets)
+        direct = (exports @ imports.T).tocsr()
+        direct.setdiag(0)
+        direct.eliminate_zeros()
+        self.direct = direct  # direct[u, v] = number of route targets carrying routes of u into v
+
+    @classmethod
+    def from_configs(cls, configs: Iterable[VrfConfig], device: str = "", **kwargs) -> "LeakGraph":
+        """Graph of VrfConfig objects, all on one (possibly unnamed) device"""
+        configs = list(configs)
+        return cls([VrfRef(device, config.name) for config in configs],
+                   [[config.import_rt] if config.import_rt else [] for config in configs],
+                   [[config.export_rt] if config.export_rt else [] for config in configs], **kwargs)
+
+    @classmethod
+    def from_index(cls, index: FleetIndex, **kwargs) -> "LeakGraph":
+        """Graph of every VRF of every device in a FleetIndex"""
+        vrfs, import_rts, export_rts = [], [], []
+        for device in index.devices():
+            for vrf in index.facts(device).vrfs.values():
+                vrfs.append(VrfRef(device, vrf.name))
+                import_rts.append(vrf.import_rts)
+                export_rts.append(vrf.export_rts)
+        return cls(vrfs, import_rts, export_rts, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.vrfs)
+
+    # Single VRF queries
+    def leaks_from(self, ref: VrfRef) -> List[VrfRef]:
+        """VRFs installing the routes originated in ref"""
+        row = self.direct.getrow(self.position[ref])
+        return [self.vrfs[index] for index in row.indices]
+
+    def leaks_into(self, ref: VrfRef) -> List[VrfRef]:
+        """VRFs whose routes ref installs"""
+        column = self.direct.getcol(self.position[ref]).tocoo()
+        return [self.vrfs[index] for index in column.row]
+
+    def reachable_from(self, ref: VrfRef, transit: Optional[Set[VrfRef]] = None) -> List[VrfRef]:
+        """VRFs the routes of ref can reach, forwarded only by transit VRFs (all by default)"""
+        start = self.position[ref]
+        seen = np.zeros(len(self.vrfs), dtype=bool)
+        seen[start] = True
+        forwarding = self._transit_mask(transit)
+        frontier = np.array([start])
+        while frontier.size:
+            reached = self.direct[frontier].indices
+            reached = np.unique(reached[~seen[reached]])
+            seen[reached] = True
+            frontier = reached[forwarding[reached]]
+        seen[start] = False
+        return [self.vrfs[index] for index in np.flatnonzero(seen)]
+
+    def _transit_mask(self, transit: Optional[Set[VrfRef]]) -> np.ndarray:
+        if transit is None:
+            return np.ones(len(self.vrfs), dtype=bool)
+        mask = np.zeros(len(self.vrfs), dtype=bool)
+        mask[[self.position[ref] for ref in transit if ref in self.position]] = True
+        return mask
+
+    # Fleet-wide analysis
+    def _allowed_codes(self, allowed: Iterable[Tuple[str, str]]) -> np.ndarray:
+        ids = {name: index for index, name in enumerate(self.tenants)}
+        return np.array([ids[source] * len(self.tenants) + ids[target] for source, target in allowed
+                         if source in ids and target in ids], dtype=np.int64)
+
+    def unintended_leaks(self, allowed: Iterable[Tuple[str, str]] = ()) -> List[Leak]:
+        """Direct leaks between different tenants whose (source, target) tenant pair is not allowed"""
+        edges = self.direct.tocoo()
+        source_tenant, target_tenant = self.tenant_of[edges.row], self.tenant_of[edges.col]
+        flagged = (source_tenant != target_tenant) & ~np.isin(
+            source_tenant * len(self.tenants) + target_tenant, self._allowed_codes(allowed))
+        leaks = []
+        for source, target in zip(edges.row[flagged], edges.col[flagged]):
+            carried = tuple(rt for rt in self.export_rts[source] if rt in set(self.import_rts[target]))
+            leaks.append(Leak(self.vrfs[source], self.vrfs[target], carried))
+        return leaks
+
+    def tenant_reach(self, transit: Optional[Set[VrfRef]] = None, max_hops: Optional[int] = None) -> sparse.csr_matrix:
+        """
+        VRF x tenant matrix, non-zero where routes of the tenant can be installed in the VRF
+
+        Starts from each VRF's own tenant and adds one hop of direct leaks per
+        round, forwarding learned routes only from transit VRFs, until no
+        entry is added or max_hops rounds are done.
+        """
+        count = len(self.vrfs)
+        own = sparse.csr_matrix((np.ones(count, dtype=np.int32), (np.arange(count), self.tenant_of)),
+                                shape=(count, len(self.tenants)))
+        forwarding = sparse.diags(self._transit_mask(transit), dtype=np.int32)
+        incoming = self.direct.T.tocsr()
+        learned = sparse.csr_matrix(own.shape, dtype=np.int32)
+        hops = 0
+        while max_hops is None or hops < max_hops:
+            updated = incoming @ (own + forwarding @ learned)
+            updated.data[:] = 1
+            hops += 1
+            if updated.nnz == learned.nnz:
+                break
+            learned = updated
+        reach = own + learned
+        reach.data[:] = 1
+        return reach.tocsr()
+
+    def unintended_reach(self, allowed: Iterable[Tuple[str, str]] = (), transit: Optional[Set[VrfRef]] = None,
+                         max_hops: Optional[int] = None) -> List[TenantLeak]:
+        """Tenants whose routes can reach a VRF of another tenant, directly or transitively, without being allowed"""
+        reach = self.tenant_reach(transit, max_hops).tocoo()
+        target_tenant = self.tenant_of[reach.row]
+        flagged = (reach.col != target_tenant) & ~np.isin(
+            reach.col * len(self.tenants) + target_tenant, self._allowed_codes(allowed))
+        return [TenantLeak(self.tenants[tenant], self.vrfs[vrf])
+                for vrf, tenant in zip(reach.row[flagged], reach.col[flagged])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wykrywa niezamierzone przecieki tras między VRF-ami.")
+    parser.add_argument("--dumps", nargs="+", default=[],
+                        help="Pliki z konfiguracją native (nazwa pliku = nazwa urządzenia).")
+    parser.add_argument("--store", help="Katalog SnapshotStore; analizuje najnowsze kopie wszystkich urządzeń.")
+    parser.add_argument("--allow", nargs="+", default=[], metavar="SRC:DST",
+                        help="Dozwolone przecieki między VRF-ami, np. CUSTOMER_A:CUSTOMER_B.")
+    parser.add_argument("--transitive", action="store_true",
+                        help="Uwzględnia przecieki przez VRF-y, które rozgłaszają dalej poznane trasy.")
+    args = parser.parse_args()
+
+    index = FleetIndex.from_store(SnapshotStore(args.store)) if args.store else FleetIndex()
+    for path in args.dumps:
+        index.load_dump(path)
+    graph = LeakGraph.from_index(index)
+    allowed = [tuple(pair.split(":", 1)) for pair in args.allow]
+    if args.transitive:
+        leaks = sorted((leak.source_tenant, leak.target) for leak in graph.unintended_reach(allowed))
+        for source, target in leaks:
+            print(f"{source} -> {target.device} {target.vrf}")
+    else:
+        leaks = sorted(graph.unintended_leaks(allowed), key=lambda leak: (leak.source, leak.target))
+        for leak in leaks:
+            print(f"{leak.source.device} {leak.source.vrf} -> {leak.target.device} {leak.target.vrf} "
+                  f"via {', '.join(leak.route_targets)}")
+    print(f"\nVRFs: {len(graph)}, unintended leaks: {len(leaks)}")
+    raise SystemExit(1 if leaks else 0)
+
+
+if __name__ == "__main__":
+    main()
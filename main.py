@@ -1,28 +1,84 @@
+import functools
 from api import RestConfHandler
+from diff import Plan
 from models.interface import InterfaceConfig, InterfaceType, VrfConfig
-from time import sleep
+from models.routing import OspfConfig, OspfNetwork
+from readiness import StepTimer
+from scheduler import OperationGraph, Scheduler, compile_route_leaking
+from typing import Dict, Optional
+from yang_patch import YangPatch
 
+# Desired state of the route leaking scenario
+VRF_A = VrfConfig(
+    name="CUSTOMER_A",
+    rd="65000:100",
+    export_rt="65000:100",
+    import_rt="65000:200"
+)
+VRF_B = VrfConfig(
+    name="CUSTOMER_B",
+    rd="65000:200",
+    export_rt="65000:200",
+    import_rt="65000:100"
+)
+# Interface for Customer A
+INT_A = InterfaceConfig(
+    name="GigabitEthernet0/0/1",
+    description="Customer A Interface",
+    ip_addr="11.0.0.1",
+    ip_mask="255.255.255.0",
+    vrf="CUSTOMER_A"
+)
+# Interface for Customer B
+INT_B = InterfaceConfig(
+    name="GigabitEthernet0/0/2",
+    description="Customer B Interface",
+    ip_addr="12.0.0.1",
+    ip_mask="255.255.255.0",
+    vrf="CUSTOMER_B"
+)
+# OSPF towards the customers, redistributed into BGP
+OSPF_A = OspfConfig(process_id=101, vrf="CUSTOMER_A", networks=[OspfNetwork("11.0.0.0", "0.255.255.255", 11)])
+OSPF_B = OspfConfig(process_id=102, vrf="CUSTOMER_B", networks=[OspfNetwork("12.0.0.0", "0.255.255.255", 12)])
+# AS and router-id of the BGP process configured on the lab router
+BGP_AS = 65500
+BGP_ROUTER_ID = "1.1.1.1"
 
-def educational_route_leaking_demo():
-    """
-    Educational demonstration of route leaking configuration using RESTCONF
+# Non-2xx statuses which still mean a step did its job, keyed by the step kind
+# (the part of the step name before the object, e.g. "create_vrf")
+ACCEPTED_STATUSES = {
+    "create_vrf": (409,),  # data-exists: the VRF is already there, e.g. on a re-run
+}
 
-    This function demonstrates the key concepts and steps for configuring
-    route leaking between VRFs using programmatic interfaces.
+
+def step_ok(step: str, status_code: int) -> bool:
+    """Whether a step of the route leaking workflows succeeded, given its status code"""
+    return 200 <= status_code < 300 or status_code in ACCEPTED_STATUSES.get(step.split(" ", 1)[0], ())
+
+
+def route_leaking_workflow(handler: RestConfHandler, log=print, timer: Optional[StepTimer] = None) -> Dict[str, int]:
     """
+    Route leaking configuration steps for a single, already reachable device
 
-    # Step 1: Connect to device
-    print("*****Step 1: Connecting to network device...")
-    handler = RestConfHandler("10.0.0.1")  # Replace with your device IP
-    if not handler.test_connection():
-        print("Cannot connect to device. Check IP, credentials, and RESTCONF enablement.")
-        return
-    print("✅ Connected successfully!\n")
-    sleep(2)
+    Steps run strictly in order (VRF -> interface -> OSPF -> BGP), since each
+    one depends on the configuration pushed by the previous one. After every
+    write the device is polled until it reports the new configuration, so the
+    next step starts as soon as the previous one is applied.
+
+    Args:
+        handler: Handler connected to the device
+        log: Function used to report progress, e.g. print or a no-op for fleet runs
+        timer: Collects the wall time of every step
+
+    Returns:
+        Status code of every configuration request, keyed by step name
+    """
+    results = {}
+    timer = timer if timer is not None else StepTimer()
 
 ######################################################################
     # Step 2: Create VRFs for route leaking
-    print("\n\n*****Step 2: Creating VRFs...")
+    log("\n\n*****Step 2: Creating VRFs...")
     # VRF for customer A
     vrf_a = VrfConfig.default_yang(
         name="CUSTOMER_A"
@@ -31,78 +87,177 @@ def educational_route_leaking_demo():
     vrf_b = VrfConfig.default_yang(
         name="CUSTOMER_B"
     )
-    result_a = handler.create_vrf_from_yang(vrf_a)
-    result_b = handler.create_vrf_from_yang(vrf_b)
-    print(f"VRF CUSTOMER_A: {result_a['status_code']}")
-    print(f"VRF CUSTOMER_B: {result_b['status_code']}\n")
-
-    print("\n**Step 2.1: Configuring VRFS")
-    vrf_a = VrfConfig(
-        name="CUSTOMER_A",
-        rd="65000:100",
-        export_rt="65000:100",
-        import_rt="65000:200"
-    )
-    vrf_a_result = handler.patch_vrf(vrf_a, vrf_a.name)
-    print(f"VRF CUSTOMER_A: {vrf_a_result['status_code']}")
-
-    vrf_b = VrfConfig(
-        name="CUSTOMER_B",
-        rd="65000:200",
-        export_rt="65000:200",
-        import_rt="65000:100"
-    )
-    vrf_b_result = handler.patch_vrf(vrf_b, vrf_b.name)
-    print(f"VRF CUSTOMER_B: {vrf_b_result['status_code']}")
-    sleep(4)
+    with timer.step("create_vrf"):
+        result_a = handler.create_vrf_from_yang(vrf_a)
+        result_b = handler.create_vrf_from_yang(vrf_b)
+        for name in ("CUSTOMER_A", "CUSTOMER_B"):
+            if not handler.wait_for_vrf(name):
+                log(f"VRF {name} not reported by the device, continuing anyway")
+    results["create_vrf CUSTOMER_A"] = result_a['status_code']
+    results["create_vrf CUSTOMER_B"] = result_b['status_code']
+    log(f"VRF CUSTOMER_A: {result_a['status_code']}")
+    log(f"VRF CUSTOMER_B: {result_b['status_code']}\n")
+
+    log("\n**Step 2.1: Configuring VRFS")
+    vrf_a = VRF_A
+    vrf_b = VRF_B
+    with timer.step("patch_vrf", replaced_sleep=4):
+        vrf_a_result = handler.patch_vrf(vrf_a, vrf_a.name)
+        results["patch_vrf CUSTOMER_A"] = vrf_a_result['status_code']
+        log(f"VRF CUSTOMER_A: {vrf_a_result['status_code']}")
+
+        vrf_b_result = handler.patch_vrf(vrf_b, vrf_b.name)
+        results["patch_vrf CUSTOMER_B"] = vrf_b_result['status_code']
+        log(f"VRF CUSTOMER_B: {vrf_b_result['status_code']}")
+
+        # Interfaces can only be assigned once the VRF has its address family
+        for vrf in (vrf_a, vrf_b):
+            if not handler.wait_for_vrf(vrf.name, rd=vrf.rd):
+                log(f"VRF {vrf.name} not configured on the device, continuing anyway")
 
 ######################################################################
     # Step 3: Configure interfaces and assign to VRFs
-    print("\n\n*****Step 3: Configuring interfaces...")
-
-    # Interface for Customer A
-    int_a = InterfaceConfig(
-        name="GigabitEthernet0/0/1",
-        description="Customer A Interface",
-        ip_addr="11.0.0.1",
-        ip_mask="255.255.255.0",
-        vrf="CUSTOMER_A"
-    )
-
-    # Interface for Customer B
-    int_b = InterfaceConfig(
-        name="GigabitEthernet0/0/2",
-        description="Customer B Interface",
-        ip_addr="12.0.0.1",
-        ip_mask="255.255.255.0",
-        vrf="CUSTOMER_B"
-    )
-    result_int_a = handler.update_interface(int_a)
-    print(f"Interface GigE0/0/1 (Customer A): {result_int_a['status_code']}")
+    log("\n\n*****Step 3: Configuring interfaces...")
+    int_a = INT_A
+    int_b = INT_B
+    with timer.step("update_interface A", replaced_sleep=2):
+        result_int_a = handler.update_interface(int_a)
+        results["update_interface GigabitEthernet0/0/1"] = result_int_a['status_code']
+        log(f"Interface GigE0/0/1 (Customer A): {result_int_a['status_code']}")
+        if not handler.wait_for_interface(int_a):
+            log(f"Interface {int_a.name} not in VRF {int_a.vrf}, continuing anyway")
 
-    sleep(2)
-    result_int_b = handler.update_interface(int_b)
-    print(f"Interface GigE0/0/2 (Customer B): {result_int_b['status_code']}")
-    sleep(3)
+    with timer.step("update_interface B", replaced_sleep=3):
+        result_int_b = handler.update_interface(int_b)
+        results["update_interface GigabitEthernet0/0/2"] = result_int_b['status_code']
+        log(f"Interface GigE0/0/2 (Customer B): {result_int_b['status_code']}")
+        if not handler.wait_for_interface(int_b):
+            log(f"Interface {int_b.name} not in VRF {int_b.vrf}, continuing anyway")
 
 ######################################################################
     # OSPF
-    print("\n\n*****Step 4: Configuring OSPF")
-    ospf_result = handler.create_ospfs()
-    print(ospf_result['status_code'])
-    sleep(2)
+    log("\n\n*****Step 4: Configuring OSPF")
+    with timer.step("create_ospfs", replaced_sleep=2):
+        ospf_result = handler.create_ospfs([OSPF_A, OSPF_B])
+        results["create_ospfs"] = ospf_result['status_code']
+        log(ospf_result['status_code'])
+        if not handler.wait_for_ospf([OSPF_A.process_id, OSPF_B.process_id]):
+            log("OSPF processes not reported by the device, continuing anyway")
 
 ######################################################################
     # BGP
-    print("\n\n*****Step 5: Configuring BGP address families...")
-    bgp_result_a = handler.create_bgp(
-        as_number=65000,
-        vrf_name="CUSTOMER_A",
-        rd="65000:100",
-        import_rt="65000:200",
-        export_rt="65000:100"
-    )
-    print(f"BGP Address Family: {bgp_result_a['status_code']}")
+    log("\n\n*****Step 5: Configuring BGP address families...")
+    with timer.step("create_bgp"):
+        bgp_result_a = handler.configure_bgp(BGP_AS, [VRF_A, VRF_B], [OSPF_A, OSPF_B], BGP_ROUTER_ID)
+    results["create_bgp"] = bgp_result_a['status_code']
+    log(f"BGP Address Family: {bgp_result_a['status_code']}")
+
+    return results
+
+
+def build_route_leaking_patch(handler: RestConfHandler) -> YangPatch:
+    """Whole route leaking configuration as a single YANG Patch"""
+    patch = YangPatch(patch_id="route-leaking")
+    for vrf in (VRF_A, VRF_B):
+        patch.merge_vrf(vrf)
+    for interface in (INT_A, INT_B):
+        patch.merge_interface(interface)
+    patch.merge_ospf(handler._ospf_body([OSPF_A, OSPF_B]))
+    patch.merge_bgp(handler._bgp_body(BGP_AS, [VRF_A, VRF_B], [OSPF_A, OSPF_B], BGP_ROUTER_ID))
+    return patch
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_route_leaking_patch() -> YangPatch:
+    """Route leaking patch built once and shared, so its body is encoded once per fleet run"""
+    return build_route_leaking_patch(RestConfHandler)
+
+
+def route_leaking_transaction(handler: RestConfHandler, log=print, timer: Optional[StepTimer] = None) -> Dict[str, int]:
+    """
+    Same configuration as route_leaking_workflow, pushed in one round trip
+
+    The device applies the YANG Patch atomically, so there is nothing to wait
+    for between steps. Every edit reports the status code of the whole request.
+    """
+    timer = timer if timer is not None else StepTimer()
+    patch = _shared_route_leaking_patch()
+    with timer.step("yang_patch"):
+        result = handler.send_yang_patch(patch)
+    for edit_id, status in result["edits"].items():
+        log(f"{edit_id}: {status}")
+    return {edit_id: result["status_code"] for edit_id in result["edits"]}
+
+
+def route_leaking_apply(handler: RestConfHandler, log=print, timer: Optional[StepTimer] = None) -> Dict[str, int]:
+    """
+    Same configuration as route_leaking_workflow, sending only what differs
+
+    The running config of every object is read first; objects the device
+    already has cost a read and nothing else, so re-running on a converged
+    device performs no writes at all.
+    """
+    timer = timer if timer is not None else StepTimer()
+    with timer.step("plan"):
+        plan = Plan()
+        for vrf in (VRF_A, VRF_B):
+            plan.add(handler.plan_vrf(vrf))
+        for interface in (INT_A, INT_B):
+            plan.add(handler.plan_interface(interface))
+        plan.add(handler.plan_ospf(handler._ospf_body([OSPF_A, OSPF_B])))
+        plan.add(handler.plan_bgp(handler._bgp_body(BGP_AS, [VRF_A, VRF_B], [OSPF_A, OSPF_B], BGP_ROUTER_ID)))
+    log(plan.summary())
+
+    with timer.step("apply"):
+        results = handler.apply(plan)
+    return {name: result["status_code"] for name, result in results.items()}
+
+
+@functools.lru_cache(maxsize=1)
+def _route_leaking_graph() -> OperationGraph:
+    """Operation graph of the route leaking scenario, compiled once and shared by all devices"""
+    return compile_route_leaking([VRF_A, VRF_B], [INT_A, INT_B], [OSPF_A, OSPF_B], BGP_AS, BGP_ROUTER_ID,
+                                 ACCEPTED_STATUSES)
+
+
+def route_leaking_scheduled(handler: RestConfHandler, log=print, timer: Optional[StepTimer] = None) -> Dict[str, int]:
+    """
+    Same configuration as route_leaking_workflow, with independent steps run concurrently
+
+    Both VRFs are created at once, each interface starts as soon as its own
+    VRF is ready, and so on; operations after a failure are skipped and
+    reported with status 0. The report ends with the critical path.
+    The graph accepts the statuses step_ok() accepts, so fleet results agree
+    with Schedule.failed.
+    """
+    schedule = Scheduler().run(_route_leaking_graph(), handler, log=log, timer=timer)
+    log(schedule.report())
+    return schedule.status_codes
+
+
+def educational_route_leaking_demo():
+    """
+    Educational demonstration of route leaking configuration using RESTCONF
+
+    This function demonstrates the key concepts and steps for configuring
+    route leaking between VRFs using programmatic interfaces.
+    """
+
+    # Step 1: Connect to device
+    print("*****Step 1: Connecting to network device...")
+    handler = RestConfHandler("10.0.0.1")  # Replace with your device IP
+    timer = StepTimer()
+    with timer.step("test_connection", replaced_sleep=2):
+        connected = handler.test_connection()
+    if not connected:
+        print("Cannot connect to device. Check IP, credentials, and RESTCONF enablement.")
+        return
+    print("✅ Connected successfully!\n")
+
+    with handler:
+        route_leaking_workflow(handler, timer=timer)
+    print("\n\n*****Step timing (fixed sleep = delay used before readiness polling)")
+    print(timer.report())
 
 # Complete educational demonstration
 def complete_educational_demo():
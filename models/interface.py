@@ -1,6 +1,10 @@
 import dataclasses
 import enum
-from typing import Optional
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# "GigabitEthernet0/0/1.100" -> ("GigabitEthernet", "0/0/1.100"), "Loopback1" -> ("Loopback", "1")
+_NATIVE_NAME = re.compile(r"^([A-Za-z][A-Za-z-]*?)(\d[\d/.:]*)$")
 
 
 class InterfaceType(enum.Enum):
@@ -89,6 +93,29 @@ class InterfaceConfig:
         }
         return data
 
+    def native_key(self) -> Tuple[str, str]:
+        """Native interface list and the entry name, e.g. ("Loopback", "1") for Loopback1"""
+        match = _NATIVE_NAME.match(self.name.replace(" ", ""))
+        if not match:
+            raise ValueError(f"Unsupported interface name: {self.name}")
+        return match.group(1), match.group(2)
+
+    def to_native_entry(self) -> Dict[str, Any]:
+        """Entry of the native interface list named by native_key(), without unset leaves"""
+        list_name, name = self.native_key()
+        # Loopback, Port-channel, Vlan, ... are keyed by numbers in the native model
+        entry: Dict[str, Any] = {"name": int(name) if name.isdigit() else name}
+        if self.description:
+            entry["description"] = self.description
+        if self.vrf:
+            entry["vrf"] = {"forwarding": self.vrf}
+        if self.ip_addr and self.ip_mask:
+            entry["ip"] = {"address": {"primary": {"address": self.ip_addr, "mask": self.ip_mask}}}
+        if self.type == InterfaceType.ETHERNET and list_name.endswith("Ethernet") and "." not in name:
+            # Physical ports only; subinterfaces and logical interfaces have no negotiation
+            entry["Cisco-IOS-XE-ethernet:negotiation"] = {"auto": True}
+        return entry
+
     def to_yang(self):
         interface_config = {
             "ietf-interfaces:interface": {
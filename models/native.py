@@ -0,0 +1,13 @@
+import json
+import os
+from typing import Any, Dict
+
+NATIVE = "Cisco-IOS-XE-native:native"
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "examples", "dumped_config_REST.txt")
+
+
+def load_native(path: str = DEFAULT_CONFIG) -> Dict[str, Any]:
+    """Load a native config dump, skipping anything before the JSON (e.g. the curl command)"""
+    with open(path) as f:
+        text = f.read()
+    return json.loads(text[text.index("{"):])
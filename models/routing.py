@@ -0,0 +1,95 @@
+import dataclasses
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from models.interface import VrfConfig
+
+
+@dataclasses.dataclass
+class OspfNetwork:
+    """Network statement of an OSPF process"""
+    ip: str
+    wildcard: str
+    area: int
+
+
+@dataclasses.dataclass
+class OspfConfig:
+    """OSPF process running in a VRF"""
+    process_id: int
+    vrf: str
+    networks: List[OspfNetwork] = dataclasses.field(default_factory=list)
+    vrf_lite: bool = True
+
+    def to_yang_entry(self) -> Dict[str, Any]:
+        """Entry of the router-ospf process-id-vrf list"""
+        entry = {
+            "id": self.process_id,
+            "vrf": self.vrf,
+            "network": [{"ip": network.ip, "wildcard": network.wildcard, "area": network.area}
+                        for network in self.networks]
+        }
+        if self.vrf_lite:
+            entry["capability"] = {"vrf-lite": True}
+        return entry
+
+
+def ospf_body(processes: Iterable[OspfConfig]) -> Dict[str, Any]:
+    """Cisco-IOS-XE-ospf:router-ospf body with the given processes"""
+    return {
+        "Cisco-IOS-XE-ospf:router-ospf": {
+            "ospf": {
+                "process-id-vrf": [process.to_yang_entry() for process in processes]
+            }
+        }
+    }
+
+
+def bgp_vrf_entry(vrf_name: str, ospf_ids: Sequence[int] = (), connected: bool = True) -> Dict[str, Any]:
+    """Entry of the BGP ipv4 unicast with-vrf list redistributing connected and OSPF routes"""
+    redistribute: Dict[str, Any] = {}
+    if connected:
+        redistribute["connected"] = {}
+    if ospf_ids:
+        redistribute["ospf"] = [{"id": process_id} for process_id in ospf_ids]
+    return {
+        "name": vrf_name,
+        "ipv4-unicast": {
+            "redistribute-vrf": redistribute
+        }
+    }
+
+
+def bgp_body(as_number: int, vrf_entries: List[Dict[str, Any]], router_id: Optional[str] = None) -> Dict[str, Any]:
+    """Cisco-IOS-XE-bgp:bgp body of a single process with the given with-vrf entries"""
+    process: Dict[str, Any] = {"id": as_number}
+    if router_id:
+        process["bgp"] = {
+            "log-neighbor-changes": False,
+            "router-id": {
+                "ip-id": router_id
+            }
+        }
+    process["address-family"] = {
+        "with-vrf": {
+            "ipv4": [
+                {
+                    "af-name": "unicast",
+                    "vrf": vrf_entries
+                }
+            ]
+        }
+    }
+    return {"Cisco-IOS-XE-bgp:bgp": [process]}
+
+
+def bgp_vrf_entries(vrfs: Iterable[VrfConfig], ospf_processes: Iterable[OspfConfig] = ()) -> List[Dict[str, Any]]:
+    """
+    With-vrf entries for many VRFs, each redistributing the OSPF processes of its VRF
+
+    Runs in one pass over each input, so thousands of VRFs cost no more than
+    building the entries themselves.
+    """
+    ospf_ids: Dict[str, List[int]] = {}
+    for process in ospf_processes:
+        ospf_ids.setdefault(process.vrf, []).append(process.process_id)
+    return [bgp_vrf_entry(vrf.name, ospf_ids.get(vrf.name, ())) for vrf in vrfs]
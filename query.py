@@ -0,0 +1,126 @@
+"""
+RESTCONF query parameters selecting part of a subtree (RFC 8040, 4.8).
+
+- depth: number of levels returned below and including the target node,
+  1..65535 or "unbounded"
+- fields: nodes to return, e.g. "definition(name;rd)" returns only the name
+  and RD of every VRF
+- content: "config", "nonconfig" or "all" (the default)
+
+field() and fields() build fields expressions, so callers do not have to
+get the parentheses and separators right:
+
+    fields(field("definition", "name", "rd"))               -> definition(name;rd)
+    field("definition", "name", field("address-family", "ipv4"))
+                                                            -> definition(name;address-family(ipv4))
+"""
+import re
+from typing import Dict, Optional, Union
+from urllib.parse import quote
+
+CONTENT_VALUES = ("config", "nonconfig", "all")
+MAX_DEPTH = 65535
+
+FieldsTree = Dict[str, Optional["FieldsTree"]]  # None selects the whole subtree
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][\w.\-]*(?::[A-Za-z_][\w.\-]*)?")
+_PATH = re.compile(r"[^;()]*")
+
+
+def field(path: str, *children: str) -> str:
+    """Expression selecting children of path, or the whole path without children"""
+    _check(path)
+    if not children:
+        return path
+    for child in children:
+        parse_fields(child)
+    return f"{path}({';'.join(children)})"
+
+
+def fields(*expressions: str) -> str:
+    """Several expressions selected side by side"""
+    for expression in expressions:
+        parse_fields(expression)
+    return ";".join(expressions)
+
+
+def _check(path: str):
+    for name in path.split("/"):
+        if not _IDENTIFIER.fullmatch(name):
+            raise ValueError(f"Invalid node name in fields path: {path!r}")
+
+
+def parse_fields(expression: str) -> FieldsTree:
+    """
+    Parse a fields expression into nested dicts of selected node names
+
+    "definition(name;rd);description" -> {"definition": {"name": None, "rd": None}, "description": None}
+    Raises ValueError on syntax errors.
+    """
+    tree: FieldsTree = {}
+    position = _parse_list(expression, 0, tree)
+    if position != len(expression):
+        raise ValueError(f"Unexpected {expression[position]!r} at {position} in fields {expression!r}")
+    return tree
+
+
+def _parse_list(expression: str, position: int, tree: FieldsTree) -> int:
+    while True:
+        match = _PATH.match(expression, position)
+        path, position = match.group(), match.end()
+        _check(path)
+        children = None
+        if expression.startswith("(", position):
+            children = {}
+            position = _parse_list(expression, position + 1, children)
+            if not expression.startswith(")", position):
+                raise ValueError(f"Missing ')' in fields {expression!r}")
+            position += 1
+        _select(tree, path.split("/"), children)
+        if not expression.startswith(";", position):
+            return position
+        position += 1
+
+
+def _select(tree: FieldsTree, names, children: Optional[FieldsTree]):
+    """Add a path to tree; a node selected whole absorbs any narrower selection"""
+    node = tree
+    for name in names[:-1]:
+        if name in node and node[name] is None:
+            return
+        node = node.setdefault(name, {})
+    last = names[-1]
+    if children is None or (last in node and node[last] is None):
+        node[last] = None
+        return
+    target = node.setdefault(last, {})
+    for name, grandchildren in children.items():
+        _select(target, [name], grandchildren)
+
+
+def query_params(depth: Union[int, str, None] = None, fields: Optional[str] = None,
+                 content: Optional[str] = None) -> Dict[str, str]:
+    """Validated query parameters; None values are left out"""
+    params = {}
+    if depth is not None:
+        if depth != "unbounded" and not (isinstance(depth, int) and 1 <= depth <= MAX_DEPTH):
+            raise ValueError(f"depth must be 1..{MAX_DEPTH} or 'unbounded', got {depth!r}")
+        params["depth"] = str(depth)
+    if fields:
+        parse_fields(fields)
+        params["fields"] = fields
+    if content is not None:
+        if content not in CONTENT_VALUES:
+            raise ValueError(f"content must be one of {', '.join(CONTENT_VALUES)}, got {content!r}")
+        params["content"] = content
+    return params
+
+
+def with_query(url: str, depth: Union[int, str, None] = None, fields: Optional[str] = None,
+               content: Optional[str] = None) -> str:
+    """URL with the given query parameters appended"""
+    params = query_params(depth, fields, content)
+    if not params:
+        return url
+    query = "&".join(f"{name}={quote(value, safe='/:;()')}" for name, value in params.items())
+    return f"{url}{'&' if '?' in url else '?'}{query}"
@@ -0,0 +1,339 @@
+"""
+Per-device pacing of RESTCONF requests.
+
+IOS-XE applies config writes one at a time and answers 409/503 or times out
+once too many arrive at once. A DeviceLimiter sits in front of one device:
+
+- a token bucket caps the request rate,
+- an AIMD window caps the writes in flight: it grows by one per window of
+  fast successful writes and halves on overload (429/503, busy 409,
+  timeouts, latency above target),
+- failed attempts are retried with full-jitter backoff, never sooner than
+  the device asked for in Retry-After,
+- a circuit breaker fails fast once the device stops answering and lets a
+  single probe through after reset_timeout.
+
+Handlers of the same device should share one limiter, e.g. through
+LimiterRegistry, so they all respect the same budget.
+"""
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+import urllib3
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Overload answers: the request was not applied and may be sent again
+RETRY_STATUSES = (429, 503)
+# Gateway errors in front of the RESTCONF server; the device may be down
+GATEWAY_STATUSES = (502, 504)
+# error-tags of a 409 caused by another session holding the datastore, not by the request
+BUSY_ERROR_TAGS = (b'"in-use"', b'"lock-denied"')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Request refused without contacting the device because its circuit is open"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at rate tokens per second"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit of requests in flight
+
+    Every request finishing within target latency adds 1/limit, so the limit
+    grows by one per window of successful requests. An overloaded or slow
+    request halves it, at most once per observed latency so a burst of
+    failures from one window counts once.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 target_latency: Optional[float] = None, tolerance: float = 3.0, backoff: float = 0.5):
+        """
+        Initialize adaptive concurrency
+
+        Args:
+            initial: Starting limit
+            minimum: The limit never drops below this
+            maximum: The limit never grows above this
+            target_latency: Latency in seconds above which a request counts as
+                congested; by default tolerance times the fastest latency seen
+            tolerance: Multiple of the fastest latency used without target_latency
+            backoff: Factor applied to the limit on congestion
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._fastest: Optional[float] = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, overloaded: bool = False):
+        """Return a slot, adjusting the limit by the outcome of its request"""
+        with self._condition:
+            self._in_flight -= 1
+            if not overloaded:
+                self._fastest = latency if self._fastest is None else min(self._fastest, latency)
+            target = self.target_latency
+            if target is None and self._fastest is not None:
+                target = self._fastest * self.tolerance
+            now = time.monotonic()
+            if overloaded or (target is not None and latency > target):
+                if now - self._last_decrease > latency:
+                    self._limit = max(float(self.minimum), self._limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self._limit = min(float(self.maximum), self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails fast until reset_timeout"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a request may be sent now; in half-open state only one probe at a time"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("circuit opened after %d consecutive failures", self.failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class RetryPolicy:
+    """Number of attempts and full-jitter exponential backoff between them"""
+
+    def __init__(self, attempts: int = 4, base_delay: float = 0.2, max_delay: float = 10.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait after the given failed attempt (0-based)"""
+        jitter = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            # Jitter on top, so clients told the same Retry-After do not return together
+            return retry_after + jitter
+        return jitter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header in seconds, given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_overloaded(response: requests.Response) -> bool:
+    """True if the device refused the request because it is busy"""
+    if response.status_code in RETRY_STATUSES:
+        return True
+    return response.status_code == 409 and any(tag in response.content for tag in BUSY_ERROR_TAGS)
+
+
+def _never_sent(error: requests.exceptions.RequestException) -> bool:
+    """True if the request failed before reaching the device: connect timeout or refused connection"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def _retryable_error(method: str, error: requests.exceptions.RequestException) -> bool:
+    if _never_sent(error):
+        return True
+    if method == "POST":
+        # Timed out or dropped after it was sent: the device may have applied the POST,
+        # sending it again could fail with 409 or create the object twice
+        return False
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+class DeviceLimiter:
+    """Rate limit, adaptive write concurrency, retries and circuit breaker of one device"""
+
+    def __init__(self, name: str = "", rate: Optional[float] = None, burst: Optional[float] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize device limiter
+
+        Args:
+            name: Device name used in log messages and errors
+            rate: Maximum requests per second; None for no rate limit
+            burst: Requests allowed at once above rate, rate by default
+            concurrency: Limit of writes in flight, AIMD from 4 by default
+            retry: Retry policy, 4 attempts by default
+            breaker: Circuit breaker, opening after 5 failures by default
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.concurrency = concurrency if concurrency is not None else AdaptiveConcurrency()
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.retries = 0
+        self.rejected = 0
+
+    def call(self, method: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send a request through the limiter, retrying overload answers and connection errors
+
+        The last response is returned even if it is still an overload answer;
+        the last exception is raised once the attempts are used up.
+        Raises CircuitOpenError without calling send while the circuit is open.
+        """
+        write = method not in READ_METHODS
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name}: circuit open after {self.breaker.failures} "
+                                       f"consecutive failures, retry in {self.breaker.reset_timeout:.0f} s")
+            if self.bucket is not None:
+                self.bucket.acquire()
+            if write:
+                self.concurrency.acquire()
+            start = time.perf_counter()
+            failed = overloaded = True  # until the device answers
+            try:
+                response = send()
+                overloaded = is_overloaded(response)
+                failed = response.status_code in GATEWAY_STATUSES
+            except requests.exceptions.RequestException as e:
+                if attempt + 1 >= self.retry.attempts or not _retryable_error(method, e):
+                    raise
+                response, delay, reason = None, self.retry.delay(attempt), type(e).__name__
+            finally:
+                # Whatever send() raised, the write slot is returned and a half-open probe settled
+                if failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if write:
+                    self.concurrency.release(time.perf_counter() - start, overloaded=overloaded or failed)
+
+            if response is not None:
+                if not (overloaded or failed) or attempt + 1 >= self.retry.attempts:
+                    return response
+                delay = self.retry.delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                reason = str(response.status_code)
+                response.close()
+
+            attempt += 1
+            self.retries += 1
+            logger.debug("%s %s: %s, retry %d in %.2f s", self.name, method, reason, attempt, delay)
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "device": self.name,
+            "limit": self.concurrency.limit,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "circuit": self.breaker.state
+        }
+
+
+class LimiterRegistry:
+    """One DeviceLimiter per device name, created on first use by factory"""
+
+    def __init__(self, factory: Callable[[str], DeviceLimiter] = DeviceLimiter):
+        self.factory = factory
+        self._limiters: Dict[str, DeviceLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> DeviceLimiter:
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = self._limiters[name] = self.factory(name)
+            return limiter
+
+    def limiters(self):
+        with self._lock:
+            return list(self._limiters.values())
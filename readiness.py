@@ -0,0 +1,105 @@
+"""
+Waiting for configuration to be applied on the device.
+
+Instead of sleeping for a fixed time after each write, the relevant subtree
+is polled with exponential backoff until the device reports the object or
+the deadline passes.
+"""
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def first_entry(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Unwrap a RESTCONF response body down to the object it describes
+
+    GET on a list entry returns e.g. {"Cisco-IOS-XE-native:definition": [{...}]}.
+    """
+    if not data:
+        return {}
+    value = next(iter(data.values()))
+    if isinstance(value, list):
+        return value[0] if value else {}
+    return value
+
+
+def wait_until_applied(fetch: Callable[[], Dict[str, Any]],
+                       predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                       timeout: float = 30.0, initial_delay: float = 0.05,
+                       max_delay: float = 2.0, factor: float = 2.0) -> bool:
+    """
+    Poll the device until a read returns the expected configuration
+
+    Args:
+        fetch: Handler read, e.g. lambda: handler.get_vrf("CUSTOMER_A")
+        predicate: Check on the unwrapped response body; any 200 response is
+            accepted if omitted
+        timeout: Deadline in seconds
+        initial_delay: Delay before the second poll, doubled after every miss
+        max_delay: Upper bound of the delay between polls
+        factor: Backoff multiplier
+
+    Returns:
+        True if the device reported the object before the deadline
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            result = fetch()
+            if result["status_code"] == 200 and (predicate is None or predicate(first_entry(result["data"]))):
+                return True
+        except Exception as e:
+            # The device may drop polls while it applies the change; the deadline decides
+            logger.debug("Readiness check failed: %s", e)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * factor, max_delay)
+
+
+class StepTimer:
+    """
+    Per-step wall time of a workflow
+
+    Each step can record the fixed sleep it replaced, so the report shows how
+    much latency readiness polling removed. Steps may be timed from several
+    threads at once, e.g. by the Scheduler.
+    """
+
+    def __init__(self):
+        self.steps: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name: str, replaced_sleep: float = 0.0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            step = {
+                "name": name,
+                "seconds": time.perf_counter() - start,
+                "replaced_sleep": replaced_sleep
+            }
+            with self._lock:
+                self.steps.append(step)
+
+    @property
+    def total(self) -> float:
+        return sum(step["seconds"] for step in self.steps)
+
+    def report(self) -> str:
+        lines = [f"{'Step':<28}{'time':>10}{'fixed sleep':>14}"]
+        for step in self.steps:
+            lines.append(f"{step['name']:<28}{step['seconds']:>9.2f}s{step['replaced_sleep']:>13.2f}s")
+        replaced = sum(step["replaced_sleep"] for step in self.steps)
+        lines.append(f"{'Total':<28}{self.total:>9.2f}s{replaced:>13.2f}s")
+        return "\n".join(lines)
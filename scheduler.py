@@ -0,0 +1,295 @@
+"""
+Dependency-aware rollout of configuration operations on a single device.
+
+The desired state is compiled into a graph of operations, each listing the
+operations it needs first: an interface needs its VRF, OSPF needs the VRF
+and the interfaces it covers, BGP needs the VRFs and the OSPF processes it
+redistributes. The scheduler runs every operation as soon as all of its
+dependencies succeeded, several at once, and skips everything downstream
+of a failed operation instead of pushing configuration onto a broken base.
+
+The critical path (the chain of dependent operations with the largest
+total time) shows which operations the rollout of a device waits for.
+"""
+import dataclasses
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from models.interface import InterfaceConfig, VrfConfig
+from models.routing import OspfConfig
+from readiness import StepTimer
+
+Action = Callable[[Any, Callable[..., None]], Mapping[str, Any]]  # (handler, log) -> {"status_code", "data"}
+
+NOT_SENT = 0  # status reported for operations which failed without a response or were skipped
+
+
+@dataclasses.dataclass
+class Operation:
+    """Single node of the rollout graph"""
+    name: str
+    action: Action
+    depends_on: Tuple[str, ...] = ()
+    accepted: Tuple[int, ...] = ()  # non-2xx statuses which still count as success
+
+
+class OperationGraph:
+    """
+    Operations and their dependencies
+
+    Dependencies have to be added before the operations needing them, so the
+    graph is acyclic by construction and insertion order is a topological order.
+    """
+
+    def __init__(self):
+        self.operations: Dict[str, Operation] = {}
+        self.dependents: Dict[str, List[str]] = {}
+
+    def add(self, name: str, action: Action, depends_on: Iterable[str] = (),
+            accepted: Iterable[int] = ()) -> Operation:
+        if name in self.operations:
+            raise ValueError(f"Duplicate operation: {name}")
+        depends_on = tuple(dict.fromkeys(depends_on))
+        for dependency in depends_on:
+            if dependency not in self.operations:
+                raise ValueError(f"Operation {name} depends on unknown operation {dependency}")
+        operation = Operation(name, action, depends_on, tuple(accepted))
+        self.operations[name] = operation
+        self.dependents[name] = []
+        for dependency in depends_on:
+            self.dependents[dependency].append(name)
+        return operation
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def __iter__(self) -> Iterator[Operation]:
+        return iter(self.operations.values())
+
+    def downstream(self, name: str) -> List[str]:
+        """Every operation depending on name, directly or not"""
+        seen, stack = {}, list(self.dependents[name])
+        while stack:
+            dependent = stack.pop()
+            if dependent not in seen:
+                seen[dependent] = None
+                stack.extend(self.dependents[dependent])
+        return list(seen)
+
+
+def _create_vrf(name: str) -> Action:
+    def action(handler, log):
+        result = handler.create_vrf_from_yang(VrfConfig.default_yang(name=name))
+        if not handler.wait_for_vrf(name):
+            log(f"VRF {name} not reported by the device, continuing anyway")
+        return result
+    return action
+
+
+def _patch_vrf(vrf: VrfConfig) -> Action:
+    def action(handler, log):
+        result = handler.patch_vrf(vrf, vrf.name)
+        # Interfaces can only be assigned once the VRF has its address family
+        if not handler.wait_for_vrf(vrf.name, rd=vrf.rd):
+            log(f"VRF {vrf.name} not configured on the device, continuing anyway")
+        return result
+    return action
+
+
+def _update_interface(interface: InterfaceConfig) -> Action:
+    def action(handler, log):
+        result = handler.update_interface(interface)
+        if not handler.wait_for_interface(interface):
+            log(f"Interface {interface.name} not in VRF {interface.vrf}, continuing anyway")
+        return result
+    return action
+
+
+def _create_ospf(process: OspfConfig) -> Action:
+    def action(handler, log):
+        result = handler.create_ospfs([process])
+        if not handler.wait_for_ospf([process.process_id]):
+            log(f"OSPF process {process.process_id} not reported by the device, continuing anyway")
+        return result
+    return action
+
+
+def _configure_bgp(as_number: int, vrfs: List[VrfConfig], ospf_processes: List[OspfConfig],
+                   router_id: Optional[str]) -> Action:
+    def action(handler, log):
+        return handler.configure_bgp(as_number, vrfs, ospf_processes, router_id)
+    return action
+
+
+def compile_route_leaking(vrfs: List[VrfConfig], interfaces: List[InterfaceConfig],
+                          ospf_processes: List[OspfConfig], as_number: int, router_id: Optional[str] = None,
+                          accepted: Optional[Mapping[str, Iterable[int]]] = None) -> OperationGraph:
+    """
+    Operation graph configuring VRFs, their interfaces, OSPF and BGP
+
+    Operation names match the step names of route_leaking_workflow, except
+    that OSPF gets one operation per process ("create_ospf 101").
+
+    Args:
+        accepted: Non-2xx statuses counting as success, keyed by operation
+            kind ("create_vrf"); pass the table the caller judges the returned
+            status codes with, see main.ACCEPTED_STATUSES
+    """
+    graph = OperationGraph()
+    for vrf in vrfs:
+        graph.add(f"create_vrf {vrf.name}", _create_vrf(vrf.name))
+        graph.add(f"patch_vrf {vrf.name}", _patch_vrf(vrf), [f"create_vrf {vrf.name}"])
+    for interface in interfaces:
+        depends_on = [f"patch_vrf {interface.vrf}"] if interface.vrf else []
+        graph.add(f"update_interface {interface.name}", _update_interface(interface), depends_on)
+    for process in ospf_processes:
+        depends_on = [f"patch_vrf {process.vrf}"] if process.vrf else []
+        depends_on += [f"update_interface {interface.name}" for interface in interfaces
+                       if interface.vrf == process.vrf]
+        graph.add(f"create_ospf {process.process_id}", _create_ospf(process), depends_on)
+    graph.add("create_bgp", _configure_bgp(as_number, vrfs, ospf_processes, router_id),
+              [f"patch_vrf {vrf.name}" for vrf in vrfs]
+              + [f"create_ospf {process.process_id}" for process in ospf_processes])
+    for operation in graph:
+        operation.accepted = tuple((accepted or {}).get(operation.name.split(" ", 1)[0], ()))
+    return graph
+
+
+@dataclasses.dataclass
+class OperationResult:
+    """Outcome of one operation; start and end are seconds since the rollout started"""
+    name: str
+    status_code: int = NOT_SENT
+    start: float = 0.0
+    end: float = 0.0
+    error: Optional[str] = None
+    skipped_after: Optional[str] = None  # failed operation this one depended on
+    accepted: Tuple[int, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.skipped_after is None \
+            and (200 <= self.status_code < 300 or self.status_code in self.accepted)
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+@dataclasses.dataclass
+class Schedule:
+    """Results of a whole rollout"""
+    results: Dict[str, OperationResult]
+    wall_time: float
+    critical_path: List[str]
+
+    @property
+    def failed(self) -> List[OperationResult]:
+        return [result for result in self.results.values() if not result.ok]
+
+    @property
+    def status_codes(self) -> Dict[str, int]:
+        return {name: result.status_code for name, result in self.results.items()}
+
+    def report(self) -> str:
+        critical = set(self.critical_path)
+        lines = [f"{'Operation':<40}{'start':>9}{'time':>9}"]
+        for result in sorted(self.results.values(), key=lambda result: (result.skipped_after is not None, result.start)):
+            if result.skipped_after is not None:
+                lines.append(f"{result.name:<40}  skipped, {result.skipped_after} failed")
+                continue
+            marker = " *" if result.name in critical else ""
+            status = f"  {result.error}" if result.error else f"  {result.status_code}"
+            lines.append(f"{result.name:<40}{result.start:>8.2f}s{result.seconds:>8.2f}s{status}{marker}")
+        path_time = sum(self.results[name].seconds for name in self.critical_path)
+        lines.append(f"Critical path (*): {path_time:.2f} s of {self.wall_time:.2f} s wall time")
+        return "\n".join(lines)
+
+
+def critical_path(graph: OperationGraph, results: Dict[str, OperationResult]) -> List[str]:
+    """Chain of dependent operations with the largest total time; skipped operations take no time"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for operation in graph:
+        result = results.get(operation.name)
+        if result is None or result.skipped_after is not None:
+            continue
+        ran = [dependency for dependency in operation.depends_on if dependency in finish]
+        slowest = max(ran, key=finish.__getitem__, default=None)
+        previous[operation.name] = slowest
+        finish[operation.name] = result.seconds + (finish[slowest] if slowest is not None else 0.0)
+    if not finish:
+        return []
+    path, name = [], max(finish, key=finish.__getitem__)
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1]
+
+
+class Scheduler:
+    """Runs the operations of a graph against one device, each as soon as its dependencies succeeded"""
+
+    def __init__(self, max_parallel: int = 4):
+        """
+        Initialize scheduler
+
+        Args:
+            max_parallel: Maximum number of operations in flight on the device
+        """
+        self.max_parallel = max_parallel
+
+    def run(self, graph: OperationGraph, handler, log=print, timer: Optional[StepTimer] = None) -> Schedule:
+        """
+        Run every operation of graph against handler
+
+        Args:
+            graph: Operations to run
+            handler: Handler connected to the device, shared by all operations
+            log: Function used to report progress
+            timer: Collects the wall time of every operation
+
+        Returns:
+            Results of all operations, including skipped ones, and the critical path
+        """
+        timer = timer if timer is not None else StepTimer()
+        started = time.perf_counter()
+        results: Dict[str, OperationResult] = {}
+        waiting = {operation.name: set(operation.depends_on) for operation in graph}
+        ready = [name for name, dependencies in waiting.items() if not dependencies]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            while ready or running:
+                for name in ready:
+                    operation = graph.operations[name]
+                    running[executor.submit(self._execute, operation, handler, log, timer, started)] = name
+                ready = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    results[name] = result
+                    log(f"{name}: {result.error or result.status_code}")
+                    if not result.ok:
+                        log(f"{name} failed, skipping dependent operations")
+                        for dependent in graph.downstream(name):
+                            results.setdefault(dependent, OperationResult(dependent, skipped_after=name))
+                        continue
+                    for dependent in graph.dependents[name]:
+                        waiting[dependent].discard(name)
+                        if not waiting[dependent] and dependent not in results:
+                            ready.append(dependent)
+        wall_time = time.perf_counter() - started
+        return Schedule(results, wall_time, critical_path(graph, results))
+
+    @staticmethod
+    def _execute(operation: Operation, handler, log, timer: StepTimer, started: float) -> OperationResult:
+        result = OperationResult(operation.name, start=time.perf_counter() - started, accepted=operation.accepted)
+        try:
+            with timer.step(operation.name):
+                result.status_code = operation.action(handler, log)["status_code"]
+        except Exception as e:
+            result.error = str(e)
+        result.end = time.perf_counter() - started
+        return result
@@ -0,0 +1,93 @@
+"""
+Cache of connected RESTCONF handlers for the interactive CLI.
+
+Handlers are keyed by device and credentials, so every command sent to the
+same router reuses its warm connection pool. A handler which answered the
+reachability probe less than verify_ttl seconds ago is returned without
+probing again.
+"""
+import dataclasses
+import time
+from typing import Dict, List, Optional, Tuple
+
+from api import RestConfHandler
+
+SessionKey = Tuple[str, int, str, str]  # ip, port, username, password
+
+
+@dataclasses.dataclass
+class DeviceSession:
+    handler: RestConfHandler
+    verified_at: Optional[float] = None  # time.monotonic() of the last successful probe
+
+    @property
+    def name(self) -> str:
+        return self.handler.device_name
+
+
+class SessionCache:
+    """Connected handlers keyed by device and credentials"""
+
+    def __init__(self, verify_ttl: float = 300.0):
+        """
+        Initialize session cache
+
+        Args:
+            verify_ttl: Seconds for which a successful test_connection() is
+                trusted before the device is probed again
+        """
+        self.verify_ttl = verify_ttl
+        self._sessions: Dict[SessionKey, DeviceSession] = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def sessions(self) -> List[DeviceSession]:
+        return list(self._sessions.values())
+
+    def connect(self, ip_addr: str, username: str = "agh", password: str = "xd",
+                port: int = 443) -> Optional[RestConfHandler]:
+        """Probe the device now and keep its handler; returns None if it is not reachable"""
+        key = (ip_addr, port, username, password)
+        session = self._sessions.get(key)
+        if session is None:
+            session = DeviceSession(RestConfHandler(ip_addr, username, password, port=port))
+        if not session.handler.test_connection():
+            self._drop(key)
+            session.handler.close()
+            return None
+        session.verified_at = time.monotonic()
+        self._sessions[key] = session
+        return session.handler
+
+    def get(self, ip_addr: str, username: str = "agh", password: str = "xd",
+            port: int = 443) -> Optional[RestConfHandler]:
+        """Return a verified handler, probing the device only if the last check is too old"""
+        session = self._sessions.get((ip_addr, port, username, password))
+        if session is not None and session.verified_at is not None \
+                and time.monotonic() - session.verified_at < self.verify_ttl:
+            return session.handler
+        return self.connect(ip_addr, username, password, port)
+
+    def find(self, ip_addr: str, port: Optional[int] = None) -> Optional[DeviceSession]:
+        """Most recently connected session to the device, whatever its credentials"""
+        for (ip, session_port, _, _), session in reversed(list(self._sessions.items())):
+            if ip == ip_addr and (port is None or port == session_port):
+                return session
+        return None
+
+    def disconnect(self, ip_addr: str, port: Optional[int] = None) -> int:
+        """Close every session to the device; returns how many were closed"""
+        keys = [key for key in self._sessions if key[0] == ip_addr and (port is None or key[1] == port)]
+        for key in keys:
+            self._drop(key).handler.close()
+        return len(keys)
+
+    def close(self):
+        """Close every session"""
+        for session in self._sessions.values():
+            session.handler.close()
+        self._sessions.clear()
+
+    def _drop(self, key: SessionKey) -> Optional[DeviceSession]:
+        return self._sessions.pop(key, None)
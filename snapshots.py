@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store of native config snapshots.
+
+Every snapshot is split into subtrees which are stored once, zlib
+compressed, under the SHA-1 of their encoding, like git objects. A
+subtree of at least chunk_size encoded bytes becomes an object of its own
+and its parent keeps only the hash; smaller ones stay inline. Unchanged
+subtrees, across days and across devices, hash to objects already on disk,
+so a snapshot writes only the changed subtrees and their ancestors, and
+subtrees the store remembers are not even walked.
+
+Layout of the store directory:
+    objects/ab/cdef...  compressed objects
+    index/<device>.idx  fixed-size (timestamp, root hash) records sorted by time
+
+Usage:
+    python snapshots.py backup inventory.json --store DIR [--workers N]
+    python snapshots.py list DEVICE --store DIR
+    python snapshots.py show DEVICE --store DIR [--at TIMESTAMP]
+"""
+import argparse
+import bisect
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from codec import DEFAULT_CODEC
+from fleet import FleetRunner, load_inventory, print_report, print_result
+
+# Encoded nodes: scalars as they are, {"d": {...}} for containers, {"l": [...]} for lists,
+# {"p": [hash, ...]} for long lists split into pages and {"#": hash} for a subtree stored
+# as its own object
+PAGE_ENTRIES = 16  # average number of entries in a page of a long list
+PLAIN_PASSES = 4  # whole-tree encodings a save may spend looking up stored subtrees, see _measure()
+Measured = Dict[int, Tuple[str, int, Any]]  # id() -> identity, encoded size, True/entry encodings once walked
+_PLACEHOLDER_SIZE = len(json.dumps({"#": "0" * 40}, separators=(",", ":")))  # child replaced by its identity
+_RECORD = struct.Struct("<d20s")  # timestamp, binary SHA-1 of the root object
+
+
+@dataclasses.dataclass
+class SnapshotInfo:
+    """Result of storing one snapshot"""
+    device: str
+    timestamp: float
+    root: str
+    objects: int  # objects the snapshot consists of
+    new_objects: int  # objects written by this snapshot
+    bytes_written: int
+
+
+class _IndexFile:
+    """Per-device list of (timestamp, root) records, binary searched on disk"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.path) // _RECORD.size
+        except FileNotFoundError:
+            return 0
+
+    def records(self) -> List[Tuple[float, str]]:
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        return [(timestamp, digest.hex()) for timestamp, digest in _RECORD.iter_unpack(data)]
+
+    def find(self, at: float) -> Optional[Tuple[float, str]]:
+        """Latest record at or before the given time"""
+        count = len(self)
+        if not count:
+            return None
+        with open(self.path, "rb") as f:
+            def record(index: int) -> Tuple[float, bytes]:
+                f.seek(index * _RECORD.size)
+                return _RECORD.unpack(f.read(_RECORD.size))
+
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                if record(middle)[0] <= at:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == 0:
+                return None
+            timestamp, digest = record(low - 1)
+            return timestamp, digest.hex()
+
+    def append(self, timestamp: float, root: str):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        record = _RECORD.pack(timestamp, bytes.fromhex(root))
+        last = self.find(float("inf"))
+        if last is None or last[0] <= timestamp:
+            with open(self.path, "ab") as f:
+                f.write(record)
+            return
+        # Older than the newest snapshot: keep the file sorted
+        records = self.records()
+        bisect.insort(records, (timestamp, root))
+        _atomic_write(self.path, b"".join(_RECORD.pack(t, bytes.fromhex(r)) for t, r in records))
+
+
+def _inline(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {"d": {key: _inline(child) for key, child in value.items()}}
+    if isinstance(value, list):
+        return {"l": [_inline(child) for child in value]}
+    return value
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+class SnapshotStore:
+    """Deduplicated, compressed config snapshots of many devices in one directory"""
+
+    def __init__(self, root: str, chunk_size: int = 256, level: int = 6, memo_size: int = 100_000,
+                 codec=DEFAULT_CODEC):
+        """
+        Initialize snapshot store
+
+        Args:
+            root: Store directory, created if missing
+            chunk_size: Encoded size in bytes from which a subtree is stored
+                as an object of its own
+            level: zlib compression level of new objects
+            memo_size: Subtrees remembered as already stored, so unchanged
+                parts of later snapshots are neither walked nor written
+            codec: JSON codec; json and orjson produce the same objects
+        """
+        self.root = root
+        self.chunk_size = chunk_size
+        self.level = level
+        self.codec = codec
+        self.memo_size = memo_size
+        self._known = set()
+        self._subtrees: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_cached = functools.lru_cache(maxsize=4096)(self._load_object)
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "index"), exist_ok=True)
+
+    # Objects
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _put(self, data: bytes, written: List[int]) -> str:
+        digest = hashlib.sha1(data).hexdigest()
+        if digest in self._known:
+            return digest
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            compressed = zlib.compress(data, self.level)
+            _atomic_write(path, compressed)
+            written.append(len(compressed))
+        with self._lock:
+            self._known.add(digest)
+        return digest
+
+    def _load_object(self, digest: str) -> Any:
+        with open(self._object_path(digest), "rb") as f:
+            return self.codec.loads(zlib.decompress(f.read()))
+
+    def _measure(self, value: Any, measured: Measured, budget: List[int], check: bool = True) -> Tuple[str, int]:
+        """
+        Identity (hex SHA-1) and encoded size of a container, computed bottom-up
+
+        Child containers of a dict are replaced by {"#": identity} before
+        encoding, so the identity does not depend on encoding any subtree
+        twice. List entries, typically many small objects, are encoded one by
+        one instead of walked; their encodings are kept for _pages() and
+        _encode() measures the inside of the few entries it descends into.
+
+        While budget[0] (bytes) lasts, a dict is first looked up by the hash
+        of its plain encoding, so unchanged parts of a tree stored before are
+        recognised without walking them. Once it is spent, the rest is
+        walked, so a save never encodes more than budget bytes on top of the
+        walk. Results are kept in measured by id().
+        """
+        if isinstance(value, list):
+            raws = [self.codec.dumps(entry) for entry in value]
+            key = hashlib.sha1(b"entries" + b"\n".join(raws)).hexdigest()
+            size = sum(map(len, raws)) + len(raws) + 1
+            measured[id(value)] = (key, size, raws)
+            return key, size
+
+        plain_key = None
+        if check and budget[0] > 0:
+            raw = self.codec.dumps(value)
+            budget[0] -= len(raw)
+            if len(raw) < self.chunk_size:
+                return self._small(value, raw, measured)
+            plain_key = "plain:" + hashlib.sha1(raw).hexdigest()
+            with self._lock:
+                known = self._subtrees.get(plain_key)
+                if known is not None:
+                    self._subtrees.move_to_end(plain_key)
+            if known is not None:
+                measured[id(value)] = (*known, None)
+                return known
+
+        skeleton, extra = {}, 0  # extra: encoded size of the replaced children beyond their placeholders
+        for name, child in value.items():
+            if isinstance(child, (dict, list)):
+                key, size = self._measure(child, measured, budget)
+                child = {"#": key}
+                extra += size - _PLACEHOLDER_SIZE
+            skeleton[name] = child
+        raw = self.codec.dumps(skeleton)
+        key, size = hashlib.sha1(raw).hexdigest(), len(raw) + extra
+        if size < self.chunk_size:
+            return self._small(value, self.codec.dumps(value), measured)
+        measured[id(value)] = (key, size, True)
+        if plain_key is not None:
+            self._remember(plain_key, (key, size))
+        return key, size
+
+    @staticmethod
+    def _small(value: Any, raw: bytes, measured: Measured) -> Tuple[str, int]:
+        """Identity of a container from its plain encoding: list entries and containers kept inline"""
+        key, size = hashlib.sha1(b"entry" + raw).hexdigest(), len(raw)
+        measured[id(value)] = (key, size, None)
+        return key, size
+
+    def _remember(self, key: str, stored: Tuple[str, int]):
+        with self._lock:
+            self._subtrees[key] = stored
+            if len(self._subtrees) > self.memo_size:
+                self._subtrees.popitem(last=False)
+
+    def _encode(self, value: Any, written: List[int], measured: Measured, budget: List[int]) -> Tuple[Any, int]:
+        """
+        Encoded node and the number of objects it consists of
+
+        Containers whose encoding has at least chunk_size bytes become
+        objects. Subtrees stored before are recognised by their identity from
+        _measure(), so only the changed path of a tree is encoded.
+        """
+        if not isinstance(value, (dict, list)):
+            return value, 0
+        key, size, inside = measured[id(value)]
+        if size < self.chunk_size:
+            return _inline(value), 0
+        with self._lock:
+            known = self._subtrees.get(key)
+            if known is not None:
+                self._subtrees.move_to_end(key)
+                return {"#": known[0]}, known[1]
+        if inside is None:
+            self._measure(value, measured, budget, check=False)
+            inside = measured[id(value)][2]
+
+        count = 1
+        if isinstance(value, dict):
+            children = {}
+            for name, child in value.items():
+                children[name], child_count = self._encode(child, written, measured, budget)
+                count += child_count
+            node = {"d": children}
+        else:
+            pages = self._pages(value, inside)
+            if len(pages) == 1:
+                node, child_count = self._encode_items(value, inside, written, measured, budget)
+                count += child_count
+            else:
+                digests = []
+                for entries, raws in pages:
+                    digest, page_count = self._encode_page(entries, raws, written, measured, budget)
+                    digests.append(digest)
+                    count += page_count
+                node = {"p": digests}
+        digest = self._put(self.codec.dumps(node), written)
+        self._remember(key, (digest, count))
+        return {"#": digest}, count
+
+    def _encode_items(self, entries: List[Any], raws: List[bytes], written: List[int], measured: Measured,
+                      budget: List[int]) -> Tuple[Dict[str, Any], int]:
+        items, count = [], 0
+        for entry, raw in zip(entries, raws):
+            if isinstance(entry, (dict, list)) and len(raw) >= self.chunk_size:
+                self._small(entry, raw, measured)
+                entry, entry_count = self._encode(entry, written, measured, budget)
+                count += entry_count
+            else:
+                entry = _inline(entry)
+            items.append(entry)
+        return {"l": items}, count
+
+    @staticmethod
+    def _pages(entries: List[Any], raws: List[bytes]) -> List[Tuple[List[Any], List[bytes]]]:
+        """
+        Split list entries into pages ending after entries whose hash hits 1 in PAGE_ENTRIES
+
+        Boundaries depend on the entries only, so inserting or changing one
+        entry changes one page and leaves the others identical.
+        """
+        pages, start = [], 0
+        for index, raw in enumerate(raws):
+            if zlib.crc32(raw) % PAGE_ENTRIES == 0:
+                pages.append((entries[start:index + 1], raws[start:index + 1]))
+                start = index + 1
+        if start < len(raws):
+            pages.append((entries[start:], raws[start:]))
+        return pages
+
+    def _encode_page(self, entries: List[Any], raws: List[bytes], written: List[int], measured: Measured,
+                     budget: List[int]) -> Tuple[str, int]:
+        key = hashlib.sha1(b"page" + b"\n".join(raws)).hexdigest()
+        with self._lock:
+            known = self._subtrees.get(key)
+            if known is not None:
+                self._subtrees.move_to_end(key)
+                return known
+        node, count = self._encode_items(entries, raws, written, measured, budget)
+        digest = self._put(self.codec.dumps(node), written)
+        self._remember(key, (digest, count + 1))
+        return digest, count + 1
+
+    def _decode(self, node: Any) -> Any:
+        if not isinstance(node, dict):
+            return node
+        if "#" in node:
+            return self._decode(self._load_cached(node["#"]))
+        if "l" in node:
+            return [self._decode(child) for child in node["l"]]
+        if "p" in node:
+            return [entry for page in node["p"] for entry in self._decode({"#": page})]
+        return {key: self._decode(child) for key, child in node["d"].items()}
+
+    # Snapshots
+    def _index(self, device: str) -> _IndexFile:
+        return _IndexFile(os.path.join(self.root, "index", quote(device, safe="") + ".idx"))
+
+    def save(self, device: str, tree: Dict[str, Any], timestamp: Optional[float] = None) -> SnapshotInfo:
+        """Store a native config tree as the device's snapshot at timestamp (now by default)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        written: List[int] = []
+        # Most backups find the config unchanged: one encoding of the whole
+        # tree recognises it without walking it
+        raw = self.codec.dumps(tree)
+        tree_key = "tree:" + hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            known = self._subtrees.get(tree_key)
+            if known is not None:
+                self._subtrees.move_to_end(tree_key)
+        if known is not None:
+            root, objects = known
+        else:
+            measured: Measured = {}
+            budget = [PLAIN_PASSES * len(raw)]
+            self._measure(tree, measured, budget, check=False)
+            node, objects = self._encode(tree, written, measured, budget)
+            if "#" not in node:
+                # Small trees still get a root object, the index refers to objects only
+                node = {"#": self._put(self.codec.dumps(node), written)}
+                objects += 1
+            root = node["#"]
+            self._remember(tree_key, (root, objects))
+        self._index(device).append(timestamp, root)
+        return SnapshotInfo(device, timestamp, root, objects, len(written), sum(written))
+
+    def devices(self) -> List[str]:
+        directory = os.path.join(self.root, "index")
+        return sorted(unquote(name[:-len(".idx")]) for name in os.listdir(directory) if name.endswith(".idx"))
+
+    def snapshots(self, device: str) -> List[Tuple[float, str]]:
+        """(timestamp, root) of every snapshot of the device, oldest first"""
+        return self._index(device).records()
+
+    def lookup(self, device: str, at: Optional[float] = None) -> Optional[Tuple[float, str]]:
+        """(timestamp, root) of the device's snapshot valid at the given time, the latest by default"""
+        return self._index(device).find(float("inf") if at is None else at)
+
+    def load(self, device: str, at: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Rebuild the device's config tree as it was at the given time; None if there is no snapshot"""
+        found = self.lookup(device, at)
+        return self.load_root(found[1]) if found is not None else None
+
+    def load_root(self, root: str) -> Dict[str, Any]:
+        return self._decode({"#": root})
+
+    def stats(self) -> Dict[str, int]:
+        """Number of objects and their total compressed size in bytes"""
+        count = size = 0
+        for directory, _, files in os.walk(os.path.join(self.root, "objects")):
+            for name in files:
+                if not name.startswith(".tmp-"):
+                    count += 1
+                    size += os.path.getsize(os.path.join(directory, name))
+        return {"objects": count, "bytes": size}
+
+
+def backup_workflow(handler, log=print, store: Optional[SnapshotStore] = None) -> Dict[str, int]:
+    """Fleet workflow saving the device's native config to store"""
+    result = handler.get_native()
+    if result["status_code"] == 200:
+        info = store.save(handler.device_name, result["data"])
+        log(f"{handler.device_name}: {info.new_objects}/{info.objects} new objects, {info.bytes_written} B")
+    return {"get_native": result["status_code"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kopie zapasowe konfiguracji urządzeń z deduplikacją.")
+    parser.add_argument("--store", required=True, help="Katalog z kopiami.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backup = commands.add_parser("backup", help="Zapisuje bieżącą konfigurację wszystkich urządzeń.")
+    backup.add_argument("inventory", help="Plik JSON lub lista adresów IP (jeden na linię).")
+    backup.add_argument("--workers", type=int, default=32, help="Maksymalna liczba urządzeń naraz.")
+    listing = commands.add_parser("list", help="Wypisuje kopie urządzenia.")
+    listing.add_argument("device", help="Nazwa urządzenia (IP lub IP:port).")
+    show = commands.add_parser("show", help="Odtwarza konfigurację urządzenia jako JSON.")
+    show.add_argument("device", help="Nazwa urządzenia (IP lub IP:port).")
+    show.add_argument("--at", type=float, help="Chwila (unix timestamp); domyślnie najnowsza kopia.")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+    if args.command == "backup":
+        runner = FleetRunner(workflow=functools.partial(backup_workflow, store=store), max_workers=args.workers)
+        report = runner.run_all(load_inventory(args.inventory), on_result=print_result)
+        print_report(report)
+        stats = store.stats()
+        print(f"Store:            {stats['objects']} objects, {stats['bytes']} B")
+        raise SystemExit(1 if report.failed else 0)
+    if args.command == "list":
+        for timestamp, root in store.snapshots(args.device):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}  {timestamp:.0f}  {root}")
+        return
+    tree = store.load(args.device, args.at)
+    if tree is None:
+        print(f"Brak kopii urządzenia {args.device}")
+        raise SystemExit(1)
+    print(json.dumps(tree, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
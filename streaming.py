@@ -0,0 +1,297 @@
+"""
+Streaming reader for large RESTCONF config dumps.
+
+Instead of loading the whole Cisco-IOS-XE-native:native tree with json.loads,
+the body is tokenized chunk by chunk and only the subtrees matching the
+requested paths are built; everything else is skipped without creating any
+Python objects.
+
+Paths use local names separated by "/" ("Cisco-IOS-XE-native:native" matches
+"native"), "*" matches any key and "[*]" every list entry, e.g.:
+
+    native/vrf/definition[*]
+    native/interface/GigabitEthernet[*]
+    native/router/bgp
+"""
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+_TOKEN = re.compile(r'''
+    [ \t\n\r]*
+    (?:
+        (?P<punct>[{}\[\],:])
+      | "(?P<str>[^"\\]*(?:\\.[^"\\]*)*)"
+      | (?P<num>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<lit>true|false|null)
+    )
+''', re.VERBOSE)
+# Used while skipping: everything up to the next bracket outside of a string
+_SKIP = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_DOCUMENT_START = re.compile(r"[{\[]")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+_NONE, _PREFIX, _FULL = 0, 1, 2
+
+
+class StreamingParseError(ValueError):
+    pass
+
+
+class _Lexer:
+    """Pull tokenizer over an iterable of text chunks"""
+
+    def __init__(self, chunks: Iterable[str], skip_prefix: bool = False):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._peeked: Optional[Tuple[str, Any]] = None
+        if skip_prefix:
+            self._skip_to_json()
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, dropping what was already consumed"""
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_to_json(self):
+        """Skip anything before the first object or array, e.g. a shell prompt in a saved dump"""
+        while True:
+            match = _DOCUMENT_START.search(self._buffer, self._pos)
+            if match:
+                self._pos = match.start()
+                return
+            self._pos = len(self._buffer)
+            if not self._fill():
+                raise StreamingParseError("no JSON document found")
+
+    def peek(self) -> Tuple[str, Any]:
+        if self._peeked is None:
+            self._peeked = self._read()
+        return self._peeked
+
+    def next(self) -> Tuple[str, Any]:
+        """Return the next token as (kind, value); kind is a punctuation char, "str", "num" or "lit" """
+        if self._peeked is not None:
+            token, self._peeked = self._peeked, None
+            return token
+        return self._read()
+
+    def _read(self) -> Tuple[str, Any]:
+        while True:
+            match = _TOKEN.match(self._buffer, self._pos)
+            if match and (self._eof or match.lastgroup != "num" or self._number_complete(match.end())):
+                self._pos = match.end()
+                kind = match.lastgroup
+                if kind == "punct":
+                    return match.group("punct"), None
+                if kind == "str":
+                    raw = match.group("str")
+                    return "str", json.loads(f'"{raw}"') if "\\" in raw else raw
+                if kind == "num":
+                    text = match.group("num")
+                    return "num", float(text) if any(c in text for c in ".eE") else int(text)
+                return "lit", _LITERALS[match.group("lit")]
+            if not self._fill() and not match:
+                rest = self._buffer[self._pos:].strip()
+                if not rest:
+                    raise StreamingParseError("unexpected end of document")
+                raise StreamingParseError(f"invalid JSON near {rest[:40]!r}")
+
+    def _number_complete(self, end: int) -> bool:
+        """A number touching the end of the buffer (or a partial fraction/exponent) may continue"""
+        return end < len(self._buffer) and self._buffer[end] not in ".eE+-"
+
+    def skip_value(self):
+        """Skip one complete value without building it"""
+        kind, _ = self.next()
+        if kind not in "{[":
+            return
+        depth = 1
+        while depth:
+            self._pos = _SKIP.match(self._buffer, self._pos).end()
+            if self._pos == len(self._buffer) or self._buffer[self._pos] == '"':
+                # End of buffer, or a string continuing in the next chunk
+                if not self._fill():
+                    raise StreamingParseError("unexpected end of document")
+                continue
+            depth += 1 if self._buffer[self._pos] in "{[" else -1
+            self._pos += 1
+
+    def expect(self, kind: str):
+        token, _ = self.next()
+        if token != kind:
+            raise StreamingParseError(f"expected {kind!r}, got {token!r}")
+
+
+def _build(lexer: _Lexer, token: Tuple[str, Any]) -> Any:
+    """Build the value starting with the given token"""
+    kind, value = token
+    if kind == "{":
+        result = {}
+        token = lexer.next()
+        if token[0] == "}":
+            return result
+        while True:
+            if token[0] != "str":
+                raise StreamingParseError(f"expected key, got {token[0]!r}")
+            lexer.expect(":")
+            result[token[1]] = _build(lexer, lexer.next())
+            token = lexer.next()
+            if token[0] == "}":
+                return result
+            if token[0] != ",":
+                raise StreamingParseError(f"expected ',' or '}}', got {token[0]!r}")
+            token = lexer.next()
+    if kind == "[":
+        result = []
+        token = lexer.next()
+        if token[0] == "]":
+            return result
+        while True:
+            result.append(_build(lexer, token))
+            token = lexer.next()
+            if token[0] == "]":
+                return result
+            if token[0] != ",":
+                raise StreamingParseError(f"expected ',' or ']', got {token[0]!r}")
+            token = lexer.next()
+    if kind in ("str", "num", "lit"):
+        return value
+    raise StreamingParseError(f"unexpected {kind!r}")
+
+
+def _parse_pattern(pattern: str) -> List[str]:
+    segments = []
+    for part in pattern.strip("/").split("/"):
+        name, _, rest = part.partition("[")
+        if name:
+            segments.append(name)
+        segments.extend(re.findall(r"\[[^\]]*\]", "[" + rest if rest else ""))
+    return segments
+
+
+def _segment_matches(segment: str, element: Union[str, int]) -> bool:
+    if isinstance(element, int):
+        return segment == "[*]" or segment == f"[{element}]"
+    return segment == "*" or segment == element
+
+
+class _Matcher:
+    def __init__(self, patterns: List[str]):
+        self.patterns = [_parse_pattern(pattern) for pattern in patterns]
+
+    def state(self, path: List[Union[str, int]]) -> int:
+        state = _NONE
+        for pattern in self.patterns:
+            if len(pattern) < len(path):
+                continue
+            if all(_segment_matches(segment, element) for segment, element in zip(pattern, path)):
+                if len(pattern) == len(path):
+                    return _FULL
+                state = _PREFIX
+        return state
+
+
+def _format_path(path: List[Union[str, int]]) -> str:
+    text = ""
+    for element in path:
+        text += f"[{element}]" if isinstance(element, int) else f"/{element}"
+    return text.lstrip("/")
+
+
+def _local_name(key: str) -> str:
+    return key.rsplit(":", 1)[-1]
+
+
+def _walk(lexer: _Lexer, path: List[Union[str, int]], matcher: _Matcher) -> Iterator[Tuple[str, Any]]:
+    """Descend into the value at path, which is a prefix of at least one pattern"""
+    kind, _ = lexer.next()
+    if kind not in "{[":
+        return  # scalar where a container was expected: nothing can match below it
+    close = "}" if kind == "{" else "]"
+    if lexer.peek()[0] == close:
+        lexer.next()
+        return
+
+    index = 0
+    while True:
+        if close == "}":
+            key_kind, key = lexer.next()
+            if key_kind != "str":
+                raise StreamingParseError(f"expected key, got {key_kind!r}")
+            lexer.expect(":")
+            child = path + [_local_name(key)]
+        else:
+            child = path + [index]
+            index += 1
+
+        state = matcher.state(child)
+        if state == _FULL:
+            yield _format_path(child), _build(lexer, lexer.next())
+        elif state == _PREFIX:
+            yield from _walk(lexer, child, matcher)
+        else:
+            lexer.skip_value()
+
+        kind, _ = lexer.next()
+        if kind == close:
+            return
+        if kind != ",":
+            raise StreamingParseError(f"expected ',' or {close!r}, got {kind!r}")
+
+
+def iter_subtrees(chunks: Iterable[Union[str, bytes]], paths: List[str],
+                  skip_prefix: bool = False) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (path, value) for every subtree of the document matching one of the paths
+
+    Args:
+        chunks: Document body in pieces, text or UTF-8 bytes
+        paths: Patterns such as "native/vrf/definition[*]"
+        skip_prefix: Ignore anything before the first "{" or "[" (saved dumps
+            may start with the shell command which produced them)
+    """
+    lexer = _Lexer(_decode(chunks), skip_prefix=skip_prefix)
+    matcher = _Matcher(paths)
+    if matcher.state([]) == _FULL:
+        yield "", _build(lexer, lexer.next())
+        return
+    yield from _walk(lexer, [], matcher)
+
+
+def _decode(chunks: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_file(path: str, paths: List[str], chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, Any]]:
+    """Stream matching subtrees out of a saved dump such as dumped_config_REST.txt"""
+    def chunks():
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    return iter_subtrees(chunks(), paths, skip_prefix=True)
+
+
+def iter_response(response, paths: List[str], chunk_size: int = 64 * 1024) -> Iterator[Tuple[str, Any]]:
+    """Stream matching subtrees out of a requests response opened with stream=True"""
+    return iter_subtrees(response.iter_content(chunk_size=chunk_size), paths)
@@ -0,0 +1,62 @@
+"""
+RestConfHandler connection handling against the emulator.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import pytest
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+from tracing import Tracer
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+def connects(tracer: Tracer):
+    """Number of traced requests which opened a new connection"""
+    return sum(any(name == "connect" for name, _, _ in span.phases) for span in tracer.spans)
+
+
+@pytest.mark.parametrize("tracer", [None, Tracer()], ids=["plain", "traced"])
+def test_sequential_calls_without_keep_alive(device, tracer):
+    with RestConfHandler("127.0.0.1", port=device.port, keep_alive=False, tracer=tracer) as handler:
+        results = [handler.get_vrfs() for _ in range(10)]
+    assert [result["status_code"] for result in results] == [200] * 10
+    assert device.requests == 10
+
+
+def test_connection_per_call_only_without_keep_alive(device):
+    fresh, pooled = Tracer(), Tracer()
+    with RestConfHandler("127.0.0.1", port=device.port, keep_alive=False, tracer=fresh) as handler:
+        for _ in range(5):
+            handler.get_vrfs()
+    with RestConfHandler("127.0.0.1", port=device.port, tracer=pooled) as handler:
+        for _ in range(5):
+            handler.get_vrfs()
+    assert connects(fresh) == 5
+    assert connects(pooled) == 1
+
+
+def test_streamed_read_without_keep_alive(device):
+    with RestConfHandler("127.0.0.1", port=device.port, keep_alive=False) as handler:
+        for _ in range(3):
+            names = [vrf["name"] for _, vrf in handler.iter_config(["native/vrf/definition[*]"], chunk_size=256)]
+            assert "CUSTOMER_A" in names
+            assert handler.get_vrf("CUSTOMER_A")["status_code"] == 200
+
+
+def test_create_bgp_leaves_the_vrf_definition_alone(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        before = handler.get_vrf("CUSTOMER_A")["data"]
+        result = handler.create_bgp(65500, "CUSTOMER_A", ospf_ids=[101], router_id="2.2.2.2")
+        assert result["status_code"] in (200, 204)
+        assert handler.get_vrf("CUSTOMER_A")["data"] == before
+        bgp = handler.get_bgp_config()["data"]["Cisco-IOS-XE-bgp:bgp"][0]
+    assert bgp["bgp"]["router-id"] == {"ip-id": "2.2.2.2"}
+    vrfs = bgp["address-family"]["with-vrf"]["ipv4"][0]["vrf"]
+    assert "CUSTOMER_A" in [vrf["name"] for vrf in vrfs]
@@ -0,0 +1,153 @@
+"""
+AsyncRestConfHandler against the emulator: status codes, bodies and error paths.
+
+Every read is compared with RestConfHandler on the same device, so both
+handlers keep returning the same results. Run from the repository root:
+    python -m pytest tests
+"""
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+
+from api import RestConfHandler
+from async_api import AsyncRestConfHandler, AsyncRestConfPool
+from emulator import VirtualDevice
+from instrumentation import Metrics
+from models.interface import InterfaceConfig, VrfConfig
+from yang_patch import YangPatch
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+def call(device, method, *args, **kwargs):
+    """Run one AsyncRestConfHandler method against device on a fresh event loop"""
+    async def run():
+        async with AsyncRestConfHandler("127.0.0.1", port=device.port) as handler:
+            return await getattr(handler, method)(*args, **kwargs)
+    return asyncio.run(run())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize("method, kwargs, status_code", [
+    ("get_interfaces", {}, 200),
+    ("get_vrfs", {}, 200),
+    ("get_vrfs", {"fields": "definition(name)"}, 200),
+    ("get_vrf", {"vrf_name": "CUSTOMER_A"}, 200),
+    ("get_bgp_config", {}, 200),
+    ("get_ospf_config", {}, 404),  # the dump has no OSPF
+    ("get_native", {"depth": 2}, 200),
+])
+def test_reads_match_sync_handler(device, method, kwargs, status_code):
+    result = call(device, method, **kwargs)
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        expected = getattr(handler, method)(**kwargs)
+    assert result["status_code"] == expected["status_code"] == status_code
+    assert result["data"] == expected["data"]
+
+
+def test_missing_object_is_404_without_data(device):
+    result = call(device, "get_vrf", "NO_SUCH_VRF")
+    assert result["status_code"] == 404
+    assert result["data"] is None
+
+
+def test_create_and_patch_vrf(device):
+    assert call(device, "create_vrf_from_yang", VrfConfig.default_yang(name="CUSTOMER_C"))["status_code"] == 201
+
+    duplicate = call(device, "create_vrf_from_yang", VrfConfig.default_yang(name="CUSTOMER_C"))
+    assert duplicate["status_code"] == 409
+    assert duplicate["data"]["ietf-restconf:errors"]["error"][0]["error-tag"] == "data-exists"
+
+    vrf = VrfConfig("CUSTOMER_C", "65000:300", "65000:100", "65000:300")
+    assert call(device, "patch_vrf", vrf, "CUSTOMER_C")["status_code"] == 204
+    assert call(device, "get_vrf", "CUSTOMER_C", fields="rd")["data"] == \
+        {"Cisco-IOS-XE-native:definition": [{"rd": "65000:300"}]}
+
+
+def test_update_interfaces_in_one_request(device):
+    interfaces = [InterfaceConfig(name=f"GigabitEthernet0/0/{port}", description=f"port {port}",
+                                  ip_addr=f"10.0.{port}.1", ip_mask="255.255.255.0") for port in (1, 2)]
+    result = call(device, "update_interfaces", interfaces)
+    assert result["status_code"] == 204
+    assert result["requests"] == 1
+    assert result["interfaces"] == {interface.name: 204 for interface in interfaces}
+    entry = call(device, "get_interface_entry", "GigabitEthernet0/0/2", fields="description")
+    assert entry["data"] == {"Cisco-IOS-XE-native:GigabitEthernet": [{"description": "port 2"}]}
+
+
+def test_rejected_batch_is_isolated_like_in_sync_handler(device):
+    device.error_rate, device.error_status = 1.0, 500
+    interfaces = [InterfaceConfig(name=f"GigabitEthernet0/0/{port}", description=f"port {port}") for port in (1, 2, 3)]
+    result = call(device, "update_interfaces", interfaces)
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        expected = handler.update_interfaces(interfaces)
+    assert result["requests"] == expected["requests"] == 4  # the batch, then one request per interface
+    assert result["interfaces"] == expected["interfaces"] == {interface.name: 500 for interface in interfaces}
+    assert result["status_code"] == expected["status_code"] == 500
+    assert result["data"] == expected["data"]
+
+
+def test_yang_patch_reports_every_edit(device):
+    patch = YangPatch(patch_id="test")
+    patch.merge_vrf(VrfConfig("CUSTOMER_D", "65000:400", "65000:400", "65000:400"))
+    patch.merge_interface(InterfaceConfig(name="GigabitEthernet0/0/1", description="patched"))
+    result = call(device, "send_yang_patch", patch)
+    assert result["status_code"] == 200
+    assert set(result["edits"].values()) == {"ok"}
+    assert call(device, "get_vrf", "CUSTOMER_D")["status_code"] == 200
+
+
+def test_wrong_credentials_are_401(device):
+    async def run():
+        async with AsyncRestConfHandler("127.0.0.1", password="wrong", port=device.port) as handler:
+            return await handler.get_vrfs(), await handler.test_connection()
+    result, connected = asyncio.run(run())
+    assert result["status_code"] == 401
+    assert result["data"] is None
+    assert not connected
+
+
+def test_device_errors_are_returned(device):
+    device.error_rate, device.error_status = 1.0, 500
+    result = call(device, "patch_vrf", VrfConfig("CUSTOMER_A", "65000:100"), "CUSTOMER_A")
+    assert result["status_code"] == 500
+    assert result["data"]["ietf-restconf:errors"]["error"][0]["error-tag"] == "operation-failed"
+
+
+def test_unreachable_device_raises_and_is_recorded():
+    records = []
+    metrics = Metrics(hooks=[records.append])
+
+    async def run():
+        async with AsyncRestConfHandler("127.0.0.1", port=free_port(), metrics=metrics) as handler:
+            assert not await handler.test_connection()
+            with pytest.raises(aiohttp.ClientError):
+                await handler.get_vrfs()
+    asyncio.run(run())
+    assert records[-1].status_code is None
+    assert records[-1].error
+
+
+def test_shared_pool_serves_many_devices():
+    with VirtualDevice() as first, VirtualDevice() as second:
+        records = []
+
+        async def run():
+            async with AsyncRestConfPool(per_device_limit=2, metrics=Metrics(hooks=[records.append])) as pool:
+                handlers = [pool.handler("127.0.0.1", port=device.port) for device in (first, second)]
+                return await asyncio.gather(*(handler.get_vrfs() for handler in handlers for _ in range(20)))
+        results = asyncio.run(run())
+    assert {result["status_code"] for result in results} == {200}
+    assert first.requests == second.requests == 20
+    assert len(records) == 40
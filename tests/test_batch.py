@@ -0,0 +1,61 @@
+"""
+CLI script mode: routing of script lines to devices and reruns against the emulator.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+from batch import plan_script, run_script
+from cli import RouteLeakingCli
+from emulator import VirtualDevice
+
+
+def test_device_commands_without_port_use_443():
+    queues, unrouted = plan_script([
+        "connect --ip 10.0.0.1 --port 8443",
+        "create_vrf --ip 10.0.0.1 --name A --rd 65000:1",
+        "create_vrf --name B --rd 65000:2",
+    ])
+    assert not unrouted
+    assert queues == {
+        ("10.0.0.1", 8443): [(1, "connect --ip 10.0.0.1 --port 8443"), (3, "create_vrf --name B --rd 65000:2")],
+        ("10.0.0.1", 443): [(2, "create_vrf --ip 10.0.0.1 --name A --rd 65000:1")],
+    }
+
+
+def test_use_and_disconnect_without_port_pick_the_last_connected_port():
+    queues, unrouted = plan_script([
+        "connect --ip 10.0.0.1",
+        "connect --ip 10.0.0.1 --port 8443",
+        "connect --ip 10.0.0.2",
+        "use --ip 10.0.0.1",
+        "test_conn",
+        "disconnect --ip 10.0.0.1",
+        "use --ip 10.0.0.3",
+    ])
+    assert [line_no for line_no, _ in queues[("10.0.0.1", 8443)]] == [2, 5, 6]
+    assert [line_no for line_no, _ in queues[("10.0.0.1", 443)]] == [1]
+    assert [result.line_no for result in unrouted] == [7]
+
+
+def test_rerun_of_create_vrf_succeeds():
+    with VirtualDevice() as device:
+        command = f"create_vrf --ip 127.0.0.1 --port {device.port} --name CUSTOMER_C --rd 65000:300"
+        report = run_script([command, command])
+    assert [result.ok for result in report.results] == [True, True]
+    assert "status: 409" in report.results[1].output
+
+
+def test_statuses_count_like_in_the_workflows():
+    cli = RouteLeakingCli()
+    for operation, status_code in (("create_vrf", 201), ("create_vrf", 409), ("patch_vrf", 204)):
+        cli._check_status(operation, {"status_code": status_code})
+    assert cli.failures == []
+    for operation, status_code in (("create_vrf", 500), ("patch_vrf", 409)):
+        cli._check_status(operation, {"status_code": status_code})
+    assert cli.failures == ["create_vrf: status 500", "patch_vrf: status 409"]
+
+
+def test_configure_bgp_needs_no_route_distinguisher():
+    with VirtualDevice() as device:
+        report = run_script([f"configure_bgp --ip 127.0.0.1 --port {device.port} --vrf CUSTOMER_A"])
+    assert not report.failed, report.results[0].output
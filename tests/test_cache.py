@@ -0,0 +1,94 @@
+"""
+ResponseCache: invalidation by writes, LRU eviction and ETag revalidation against the emulator.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import copy
+
+import pytest
+
+from api import RestConfHandler
+from cache import ResponseCache
+from emulator import VirtualDevice
+from main import VRF_A
+
+NATIVE = "https://d/restconf/data/Cisco-IOS-XE-native:native"
+VRF = NATIVE + "/vrf"
+
+
+def drifted():
+    """VRF_A with another route distinguisher"""
+    vrf = copy.copy(VRF_A)
+    vrf.rd = "65000:999"
+    return vrf
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+def test_write_invalidates_the_url_its_subtree_and_ancestors():
+    cache = ResponseCache()
+    urls = [NATIVE, NATIVE + "/router", VRF, VRF + "?depth=2", VRF + "/definition=A", VRF + "/definition=A/rd",
+            VRF + "/definition=AB"]
+    for url in urls:
+        cache.put(url, 200, {})
+    cache.invalidate(VRF + "/definition=A")
+    assert [url for url in urls if cache.get(url)] == [NATIVE + "/router", VRF + "/definition=AB"]
+    assert cache.generation == 1
+
+
+def test_read_overlapping_a_write_is_not_cached():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate(VRF)
+    cache.put(VRF, 200, {"old": True}, generation=generation)
+    assert cache.get(VRF) is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 200, 1)
+    cache.put("b", 200, 2)
+    cache.get("a")
+    cache.put("c", 200, 3)
+    assert [url for url in "abc" if cache.get(url)] == ["a", "c"]
+
+
+def test_fresh_entries_are_served_without_request(device):
+    with RestConfHandler("127.0.0.1", port=device.port, cache=ResponseCache(ttl=60)) as handler:
+        first = handler.get_vrfs()
+        requests = device.requests
+        assert handler.get_vrfs() == first
+        assert device.requests == requests
+        assert handler.cache.hits == 1
+
+
+def test_stale_entries_are_revalidated_by_etag(device):
+    cache = ResponseCache(ttl=0)
+    with RestConfHandler("127.0.0.1", port=device.port, cache=cache) as handler:
+        first = handler.get_vrfs()
+        assert handler.get_vrfs() == first
+        assert (cache.misses, cache.revalidations) == (1, 1)
+
+        # Changed by another client: the ETag no longer matches
+        with RestConfHandler("127.0.0.1", port=device.port) as other:
+            other.patch_vrf(drifted(), VRF_A.name)
+        changed = handler.get_vrfs()
+        assert changed != first
+        assert (cache.misses, cache.revalidations) == (2, 1)
+
+
+def test_write_through_handler_drops_fresh_entries(device):
+    cache = ResponseCache(ttl=60)
+    with RestConfHandler("127.0.0.1", port=device.port, cache=cache) as handler:
+        before = handler.get_vrf(VRF_A.name)
+        handler.get_vrfs()
+        handler.patch_vrf(drifted(), VRF_A.name)
+        assert len(cache) == 0
+        after = handler.get_vrf(VRF_A.name)
+    assert before["data"] != after["data"]
+    assert "65000:999" in str(after["data"])
@@ -0,0 +1,74 @@
+"""
+Structural diff and plan/apply: a rerun on a converged device sends no writes.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import copy
+
+import pytest
+
+from api import RestConfHandler
+from diff import Change, Plan, diff
+from emulator import VirtualDevice
+from main import INT_A, VRF_A, route_leaking_apply
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+@pytest.mark.parametrize("desired, running, expected", [
+    ({"name": "A", "rd": "1:1"}, {"Cisco-IOS-XE-native:name": "A", "rd": "1:1"}, None),
+    ({"name": "A", "rd": "1:2"}, {"name": "A", "rd": "1:1"}, {"rd": "1:2"}),
+    ({"vlan": 10}, {"vlan": "10"}, None),
+    ({"shutdown": False}, {"shutdown": "false"}, {"shutdown": False}),
+    ({"description": None}, {}, None),
+    ({"ipv4": {}}, {"ipv4": {}}, None),
+    ({"ipv4": {}}, {}, {"ipv4": {}}),
+    ({"definition": {"name": "A", "rd": "1:1"}},
+     {"definition": [{"name": "B", "rd": "1:2"}, {"name": "A", "rd": "1:1"}]}, None),
+    ({"definition": [{"name": "A", "rd": "1:1"}, {"name": "C", "rd": "1:3"}]},
+     {"definition": [{"name": "A", "rd": "1:9"}]},
+     {"definition": [{"name": "A", "rd": "1:1"}, {"name": "C", "rd": "1:3"}]}),
+    ({"export": ["1:1", "1:2"]}, {"export": "1:1"}, {"export": ["1:2"]}),
+], ids=["prefix", "leaf", "number-as-string", "bool", "unset", "presence", "missing-presence",
+        "entry-in-list", "changed-and-new-entries", "leaf-list"])
+def test_diff(desired, running, expected):
+    assert diff(desired, running) == expected
+
+
+def test_plan_lists_pending_changes_only():
+    plan = Plan().add(Change("vrf A", "PATCH", "/a", None)).add(Change("vrf B", "POST", "/b", {"x": {"y": 1}}))
+    assert [change.name for change in plan.pending] == ["vrf B"]
+    assert "up to date" in plan.summary().splitlines()[0]
+    assert "POST 1 leaves" in plan.summary().splitlines()[1]
+
+
+def test_rerun_on_converged_device_writes_nothing(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        first = route_leaking_apply(handler, log=lambda message: None)
+        assert first and all(status in (200, 201, 204) for status in first.values()), first
+
+        modified, requests = device.tree.last_modified, device.requests
+        assert route_leaking_apply(handler, log=lambda message: None) == {}
+        assert device.tree.last_modified == modified
+        assert device.requests - requests == 6  # one read per planned object
+
+        assert handler.plan_vrf(VRF_A).is_noop
+        assert handler.plan_interface(INT_A).is_noop
+
+
+def test_plan_sends_only_differing_leaves(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        route_leaking_apply(handler, log=lambda message: None)
+        drifted = copy.copy(VRF_A)
+        drifted.rd = "65000:999"
+        handler.patch_vrf(drifted, VRF_A.name)
+        change = handler.plan_vrf(VRF_A)
+        assert change.method == "PATCH"
+        assert change.body == {"Cisco-IOS-XE-native:definition": {"name": VRF_A.name, "rd": VRF_A.rd}}
+        handler.apply(Plan().add(change))
+        assert handler.plan_vrf(VRF_A).is_noop
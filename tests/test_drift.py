@@ -0,0 +1,96 @@
+"""
+DriftWatcher against the emulator: change detection, error replies and drift from the desired state.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import copy
+
+import pytest
+
+from api import RequestType, RestConfHandler
+from drift import DriftWatcher, ObjectChange, PollError, route_leaking_state
+from emulator import VirtualDevice
+from main import OSPF_A, VRF_A, route_leaking_apply
+from models.interface import VrfConfig
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+@pytest.fixture
+def handler(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        yield handler
+
+
+@pytest.fixture
+def other(device):
+    """Second client changing the config out of band"""
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        yield handler
+
+
+def quiet(message):
+    pass
+
+
+def test_unchanged_device_costs_one_request_per_section(handler):
+    watcher = DriftWatcher(handler)
+    assert watcher.poll() == []
+    digest, requests = watcher.digest, watcher.requests
+    assert watcher.poll() == []
+    assert watcher.requests - requests == len(watcher.sections)
+    assert watcher.digest == digest
+
+
+def test_changed_added_and_removed_objects(handler, other):
+    watcher = DriftWatcher(handler)
+    watcher.poll()
+    drifted = copy.copy(VRF_A)
+    drifted.rd = "65000:999"
+    other.patch_vrf(drifted, VRF_A.name)
+    other.create_vrf_from_yang(VrfConfig.default_yang(name="NEW"))
+    assert sorted(watcher.poll(), key=lambda change: change.name) == [
+        ObjectChange("vrf CUSTOMER_A", "modified"), ObjectChange("vrf NEW", "added")]
+
+    other._make_request("DELETE", other._build_url(RequestType.VRF_PATCH, vrf="NEW"))
+    assert watcher.poll() == [ObjectChange("vrf NEW", "removed")]
+
+
+def test_missing_section_is_empty_until_configured(handler, other):
+    watcher = DriftWatcher(handler)
+    watcher.poll()  # OSPF answers 404 on a fresh device
+    assert watcher.tree["ospf"].data is None
+    other.create_ospfs([OSPF_A])
+    assert watcher.poll() == [ObjectChange("ospf", "added")]
+
+
+@pytest.mark.parametrize("status", [500, 503])
+def test_error_reply_leaves_the_tree_unchanged(device, handler, other, status):
+    watcher = DriftWatcher(handler)
+    watcher.poll()
+    tree, digest = dict(watcher.tree), watcher.digest
+    other.create_vrf_from_yang(VrfConfig.default_yang(name="NEW"))
+
+    device.error_rate, device.error_status = 1.0, status
+    with pytest.raises(PollError) as raised:
+        watcher.poll()
+    assert raised.value.status_code == status
+    assert watcher.tree == tree and watcher.digest == digest
+
+    # Nothing was lost: the next successful poll still reports the change
+    device.error_rate = 0.0
+    assert watcher.poll() == [ObjectChange("vrf NEW", "added")]
+
+
+def test_drift_from_desired_state(handler):
+    watcher = DriftWatcher(handler, route_leaking_state())
+    watcher.poll()
+    assert watcher.drift
+    route_leaking_apply(handler, log=quiet)
+    watcher.poll()
+    assert watcher.drift == {}
@@ -0,0 +1,30 @@
+"""
+Emulator behaviour the benchmarks rely on.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import socket
+import time
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+
+
+def test_stalled_tls_client_does_not_block_others():
+    with VirtualDevice() as device:
+        # Connected, but never starts the TLS handshake
+        with socket.create_connection(("127.0.0.1", device.port)) as stalled:
+            stalled.sendall(b"\x16")
+            start = time.perf_counter()
+            with RestConfHandler("127.0.0.1", port=device.port, timeout=3.0) as handler:
+                assert handler.get_vrfs()["status_code"] == 200
+            assert time.perf_counter() - start < 1.0
+
+
+def test_handshake_per_connection():
+    with VirtualDevice() as device:
+        for _ in range(3):
+            with RestConfHandler("127.0.0.1", port=device.port, keep_alive=False) as handler:
+                assert handler.test_connection()
+        assert device.requests == 3
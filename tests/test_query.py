@@ -0,0 +1,77 @@
+"""
+Query parameters: fields expressions, validation and reduced reads from the emulator.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import pytest
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+from query import field, fields, parse_fields, query_params, with_query
+
+
+@pytest.fixture
+def device():
+    with VirtualDevice() as device:
+        yield device
+
+
+def test_field_builders():
+    assert fields(field("definition", "name", "rd")) == "definition(name;rd)"
+    assert field("definition", "name", field("address-family", "ipv4")) == "definition(name;address-family(ipv4))"
+    with pytest.raises(ValueError):
+        field("definition", "name)")
+    with pytest.raises(ValueError):
+        field("bad name")
+
+
+@pytest.mark.parametrize("expression, tree", [
+    ("definition(name;rd);description", {"definition": {"name": None, "rd": None}, "description": None}),
+    ("a/b/c;a/d", {"a": {"b": {"c": None}, "d": None}}),
+    ("a(b);a", {"a": None}),
+    ("a;a(b)", {"a": None}),
+    ("Cisco-IOS-XE-native:vrf/definition(name)", {"Cisco-IOS-XE-native:vrf": {"definition": {"name": None}}}),
+])
+def test_parse_fields(expression, tree):
+    assert parse_fields(expression) == tree
+
+
+@pytest.mark.parametrize("expression", ["", "a(b", "a)b", "a;;b", "a(b)c", "a//b"])
+def test_parse_fields_rejects(expression):
+    with pytest.raises(ValueError):
+        parse_fields(expression)
+
+
+def test_query_params_validation():
+    assert query_params(depth=3, content="config") == {"depth": "3", "content": "config"}
+    assert query_params(depth="unbounded") == {"depth": "unbounded"}
+    for depth in (0, 65536, "2", 1.5):
+        with pytest.raises(ValueError):
+            query_params(depth=depth)
+    with pytest.raises(ValueError):
+        query_params(content="state")
+
+
+def test_with_query():
+    assert with_query("https://d/vrf") == "https://d/vrf"
+    assert with_query("https://d/vrf", fields="definition(name;rd)") == "https://d/vrf?fields=definition(name;rd)"
+    assert with_query("https://d/vrf?depth=1", content="config") == "https://d/vrf?depth=1&content=config"
+
+
+def test_fields_select_leaves_of_every_entry(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        full = handler.get_vrfs()["data"]["Cisco-IOS-XE-native:vrf"]["definition"]
+        reduced = handler.get_vrfs(fields=field("definition", "name", "rd"))["data"]["Cisco-IOS-XE-native:vrf"]
+    assert reduced["definition"] == [{key: vrf[key] for key in ("name", "rd") if key in vrf} for vrf in full]
+
+
+def test_depth_empties_deeper_containers(device):
+    with RestConfHandler("127.0.0.1", port=device.port) as handler:
+        assert handler.get_vrfs(depth=1)["data"] == {"Cisco-IOS-XE-native:vrf": {}}
+        assert not handler.get_vrfs(depth=2)["data"]["Cisco-IOS-XE-native:vrf"]["definition"]
+        entries = handler.get_vrfs(depth=3)["data"]["Cisco-IOS-XE-native:vrf"]["definition"]
+        assert handler.get_vrfs(depth="unbounded") == handler.get_vrfs()
+    assert {vrf["name"] for vrf in entries} >= {"Mgmt-intf"}
+    for vrf in entries:
+        assert all(not isinstance(value, (dict, list)) or value == {} for value in vrf.values())
@@ -0,0 +1,125 @@
+"""
+DeviceLimiter: circuit breaker states, which failures are retried, and slots.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import http.client
+import socket
+import time
+
+import pytest
+import requests
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+from ratelimit import AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, DeviceLimiter, RetryPolicy
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def limiter(**kwargs) -> DeviceLimiter:
+    return DeviceLimiter("test", retry=RetryPolicy(attempts=3, base_delay=0.0), **kwargs)
+
+
+class Failing:
+    """send() raising error on every call, counting the calls"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise self.error
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # the probe
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED and breaker.failures == 0 and breaker.allow()
+
+
+def test_open_circuit_rejects_without_sending():
+    device = limiter(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    send = Failing(requests.exceptions.ConnectTimeout())
+    with pytest.raises(CircuitOpenError):
+        device.call("GET", send)  # the retry finds the circuit open
+    with pytest.raises(CircuitOpenError):
+        device.call("GET", send)
+    assert send.calls == 1
+    assert device.rejected == 2
+
+
+@pytest.mark.parametrize("method, error, calls", [
+    ("GET", requests.exceptions.ConnectionError(http.client.RemoteDisconnected()), 3),
+    ("GET", requests.exceptions.ReadTimeout(), 3),
+    ("PATCH", requests.exceptions.ReadTimeout(), 3),
+    ("POST", requests.exceptions.ConnectTimeout(), 3),
+    ("POST", requests.exceptions.ConnectionError(http.client.RemoteDisconnected()), 1),
+    ("POST", requests.exceptions.ReadTimeout(), 1),
+    ("GET", requests.exceptions.InvalidURL(), 1),
+])
+def test_retried_errors(method, error, calls):
+    send = Failing(error)
+    with pytest.raises(type(error)):
+        limiter().call(method, send)
+    assert send.calls == calls
+
+
+def test_post_to_refused_connection_is_retried():
+    attempts = []
+    handler = RestConfHandler("127.0.0.1", port=free_port(), limiter=limiter())
+    send = handler._send
+
+    def counted(*args):
+        attempts.append(args[0])
+        return send(*args)
+    handler._send = counted
+    with handler, pytest.raises(requests.exceptions.ConnectionError):
+        handler._make_request("POST", handler.base_url, {"a": 1})
+    assert attempts == ["POST"] * 3
+
+
+def test_overload_answers_are_retried():
+    with VirtualDevice(error_rate=1.0, error_status=503) as device:
+        with RestConfHandler("127.0.0.1", port=device.port, limiter=limiter()) as handler:
+            assert handler.get_vrfs()["status_code"] == 503
+        assert device.requests == 3
+        device.error_rate = 0.0
+        with RestConfHandler("127.0.0.1", port=device.port, limiter=limiter()) as handler:
+            assert handler.get_vrfs()["status_code"] == 200
+
+
+def test_unexpected_error_releases_slot_and_probe():
+    device = limiter(concurrency=AdaptiveConcurrency(initial=1),
+                     breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0))
+    device.breaker.record_failure()
+    assert device.breaker.state == device.breaker.OPEN
+
+    with pytest.raises(ZeroDivisionError):
+        device.call("PATCH", lambda: 1 / 0)
+    assert device.concurrency.in_flight == 0
+    # The failed probe reopened the circuit, which lets the next probe through at once
+    assert device.breaker.state == device.breaker.OPEN
+    with pytest.raises(KeyError):
+        device.call("PATCH", Failing(KeyError("body")))
+    assert device.concurrency.in_flight == 0
@@ -0,0 +1,123 @@
+"""
+Scheduler: dependency order, skipping after failures and the critical path.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import threading
+import time
+
+import pytest
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+from main import route_leaking_scheduled, step_ok
+from scheduler import NOT_SENT, OperationGraph, OperationResult, Scheduler, critical_path
+
+
+def quiet(message):
+    pass
+
+
+def action(seconds: float = 0.0, status_code: int = 204, error: Exception = None):
+    def run(handler, log):
+        time.sleep(seconds)
+        if error is not None:
+            raise error
+        return {"status_code": status_code, "data": None}
+    return run
+
+
+def diamond(**actions) -> OperationGraph:
+    """a -> (b, c) -> d, then e depending on c only"""
+    graph = OperationGraph()
+    graph.add("a", actions.get("a", action()))
+    graph.add("b", actions.get("b", action()), ["a"])
+    graph.add("c", actions.get("c", action()), ["a"])
+    graph.add("d", actions.get("d", action()), ["b", "c"])
+    graph.add("e", actions.get("e", action()), ["c"])
+    return graph
+
+
+def test_graph_rejects_duplicates_and_unknown_dependencies():
+    graph = OperationGraph()
+    graph.add("a", action())
+    with pytest.raises(ValueError):
+        graph.add("a", action())
+    with pytest.raises(ValueError):
+        graph.add("b", action(), ["missing"])
+    assert graph.add("b", action(), ["a", "a"]).depends_on == ("a",)
+
+
+def test_downstream():
+    graph = diamond()
+    assert sorted(graph.downstream("a")) == ["b", "c", "d", "e"]
+    assert sorted(graph.downstream("c")) == ["d", "e"]
+    assert graph.downstream("d") == []
+
+
+def test_operations_start_after_their_dependencies_and_run_in_parallel():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def counted(handler, log):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"status_code": 204, "data": None}
+
+    graph = diamond(b=counted, c=counted)
+    schedule = Scheduler().run(graph, None, log=quiet)
+    assert not schedule.failed
+    for operation in graph:
+        for dependency in operation.depends_on:
+            assert schedule.results[operation.name].start >= schedule.results[dependency].end
+    assert peak[0] == 2
+
+
+def test_failure_skips_only_downstream_operations():
+    graph = diamond(b=action(status_code=500), c=action(error=RuntimeError("no route")))
+    schedule = Scheduler().run(graph, None, log=quiet)
+    results = schedule.results
+    assert results["a"].ok
+    assert results["b"].status_code == 500 and not results["b"].ok
+    assert results["c"].error == "no route" and results["c"].status_code == NOT_SENT
+    assert results["d"].skipped_after in ("b", "c")
+    assert results["e"].skipped_after == "c"
+    assert sorted(result.name for result in schedule.failed) == ["b", "c", "d", "e"]
+    assert "skipped, c failed" in schedule.report()
+
+
+def test_accepted_status_counts_as_success():
+    graph = OperationGraph()
+    graph.add("create", action(status_code=409), accepted=[409])
+    graph.add("next", action(), ["create"])
+    schedule = Scheduler().run(graph, None, log=quiet)
+    assert not schedule.failed
+    assert schedule.status_codes == {"create": 409, "next": 204}
+
+
+def test_critical_path_follows_the_slowest_chain():
+    graph = diamond()
+    timings = {"a": (0.0, 1.0), "b": (1.0, 2.0), "c": (1.0, 4.0), "d": (4.0, 4.5), "e": (4.0, 7.0)}
+    results = {name: OperationResult(name, 204, start, end) for name, (start, end) in timings.items()}
+    assert critical_path(graph, results) == ["a", "c", "e"]
+
+    results["e"] = OperationResult("e", skipped_after="c")
+    assert critical_path(graph, results) == ["a", "c", "d"]
+    assert critical_path(graph, {}) == []
+
+
+def test_measured_critical_path():
+    graph = diamond(c=action(0.1))
+    schedule = Scheduler().run(graph, None, log=quiet)
+    assert schedule.critical_path[:2] == ["a", "c"]
+
+
+def test_route_leaking_rollout_against_emulator():
+    with VirtualDevice() as device, RestConfHandler("127.0.0.1", port=device.port) as handler:
+        status_codes = route_leaking_scheduled(handler, log=quiet)
+    assert len(status_codes) == 9  # 2 VRFs created and patched, 2 interfaces, 2 OSPF processes, BGP
+    assert all(step_ok(step, status) for step, status in status_codes.items()), status_codes
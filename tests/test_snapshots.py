@@ -0,0 +1,107 @@
+"""
+SnapshotStore: round trips, deduplication of unchanged subtrees and the per-device index.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import copy
+
+import pytest
+
+from snapshots import SnapshotStore
+
+
+def config(loopbacks: int = 100):
+    return {
+        "hostname": "router",
+        "interface": {"Loopback": [{"name": 1000 + i, "description": f"service {i}",
+                                    "ip": {"address": f"10.0.{i}.1", "mask": "255.255.255.255"}}
+                                   for i in range(loopbacks)]},
+        "vrf": {"definition": [{"name": f"CUST_{i}", "rd": f"65000:{i}"} for i in range(50)]},
+        "ntp": {"server": ["10.0.0.1", "10.0.0.2"]},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path), chunk_size=64)
+
+
+@pytest.mark.parametrize("tree", [
+    {},
+    {"a": 1},
+    {"#": "0" * 40, "d": {"l": [1]}, "p": [], "nested": {"#": {"#": "x" * 100}}},
+    {"values": [[1, 2], [[]], ["s" * 100, None, True, 1.5], {"l": ["x" * 100]}]},
+    {"big": [{"entry": "x" * 100, "inside": [{"n": i, "s": "y" * 80} for i in range(5)]} for i in range(40)]},
+    config(),
+], ids=["empty", "small", "reserved-keys", "nested-lists", "large-entries", "config"])
+def test_round_trip(store, tree):
+    store.save("r1", tree, timestamp=1.0)
+    assert store.load("r1") == tree
+    # A second store reads the objects from disk only
+    assert SnapshotStore(store.root, chunk_size=64).load("r1") == tree
+
+
+def test_unchanged_tree_writes_nothing(store):
+    tree = config()
+    first = store.save("r1", tree, timestamp=1.0)
+    assert first.new_objects == first.objects > 1
+    again = store.save("r1", copy.deepcopy(tree), timestamp=2.0)
+    other = store.save("r2", copy.deepcopy(tree), timestamp=2.0)
+    assert again.root == other.root == first.root
+    assert again.new_objects == other.new_objects == 0
+
+
+def test_changed_entry_writes_its_path_only(store):
+    tree = config()
+    first = store.save("r1", tree, timestamp=1.0)
+    tree["interface"]["Loopback"][50]["description"] = "changed"
+    changed = store.save("r1", tree, timestamp=2.0)
+    assert changed.root != first.root
+    # The entry, its page, the list and the dicts above it
+    assert 0 < changed.new_objects <= 6
+    assert store.load("r1", at=1.5)["interface"]["Loopback"][50]["description"] == "service 50"
+    assert store.load("r1")["interface"]["Loopback"][50]["description"] == "changed"
+
+
+def test_inserted_entry_keeps_other_pages(store):
+    tree = config(loopbacks=300)
+    store.save("r1", tree, timestamp=1.0)
+    tree["interface"]["Loopback"].insert(150, {"name": 1, "description": "new"})
+    changed = store.save("r1", tree, timestamp=2.0)
+    assert changed.new_objects <= 6
+    assert store.load("r1") == tree
+
+
+def test_small_memo_still_deduplicates(tmp_path):
+    store = SnapshotStore(str(tmp_path), chunk_size=64, memo_size=2)
+    tree = config()
+    first = store.save("r1", tree, timestamp=1.0)
+    tree["ntp"]["server"].append("10.0.0.3")
+    second = store.save("r2", tree, timestamp=1.0)
+    assert store.save("r1", config(), timestamp=2.0).root == first.root
+    assert store.save("r2", tree, timestamp=2.0).new_objects == 0
+    assert store.load("r1") == config()
+    assert store.load("r2") == tree
+    assert second.new_objects < first.new_objects
+
+
+def test_equal_content_in_different_containers(store):
+    entries = [{"n": i, "text": "x" * 40} for i in range(20)]
+    tree = {"as_list": entries, "as_dict": {str(i): entry for i, entry in enumerate(entries)},
+            "copy": copy.deepcopy(entries), "wrapped": [entries]}
+    store.save("r1", tree, timestamp=1.0)
+    assert store.load("r1") == tree
+
+
+def test_lookup_by_time(store):
+    trees = {timestamp: {"hostname": f"router-{timestamp}"} for timestamp in (10.0, 20.0, 30.0)}
+    for timestamp in (20.0, 30.0, 10.0):  # the oldest saved last
+        store.save("10.0.0.1", trees[timestamp], timestamp=timestamp)
+    assert [timestamp for timestamp, _ in store.snapshots("10.0.0.1")] == [10.0, 20.0, 30.0]
+    assert store.lookup("10.0.0.1", at=5.0) is None
+    assert store.load("10.0.0.1", at=10.0) == trees[10.0]
+    assert store.load("10.0.0.1", at=29.9) == trees[20.0]
+    assert store.load("10.0.0.1") == trees[30.0]
+    assert store.load("10.0.0.2") is None
+    assert store.devices() == ["10.0.0.1"]
@@ -0,0 +1,82 @@
+"""
+Streaming parser: the same subtrees as json.loads, whatever the chunk boundaries.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import json
+
+import pytest
+
+from api import RestConfHandler
+from emulator import VirtualDevice
+from streaming import StreamingParseError, iter_file, iter_subtrees
+
+DOCUMENT = {
+    "Cisco-IOS-XE-native:native": {
+        "hostname": "router-ł",
+        "skipped": {"deep": [[{"a": "}]"}], "x\"y", {"b": "\\"}], "n": -1.5e-3},
+        "vrf": {"definition": [
+            {"name": "A", "rd": "65000:1", "description": "zażółć \"gęślą\" jaźń € \U0001f600"},
+            {"name": "B", "rd": "65000:2", "address-family": {"ipv4": {}, "ipv6": {}}},
+        ]},
+        "interface": {"GigabitEthernet": [{"name": "1", "mtu": 1500, "shutdown": False, "vrf": None}],
+                      "Loopback": [{"name": 0, "bandwidth": 12345678901234, "ratio": 0.25, "scale": 2E+10}]},
+        "empty": [],
+    }
+}
+ENCODED = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode()
+NATIVE = DOCUMENT["Cisco-IOS-XE-native:native"]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(ENCODED)])
+def test_chunk_boundaries_do_not_matter(size):
+    paths = ["native/vrf/definition[*]", "native/interface/*[0]", "native/hostname", "native/empty"]
+    found = list(iter_subtrees(chunked(ENCODED, size), paths))
+    assert found == [
+        ("native/hostname", NATIVE["hostname"]),
+        ("native/vrf/definition[0]", NATIVE["vrf"]["definition"][0]),
+        ("native/vrf/definition[1]", NATIVE["vrf"]["definition"][1]),
+        ("native/interface/GigabitEthernet[0]", NATIVE["interface"]["GigabitEthernet"][0]),
+        ("native/interface/Loopback[0]", NATIVE["interface"]["Loopback"][0]),
+        ("native/empty", []),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 5])
+def test_whole_document_equals_json_loads(size):
+    assert list(iter_subtrees(chunked(ENCODED, size), [""])) == [("", json.loads(ENCODED))]
+
+
+def test_numbers_split_across_chunks():
+    chunks = ["[12", "34", ".5", "e", "-2, 7", "]"]
+    assert [value for _, value in iter_subtrees(chunks, ["[*]"])] == json.loads("".join(chunks))
+
+
+def test_text_chunks_and_specific_index():
+    chunks = [ENCODED.decode()[i:i + 10] for i in range(0, len(ENCODED), 10)]
+    assert list(iter_subtrees(chunks, ["native/vrf/definition[1]/rd"])) == [("native/vrf/definition[1]/rd", "65000:2")]
+
+
+@pytest.mark.parametrize("text", ['{"a": [1, 2', '{"a" 1}', '{"a": tru}', '{"a": [1 2]}'])
+def test_invalid_documents_raise(text):
+    with pytest.raises(StreamingParseError):
+        list(iter_subtrees(chunked(text.encode(), 2), ["a"]))
+
+
+def test_saved_dump_with_prompt(tmp_path):
+    dump = tmp_path / "dump.txt"
+    dump.write_bytes(b"router# show running-config | json\n" + ENCODED)
+    assert dict(iter_file(str(dump), ["native/vrf/definition[*]/name"], chunk_size=3)) == {
+        "native/vrf/definition[0]/name": "A", "native/vrf/definition[1]/name": "B"}
+
+
+def test_streamed_response_matches_full_read():
+    with VirtualDevice() as device, RestConfHandler("127.0.0.1", port=device.port) as handler:
+        native = handler.get_native()["data"]["Cisco-IOS-XE-native:native"]
+        streamed = [value for _, value in handler.iter_config(["native/vrf/definition[*]"], chunk_size=16)]
+    assert streamed == native["vrf"]["definition"]
@@ -0,0 +1,165 @@
+"""
+Per-request tracing for RestConfHandler.
+
+With a Tracer passed to the handler every request becomes a span split into
+phases:
+
+    connect      DNS lookup and TCP connect (only on a new connection)
+    tls          TLS handshake (only on a new connection)
+    ttfb         sending the request until the response headers arrive,
+                 i.e. mostly the time IOS-XE spends on the request
+    body         downloading the response body
+    json_decode  response.json()
+
+Connect and TLS are measured by the connection classes of TracingAdapter,
+the remaining phases by the handler. Spans can be exported as Chrome
+trace-event JSON and opened in chrome://tracing or Perfetto.
+"""
+import contextlib
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Span of the request currently sent by this thread, None between requests
+_local = threading.local()
+
+
+class Span:
+    """Single request and the phases it went through"""
+
+    def __init__(self, device: str, method: str, url: str, start: float):
+        self.device = device
+        self.method = method
+        self.url = url
+        self.start = start
+        self.thread_id = threading.get_ident()
+        self.status_code: Optional[int] = None
+        self.phases: List[Tuple[str, float, float]] = []
+
+    def add(self, name: str, start: float, end: float):
+        self.phases.append((name, start, end))
+
+    @property
+    def end(self) -> float:
+        """End of the latest phase so far, the start of the span if there is none"""
+        return max([self.start] + [end for _, _, end in self.phases])
+
+    def durations(self) -> Dict[str, float]:
+        """Seconds spent in every phase"""
+        result = {}
+        for name, start, end in self.phases:
+            result[name] = result.get(name, 0.0) + end - start
+        return result
+
+
+def current_span() -> Optional[Span]:
+    return getattr(_local, "span", None)
+
+
+class Tracer:
+    """Thread-safe collector of request spans"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, device: str, method: str, url: str) -> Iterator[Span]:
+        """Open a span, current in the calling thread until the block ends"""
+        span = Span(device, method, url, time.perf_counter())
+        with self._lock:
+            self.spans.append(span)
+        previous = current_span()
+        _local.span = span
+        try:
+            yield span
+        finally:
+            _local.span = previous
+
+    def _us(self, moment: float) -> float:
+        return round((moment - self._origin) * 1e6, 3)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Trace-event JSON: one process per device, one track per thread"""
+        with self._lock:
+            spans = list(self.spans)
+        pids: Dict[str, int] = {}
+        events = []
+        for span in spans:
+            if span.device not in pids:
+                pids[span.device] = len(pids) + 1
+                events.append({"name": "process_name", "ph": "M", "pid": pids[span.device],
+                               "args": {"name": span.device}})
+            pid = pids[span.device]
+            path = span.url.partition("/restconf/data")[2] or span.url
+            events.append({
+                "name": f"{span.method} {path}",
+                "cat": "request",
+                "ph": "X",
+                "ts": self._us(span.start),
+                "dur": round((span.end - span.start) * 1e6, 3),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {"url": span.url, "status_code": span.status_code}
+            })
+            for name, start, end in span.phases:
+                events.append({"name": name, "cat": "phase", "ph": "X", "ts": self._us(start),
+                               "dur": round((end - start) * 1e6, 3), "pid": pid, "tid": span.thread_id})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+class _TracedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        span = current_span()
+        if span is not None:
+            span.add("connect", start, time.perf_counter())
+        return sock
+
+
+class _TracedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        span = current_span()
+        if span is not None:
+            span.add("connect", start, time.perf_counter())
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        span = current_span()
+        if span is not None:
+            # connect() opens the TCP connection first; the rest is the handshake
+            span.add("tls", max(start, span.end), time.perf_counter())
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class TracingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report connect and TLS time to the current span"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TracedHTTPConnectionPool,
+            "https": _TracedHTTPSConnectionPool
+        }
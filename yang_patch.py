@@ -0,0 +1,130 @@
+"""
+RFC 8072 YANG Patch support.
+
+A YangPatch collects edits against the Cisco-IOS-XE-native:native tree and
+is sent with a single PATCH request, which the device applies atomically.
+"""
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from codec import DEFAULT_CODEC
+
+YANG_PATCH_HEADERS = {
+    "Accept": "application/yang-data+json",
+    "Content-Type": "application/yang-patch+json"
+}
+
+
+def _key(value) -> str:
+    """Encode a list key for use in a target path"""
+    return quote(str(value), safe="")
+
+
+class YangPatch:
+    """
+    Ordered list of edits sent as one application/yang-patch+json request
+
+    Targets are relative to Cisco-IOS-XE-native:native, e.g.
+    "/vrf/definition=CUSTOMER_A".
+    """
+
+    def __init__(self, patch_id: str = "route-leaking", comment: Optional[str] = None):
+        self.patch_id = patch_id
+        self.comment = comment
+        self.edits: List[Dict[str, Any]] = []
+        self._encoded: Dict[str, bytes] = {}
+
+    def __len__(self):
+        return len(self.edits)
+
+    def add(self, target: str, value: Optional[Dict[str, Any]] = None, operation: str = "merge",
+            edit_id: Optional[str] = None) -> "YangPatch":
+        """Append a raw edit; edit ids default to the position in the patch"""
+        edit = {
+            "edit-id": edit_id or f"edit-{len(self.edits) + 1}",
+            "operation": operation,
+            "target": target
+        }
+        if value is not None:
+            edit["value"] = value
+        self.edits.append(edit)
+        self._encoded.clear()
+        return self
+
+    def merge_vrf(self, vrf_config) -> "YangPatch":
+        """Create or update a VRF definition from VrfConfig"""
+        definition = vrf_config.to_yang()["Cisco-IOS-XE-native:definition"]
+        return self.add(
+            f"/vrf/definition={_key(vrf_config.name)}",
+            {"Cisco-IOS-XE-native:definition": [definition]},
+            edit_id=f"vrf {vrf_config.name}"
+        )
+
+    def merge_interface(self, interface_config) -> "YangPatch":
+        """Create or update a GigabitEthernet interface from InterfaceConfig"""
+        entry = interface_config.to_yang2()["GigabitEthernet"][0]
+        return self.add(
+            f"/interface/GigabitEthernet={_key(entry['name'])}",
+            {"Cisco-IOS-XE-native:GigabitEthernet": [entry]},
+            edit_id=f"interface {interface_config.name}"
+        )
+
+    def merge_ospf(self, ospf_body: Dict[str, Any]) -> "YangPatch":
+        """Merge a Cisco-IOS-XE-ospf:router-ospf body"""
+        return self.add("/router/Cisco-IOS-XE-ospf:router-ospf", ospf_body, edit_id="ospf")
+
+    def merge_bgp(self, bgp_body: Dict[str, Any]) -> "YangPatch":
+        """Merge a Cisco-IOS-XE-bgp:bgp body (a single BGP process)"""
+        as_number = bgp_body["Cisco-IOS-XE-bgp:bgp"][0]["id"]
+        return self.add(f"/router/Cisco-IOS-XE-bgp:bgp={_key(as_number)}", bgp_body, edit_id=f"bgp {as_number}")
+
+    def to_yang(self) -> Dict[str, Any]:
+        patch = {
+            "patch-id": self.patch_id,
+            "edit": self.edits
+        }
+        if self.comment:
+            patch["comment"] = self.comment
+        return {"ietf-yang-patch:yang-patch": patch}
+
+    def encoded(self, codec=DEFAULT_CODEC) -> bytes:
+        """
+        Request body, serialized once and reused
+
+        Sending the same patch to many devices encodes it only on the first
+        send; adding an edit drops the cached body.
+        """
+        body = self._encoded.get(codec.name)
+        if body is None:
+            body = self._encoded[codec.name] = codec.dumps(self.to_yang())
+        return body
+
+
+def _error_message(errors: Dict[str, Any]) -> str:
+    messages = [error.get("error-message") or error.get("error-tag", "error")
+                for error in errors.get("error", [])]
+    return "; ".join(messages) or "error"
+
+
+def edit_statuses(patch: YangPatch, status_code: int, data: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Per-edit outcome of a YANG Patch request, keyed by edit id
+
+    Values are "ok" or an error message. Edits not mentioned by the server
+    share the overall result of the request.
+    """
+    status = (data or {}).get("ietf-yang-patch:yang-patch-status", {})
+    if "global-errors" in status:
+        default = _error_message(status["global-errors"])
+    elif 200 <= status_code < 300:
+        default = "ok"
+    else:
+        default = f"failed with status {status_code}"
+
+    result = {edit["edit-id"]: default for edit in patch.edits}
+    for edit in status.get("edit-status", {}).get("edit", []):
+        if "errors" in edit:
+            result[edit["edit-id"]] = _error_message(edit["errors"])
+        elif "ok" in edit:
+            result[edit["edit-id"]] = "ok"
+    return result